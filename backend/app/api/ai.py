@@ -1,16 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
+import asyncio
+import math
 
 from app.database import get_db
 from app import models, schemas
 from app.auth.dependencies import get_current_user
+from app.services import ai_quota, resilience, sentiment
 from app.services.ai_generator import get_ai_generator
 from app.config import settings
 
 router = APIRouter()
 
 
+def _quota_exceeded(e: ai_quota.QuotaError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+    )
+
+
+def _provider_unavailable(e: resilience.Rejected) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+    )
+
+
 @router.post("/generate", response_model=schemas.AIGenerateResponse)
 async def generate_tweet_variants(
     request: schemas.AIGenerateRequest,
@@ -24,7 +43,9 @@ async def generate_tweet_variants(
     
     try:
         ai_generator = get_ai_generator()
-        variants = ai_generator.generate_tweet_variants(
+        # In a thread: the call may wait for a quota slot
+        variants = await asyncio.to_thread(
+            ai_generator.generate_tweet_variants,
             topic=request.topic,
             tone=request.tone,
             num_variants=request.num_variants,
@@ -46,6 +67,10 @@ async def generate_tweet_variants(
         
         return {"variants": variants, "metadata": {"topic": request.topic, "tone": request.tone}}
         
+    except ai_quota.QuotaError as e:
+        raise _quota_exceeded(e)
+    except resilience.Rejected as e:
+        raise _provider_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI generation failed: {str(e)}")
 
@@ -55,6 +80,41 @@ async def analyze_tweet(text: str, current_user: models.User = Depends(get_curre
     """Analyze tweet sentiment"""
     try:
         ai_generator = get_ai_generator()
-        return ai_generator.analyze_tweet_sentiment(text)
+        return await asyncio.to_thread(ai_generator.analyze_tweet_sentiment, text)
+    except ai_quota.QuotaError as e:
+        raise _quota_exceeded(e)
+    except resilience.Rejected as e:
+        raise _provider_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/analyze/batch", response_model=schemas.SentimentBatchResponse)
+async def analyze_tweets_batch(
+    request: schemas.SentimentBatchRequest,
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Score many texts with the local sentiment model
+    
+    Thousands of texts per second and no Gemini quota. With `refine`,
+    texts the local model finds mixed are re-scored by Gemini in a single
+    call (at most SENTIMENT_REFINE_MAX_TEXTS of them).
+    """
+    results = await asyncio.to_thread(sentiment.score_texts, request.texts)
+    uncertain = sum(1 for result in results if result["uncertain"])
+    
+    refined = 0
+    if request.refine and uncertain:
+        if not settings.GEMINI_API_KEY:
+            raise HTTPException(status_code=500, detail="Gemini API key not configured")
+        try:
+            refined = await asyncio.to_thread(sentiment.refine, results, request.texts, get_ai_generator())
+        except ai_quota.QuotaError as e:
+            raise _quota_exceeded(e)
+        except resilience.Rejected as e:
+            raise _provider_unavailable(e)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Sentiment refinement failed: {str(e)}")
+    
+    return {"results": results, "uncertain": uncertain, "refined": refined}
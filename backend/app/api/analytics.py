@@ -4,9 +4,10 @@ from sqlalchemy import func, desc
 from typing import List, Dict
 from datetime import datetime, timedelta
 
-from app.database import get_db
+from app.database import get_read_db
 from app import models, schemas
 from app.auth.dependencies import get_current_user
+from app.services import heatmap
 
 router = APIRouter()
 
@@ -15,10 +16,13 @@ router = APIRouter()
 async def get_analytics_summary(
     days: int = 30,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get analytics summary for user"""
     
+    # Metric snapshots of a tweet are taken after it was posted, so
+    # bounding Metric.timestamp too keeps results the same and lets
+    # Postgres prune metric partitions older than the window
     since_date = datetime.utcnow() - timedelta(days=days)
     
     # Get total tweets
@@ -33,7 +37,8 @@ async def get_analytics_summary(
         func.sum(models.Metric.likes + models.Metric.retweets + models.Metric.replies).label('total')
     ).join(models.Tweet).filter(
         models.Tweet.user_id == current_user.id,
-        models.Tweet.posted_at >= since_date
+        models.Tweet.posted_at >= since_date,
+        models.Metric.timestamp >= since_date
     ).first()
     
     total_engagement = engagement_query.total or 0
@@ -43,7 +48,8 @@ async def get_analytics_summary(
         func.avg(models.Metric.engagement_rate).label('avg')
     ).join(models.Tweet).filter(
         models.Tweet.user_id == current_user.id,
-        models.Tweet.posted_at >= since_date
+        models.Tweet.posted_at >= since_date,
+        models.Metric.timestamp >= since_date
     ).first()
     
     avg_engagement_rate = float(avg_engagement.avg or 0)
@@ -51,22 +57,13 @@ async def get_analytics_summary(
     # Get top tweet
     top_tweet = db.query(models.Tweet).join(models.Metric).filter(
         models.Tweet.user_id == current_user.id,
-        models.Tweet.posted_at >= since_date
+        models.Tweet.posted_at >= since_date,
+        models.Metric.timestamp >= since_date
     ).order_by(desc(models.Metric.likes + models.Metric.retweets)).first()
     
-    # Get best time slots (hour of day)
-    best_times = db.query(
-        func.extract('hour', models.Tweet.posted_at).label('hour'),
-        func.avg(models.Metric.engagement_rate).label('avg_engagement')
-    ).join(models.Metric).filter(
-        models.Tweet.user_id == current_user.id,
-        models.Tweet.posted_at >= since_date
-    ).group_by('hour').order_by(desc('avg_engagement')).limit(5).all()
-    
-    best_time_slots = [
-        {"hour": int(hour), "avg_engagement": float(eng)} 
-        for hour, eng in best_times
-    ]
+    # Best hours of the week, read from the maintained heatmap (decayed
+    # over HEATMAP_HALF_LIFE_DAYS rather than bounded by `days`)
+    best_time_slots = heatmap.best_cells(_heatmap_of(db, current_user.id), 5)
     
     return {
         "total_tweets": total_tweets,
@@ -77,11 +74,34 @@ async def get_analytics_summary(
     }
 
 
+@router.get("/heatmap", response_model=schemas.EngagementHeatmap)
+async def get_engagement_heatmap(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Expected engagement per tweet by day of week (Monday first) and hour, UTC"""
+    
+    user_heatmap = _heatmap_of(db, current_user.id)
+    
+    return {
+        "scores": heatmap.grid(heatmap.scores(user_heatmap)),
+        "tweets": heatmap.grid(user_heatmap.tweets if user_heatmap else [0.0] * heatmap.CELLS),
+        "best_slots": heatmap.best_cells(user_heatmap, 5),
+        "updated_at": user_heatmap.updated_at if user_heatmap else None
+    }
+
+
+def _heatmap_of(db: Session, user_id: int):
+    return db.query(models.EngagementHeatmap).filter(
+        models.EngagementHeatmap.user_id == user_id
+    ).first()
+
+
 @router.get("/tweets/{tweet_id}/metrics", response_model=List[schemas.Metric])
 async def get_tweet_metrics(
     tweet_id: int,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get metrics history for a specific tweet"""
     
@@ -93,9 +113,12 @@ async def get_tweet_metrics(
     if not tweet:
         raise HTTPException(status_code=404, detail="Tweet not found")
     
-    metrics = db.query(models.Metric).filter(
-        models.Metric.tweet_id == tweet_id
-    ).order_by(models.Metric.timestamp).all()
+    query = db.query(models.Metric).filter(models.Metric.tweet_id == tweet_id)
+    if tweet.created_at:
+        # Snapshots are never older than the tweet; the bound lets Postgres
+        # skip the metric partitions from before it
+        query = query.filter(models.Metric.timestamp >= tweet.created_at)
+    metrics = query.order_by(models.Metric.timestamp).all()
     
     return metrics
 
@@ -104,7 +127,7 @@ async def get_tweet_metrics(
 async def get_engagement_over_time(
     days: int = 30,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get engagement metrics over time"""
     
@@ -118,7 +141,8 @@ async def get_engagement_over_time(
         func.sum(models.Metric.replies).label('replies')
     ).join(models.Metric).filter(
         models.Tweet.user_id == current_user.id,
-        models.Tweet.posted_at >= since_date
+        models.Tweet.posted_at >= since_date,
+        models.Metric.timestamp >= since_date
     ).group_by('date').order_by('date').all()
     
     return {
@@ -141,7 +165,7 @@ async def get_top_tweets(
     limit: int = 10,
     days: int = 30,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get top performing tweets"""
     
@@ -152,7 +176,8 @@ async def get_top_tweets(
         (models.Metric.likes + models.Metric.retweets + models.Metric.replies).label('engagement')
     ).join(models.Metric).filter(
         models.Tweet.user_id == current_user.id,
-        models.Tweet.posted_at >= since_date
+        models.Tweet.posted_at >= since_date,
+        models.Metric.timestamp >= since_date
     ).order_by(desc('engagement')).limit(limit).all()
     
     return {
@@ -3,11 +3,15 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
 from datetime import timedelta
+import logging
 
 from app.database import get_db
 from app import models, schemas
 from app.auth.dependencies import create_access_token
 from app.config import settings
+from app.tasks import scheduler
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -46,6 +50,13 @@ async def register(user_data: schemas.UserCreate, db: Session = Depends(get_db))
     db.commit()
     db.refresh(user)
     
+    if user.twitter_username and user.api_key:
+        # Import the existing timeline so analytics are not empty on day one
+        try:
+            scheduler.sync_user_timelines.delay(user.id)
+        except Exception as e:
+            logger.warning(f"Could not queue timeline sync for user {user.id}: {str(e)}")
+    
     return user
 
 @router.post("/login")
@@ -1,14 +1,47 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app import models, schemas
 from app.auth.dependencies import get_current_user
+from app.services import cache, recurrence
 
 router = APIRouter()
 
 
+def _validate_recurrence(expression: Optional[str]):
+    """Reject recurrence strings the campaign engine cannot evaluate"""
+    if not expression:
+        return
+    try:
+        recurrence.validate(expression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _validate_slot_times(campaign_data: schemas.CampaignCreate, now: Optional[datetime] = None):
+    """
+    Reject slot scheduled_at values that do not parse and, given `now`,
+    one-off slot times already in the past (they would never fire)
+    """
+    for slot in campaign_data.slots or []:
+        try:
+            fixed_at = recurrence.slot_time(slot)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid slot scheduled_at: {slot.get('scheduled_at')!r}")
+        if now is not None and fixed_at is not None and not campaign_data.recurrence and fixed_at < now:
+            raise HTTPException(status_code=400, detail=f"Slot scheduled_at {slot['scheduled_at']} is in the past")
+
+
+def _has_fired(db: Session, campaign: models.Campaign) -> bool:
+    """Whether a one-off campaign already scheduled its tweets (it fires only once)"""
+    if campaign.recurrence:
+        return False
+    return db.query(models.Tweet.id).filter(models.Tweet.campaign_id == campaign.id).first() is not None
+
+
 @router.post("/", response_model=schemas.Campaign, status_code=status.HTTP_201_CREATED)
 async def create_campaign(
     campaign_data: schemas.CampaignCreate,
@@ -17,6 +50,9 @@ async def create_campaign(
 ):
     """Create a new campaign"""
     
+    _validate_recurrence(campaign_data.recurrence)
+    _validate_slot_times(campaign_data, datetime.utcnow())
+    
     campaign = models.Campaign(
         user_id=current_user.id,
         name=campaign_data.name,
@@ -25,6 +61,7 @@ async def create_campaign(
         slots=campaign_data.slots,
         active=True
     )
+    recurrence.schedule_campaign(campaign, datetime.utcnow())
     
     db.add(campaign)
     db.commit()
@@ -36,13 +73,13 @@ async def create_campaign(
 @router.get("/", response_model=List[schemas.Campaign])
 async def get_campaigns(
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all campaigns for current user"""
     
-    campaigns = db.query(models.Campaign).filter(
+    campaigns = cache.get_list(db, models.Campaign, current_user.id, lambda: db.query(models.Campaign).filter(
         models.Campaign.user_id == current_user.id
-    ).all()
+    ).all())
     
     return campaigns
 
@@ -55,12 +92,9 @@ async def get_campaign(
 ):
     """Get specific campaign"""
     
-    campaign = db.query(models.Campaign).filter(
-        models.Campaign.id == campaign_id,
-        models.Campaign.user_id == current_user.id
-    ).first()
+    campaign = cache.get(db, models.Campaign, campaign_id)
     
-    if not campaign:
+    if not campaign or campaign.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
     return campaign
@@ -83,10 +117,20 @@ async def update_campaign(
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
+    _validate_recurrence(campaign_data.recurrence)
+    _validate_slot_times(campaign_data)
+    
+    if campaign_data.slots != campaign.slots:
+        # Buffered drafts were generated for the old slots
+        db.query(models.CampaignDraft).filter(
+            models.CampaignDraft.campaign_id == campaign.id
+        ).delete(synchronize_session=False)
+    
     campaign.name = campaign_data.name
     campaign.description = campaign_data.description
     campaign.recurrence = campaign_data.recurrence
     campaign.slots = campaign_data.slots
+    recurrence.schedule_campaign(campaign, datetime.utcnow(), fired=_has_fired(db, campaign))
     
     db.commit()
     db.refresh(campaign)
@@ -133,6 +177,7 @@ async def toggle_campaign(
         raise HTTPException(status_code=404, detail="Campaign not found")
     
     campaign.active = not campaign.active
+    recurrence.schedule_campaign(campaign, datetime.utcnow(), fired=_has_fired(db, campaign))
     db.commit()
     db.refresh(campaign)
     
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+from datetime import datetime
+
+from app.database import get_read_db, read_session
+from app import models
+from app.auth.dependencies import get_current_user
+from app.services import export
+
+router = APIRouter()
+
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: Literal["tweets", "metrics"],
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    campaign_id: Optional[int] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Stream the user's tweets or metric history as CSV, NDJSON or Parquet
+
+    Rows come from a server-side cursor and are sent chunk by chunk, so
+    memory stays flat however large the export. `since`/`until` bound
+    posted_at for tweets and the snapshot time for metrics.
+    """
+    try:
+        export.check_format(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if campaign_id is not None:
+        campaign = db.query(models.Campaign.id).filter(
+            models.Campaign.id == campaign_id,
+            models.Campaign.user_id == current_user.id
+        ).first()
+        if not campaign:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+
+    filename = f"{dataset}-{datetime.utcnow():%Y%m%dT%H%M%S}.{format}"
+    return StreamingResponse(
+        export.stream(read_session, dataset, format, current_user.id, since, until, campaign_id),
+        media_type=export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, HTTPException, Request, WebSocket, status
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+
+from app.config import settings
+from app.database import SessionLocal
+from app.auth.dependencies import user_from_token
+from app.services import live_updates
+
+router = APIRouter()
+
+
+def _authenticate(token: Optional[str], authorization: Optional[str]) -> Optional[int]:
+    """
+    User ID for a token from the query string or Authorization header
+
+    Browsers cannot set headers on WebSocket or EventSource connections,
+    hence `?token=`. The session is closed right away so long-lived
+    connections hold no database connection.
+    """
+    if not token and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    db = SessionLocal()
+    try:
+        user = user_from_token(token, db)
+        return user.id if user else None
+    finally:
+        db.close()
+
+
+@router.websocket("/ws")
+async def live_websocket(websocket: WebSocket, token: Optional[str] = None):
+    """Push live metric updates for the authenticated user"""
+    user_id = await asyncio.to_thread(_authenticate, token, websocket.headers.get("authorization"))
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    async with live_updates.hub.subscribe(user_id) as queue:
+        async def forward():
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), settings.LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    payload = live_updates.encode({"type": "ping"})
+                await websocket.send_text(payload)
+
+        sender = asyncio.create_task(forward())
+        try:
+            # Clients only listen; reading detects the disconnect
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+
+
+@router.get("/stream")
+async def live_stream(request: Request, token: Optional[str] = None):
+    """Server-sent events variant of /live/ws"""
+    user_id = await asyncio.to_thread(_authenticate, token, request.headers.get("authorization"))
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+
+    async def events():
+        async with live_updates.hub.subscribe(user_id) as queue:
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), settings.LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"data: {payload}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
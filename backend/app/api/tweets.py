@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
+import asyncio
+import time
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app import models, schemas
 from app.auth.dependencies import get_current_user
-from app.services.x_client import get_twitter_client
+from app.tasks import scheduler
+from app.services import cache, media
 
 router = APIRouter()
 
+# Statuses that mean a posting task is still in flight
+PENDING_STATUSES = ("queued", "retrying")
+MAX_STATUS_WAIT_SECONDS = 30
+STATUS_POLL_INTERVAL = 1.0
+
 
 @router.post("/", response_model=schemas.Tweet, status_code=status.HTTP_201_CREATED)
 async def create_tweet(
@@ -19,10 +27,17 @@ async def create_tweet(
 ):
     """Create a new tweet (draft or scheduled)"""
     
+    # Links are fetched by the workers and published: refuse internal ones up front
+    try:
+        await asyncio.to_thread(media.check_sources, tweet_data.media_links or [])
+    except media.MediaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     tweet = models.Tweet(
         user_id=current_user.id,
         text=tweet_data.text,
         media_links=tweet_data.media_links,
+        media_status="pending" if tweet_data.media_links else None,
         scheduled_at=tweet_data.scheduled_at,
         status="scheduled" if tweet_data.scheduled_at else "draft"
     )
@@ -39,7 +54,7 @@ async def get_tweets(
     status: Optional[str] = None,
     limit: int = 50,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all tweets for current user"""
     
@@ -60,24 +75,27 @@ async def get_tweet(
 ):
     """Get specific tweet"""
     
-    tweet = db.query(models.Tweet).filter(
-        models.Tweet.id == tweet_id,
-        models.Tweet.user_id == current_user.id
-    ).first()
+    tweet = cache.get(db, models.Tweet, tweet_id)
     
-    if not tweet:
+    if not tweet or tweet.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Tweet not found")
     
     return tweet
 
 
-@router.post("/{tweet_id}/post", response_model=schemas.Tweet)
+@router.post(
+    "/{tweet_id}/post",
+    response_model=schemas.TweetPostAccepted,
+    status_code=status.HTTP_202_ACCEPTED
+)
 async def post_tweet_now(
     tweet_id: int,
+    request: Request,
+    response: Response,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Post tweet immediately to Twitter"""
+    """Queue tweet for immediate posting to Twitter"""
     
     tweet = db.query(models.Tweet).filter(
         models.Tweet.id == tweet_id,
@@ -90,24 +108,86 @@ async def post_tweet_now(
     if tweet.status == "posted":
         raise HTTPException(status_code=400, detail="Tweet already posted")
     
+    if tweet.status in PENDING_STATUSES:
+        raise HTTPException(status_code=409, detail="Tweet is already queued for posting")
+    
     if not current_user.api_key:
         raise HTTPException(status_code=400, detail="Twitter API key not configured")
     
-    # Post to Twitter
+    previous_status = tweet.status
+    tweet.status = "queued"
+    # A manual post starts a fresh retry budget (e.g. re-driving a dead tweet)
+    tweet.attempts = 0
+    tweet.last_error = None
+    tweet.next_attempt_at = datetime.utcnow()
+    db.commit()
+    
+    # Hand off to the posting queue; the provider call never runs in the request
     try:
-        twitter_client = get_twitter_client(current_user.api_key)
-        result = twitter_client.post_tweet(tweet.text, tweet.media_links)
-        
-        tweet.tweet_id_twitter = result.get("id_str")
-        tweet.status = "posted"
-        tweet.posted_at = datetime.utcnow()
-        
+        task = scheduler.post_tweet_now.delay(tweet.id)
+    except Exception as e:
+        tweet.status = previous_status
         db.commit()
-        db.refresh(tweet)
+        raise HTTPException(status_code=503, detail=f"Failed to queue tweet: {str(e)}")
+    
+    status_url = str(request.url_for("get_tweet_status", tweet_id=tweet.id))
+    response.headers["Location"] = status_url
+    
+    return {
+        "tweet_id": tweet.id,
+        "status": "queued",
+        "task_id": task.id,
+        "status_url": status_url
+    }
+
+
+@router.get("/{tweet_id}/status", response_model=schemas.TweetStatus)
+async def get_tweet_status(
+    tweet_id: int,
+    wait: int = Query(0, ge=0, le=MAX_STATUS_WAIT_SECONDS),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get posting status of a tweet
+    
+    With `wait` > 0 the request long-polls for up to that many seconds
+    while the tweet is still pending, returning as soon as it settles.
+    """
+    
+    user_id = current_user.id
+    deadline = time.monotonic() + wait
+    
+    while True:
+        row = db.query(
+            models.Tweet.id,
+            models.Tweet.status,
+            models.Tweet.tweet_id_twitter,
+            models.Tweet.posted_at,
+            models.Tweet.attempts,
+            models.Tweet.next_attempt_at,
+            models.Tweet.last_error
+        ).filter(
+            models.Tweet.id == tweet_id,
+            models.Tweet.user_id == user_id
+        ).first()
+        # Release the connection while we sleep between polls
+        db.rollback()
         
-        return tweet
+        if not row:
+            raise HTTPException(status_code=404, detail="Tweet not found")
         
-    except Exception as e:
-        tweet.status = "failed"
-        db.commit()
-        raise HTTPException(status_code=500, detail=f"Failed to post: {str(e)}")
+        if row.status not in PENDING_STATUSES or time.monotonic() >= deadline:
+            break
+        
+        await asyncio.sleep(STATUS_POLL_INTERVAL)
+    
+    return {
+        "tweet_id": row.id,
+        "status": row.status,
+        "tweet_id_twitter": row.tweet_id_twitter,
+        "posted_at": row.posted_at,
+        "attempts": row.attempts or 0,
+        "next_attempt_at": row.next_attempt_at,
+        "last_error": row.last_error
+    }
@@ -8,6 +8,7 @@ from typing import Optional
 from app.config import settings
 from app.database import get_db
 from app import models
+from app.services import cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -38,17 +39,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        
-        if username is None:
-            raise credentials_exception
-            
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = user_from_token(token, db)
     
     if user is None:
         raise credentials_exception
@@ -56,6 +47,23 @@ async def get_current_user(
     return user
 
 
+def user_from_token(token: Optional[str], db: Session) -> Optional[models.User]:
+    """User named by a valid JWT, None if the token is missing or invalid"""
+    if not token:
+        return None
+    
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    
+    username: str = payload.get("sub")
+    if username is None:
+        return None
+    
+    return cache.get_user_by_username(db, username)
+
+
 async def get_current_active_user(
     current_user: models.User = Depends(get_current_user)
 ) -> models.User:
@@ -1,24 +1,63 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+import logging
+import os
+import re
+import threading
+import time
+import redis
 
 from app.config import settings
+from app.services import monitoring, profiling
+
+logger = logging.getLogger(__name__)
+
+
+def _create_engine(url: str, label: str):
+    """Engine with its own pool, instrumented under `label`"""
+    created = create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=10,
+        max_overflow=20,
+        poolclass=monitoring.timed_pool(label)
+    )
+    monitoring.instrument_engine(created)
+    monitoring.instrument_pool(created, label)
+    profiling.instrument_engine(created)
+    return created
+
 
 # Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
-)
+engine = _create_engine(settings.DATABASE_URL, "primary")
+
+# Optional read replica for analytics and listings (see get_read_db)
+read_engine = _create_engine(settings.DATABASE_REPLICA_URL, "replica") if settings.DATABASE_REPLICA_URL else None
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if read_engine else None
 
 # Create Base class for models
 Base = declarative_base()
 
 
+_redis_client = None
+
+
+def get_redis() -> redis.Redis:
+    """Shared Redis client (connection pooled, short timeouts)"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=2,
+            socket_timeout=2
+        )
+    return _redis_client
+
+
 def get_db():
     """Dependency for getting database session"""
     db = SessionLocal()
@@ -28,7 +67,147 @@ def get_db():
         db.close()
 
 
+# Postgres replay lag; 0 when the server is a primary or has replayed all it received
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+_replica_lock = threading.Lock()
+_replica_checked_at = 0.0
+_replica_usable = False
+
+
+def replica_usable() -> bool:
+    """
+    Whether reads may go to the replica
+
+    Lag is measured at most every REPLICA_LAG_CHECK_SECONDS per process,
+    by one thread while the others use the last answer. The replica is
+    skipped while lag exceeds REPLICA_MAX_LAG_SECONDS or the check fails.
+    """
+    global _replica_checked_at, _replica_usable
+    if read_engine is None:
+        return False
+    if time.monotonic() - _replica_checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+        return _replica_usable
+    if not _replica_lock.acquire(blocking=False):
+        return _replica_usable
+    
+    try:
+        _replica_checked_at = time.monotonic()
+        try:
+            with read_engine.connect() as conn:
+                lag = float(conn.execute(_REPLICA_LAG_SQL).scalar()) if conn.dialect.name == "postgresql" else 0.0
+        except Exception as e:
+            logger.warning(f"Replica lag check failed, reading from the primary: {str(e)}")
+            _replica_usable = False
+            return False
+        
+        monitoring.DB_REPLICA_LAG.set(lag)
+        usable = lag <= settings.REPLICA_MAX_LAG_SECONDS
+        if usable != _replica_usable:
+            logger.info(f"Replica lag {lag:.1f}s, {'reading from' if usable else 'falling back from'} the replica")
+        _replica_usable = usable
+        return usable
+    finally:
+        _replica_lock.release()
+
+
+def read_session() -> Session:
+    """Session for read-only work: the replica when usable, else the primary"""
+    if replica_usable():
+        monitoring.DB_READ_SESSIONS.labels("replica").inc()
+        return ReadSessionLocal()
+    monitoring.DB_READ_SESSIONS.labels("primary").inc()
+    return SessionLocal()
+
+
+def get_read_db():
+    """
+    Dependency for read-only endpoints (analytics, listings)
+    
+    Served by DATABASE_REPLICA_URL when configured and caught up, so
+    heavy reads stay off the primary. Results may trail writes by up to
+    REPLICA_MAX_LAG_SECONDS; endpoints that must see their own writes
+    use get_db.
+    """
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+_REVISION_RE = re.compile(r"^(down_revision|revision)\s*=\s*(.+)$", re.MULTILINE)
+
+
+def migration_heads() -> set:
+    """
+    Head revision(s) of the migration scripts
+
+    Parsed straight from migrations/versions rather than through
+    alembic.script, which would add ~150ms of imports to every cold start.
+    """
+    revisions, parents = set(), set()
+    versions_dir = os.path.join(MIGRATIONS_DIR, "versions")
+    for name in os.listdir(versions_dir):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(versions_dir, name)) as f:
+            for key, value in _REVISION_RE.findall(f.read()):
+                ids = set(re.findall(r"['\"]([^'\"]+)['\"]", value))
+                (revisions if key == "revision" else parents).update(ids)
+    return revisions - parents
+
+
+def current_revisions(conn) -> set:
+    """Revision(s) recorded in alembic_version, empty if never migrated"""
+    if not inspect(conn).has_table("alembic_version"):
+        return set()
+    return {row[0] for row in conn.execute(text("SELECT version_num FROM alembic_version"))}
+
+
+def check_schema():
+    """Fail fast unless the database is migrated to the latest revision"""
+    expected = migration_heads()
+    with engine.connect() as conn:
+        current = current_revisions(conn)
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema is at {', '.join(sorted(current)) or 'no revision'}, "
+            f"expected {', '.join(sorted(expected))}; run `alembic upgrade head`"
+        )
+
+
+def _alembic_config():
+    from alembic.config import Config
+    
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    return config
+
+
 def init_db():
-    """Initialize database (create all tables)"""
+    """Migrate the database to the latest revision (scripts and benchmarks; the API only checks)"""
+    from alembic import command
+    
+    config = _alembic_config()
+    with engine.begin() as conn:
+        config.attributes["connection"] = conn
+        if not current_revisions(conn) and inspect(conn).has_table("users"):
+            # Created by the old create_all startup; adopt it at the initial revision
+            command.stamp(config, "0001")
+        command.upgrade(config, "head")
+
+
+def reset_db():
+    """Drop every table, including the migration history"""
     import app.models  # noqa
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
\ No newline at end of file
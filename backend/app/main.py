@@ -1,10 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import text
 import logging
+import time
 
 from app.config import settings
-from app.database import init_db
-from app.api import tweets, ai, campaigns, analytics, auth
+from app.database import check_schema, engine, get_redis
+from app.api import tweets, ai, campaigns, analytics, auth, exports, live
+from app.services import live_updates, monitoring, profiling, resilience
 
 # Configure logging
 logging.basicConfig(
@@ -30,18 +35,72 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def prometheus_middleware(request: Request, call_next):
+    """Record request latency and per-request DB query count/duration"""
+    start = time.perf_counter()
+    stats = monitoring.start_query_stats()
+    status_code = 500
+    
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        monitoring.stop_query_stats()
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        monitoring.REQUEST_LATENCY.labels(
+            request.method, route_path, str(status_code)
+        ).observe(time.perf_counter() - start)
+        monitoring.REQUEST_DB_QUERIES.labels(route_path).observe(stats.count)
+        monitoring.REQUEST_DB_DURATION.labels(route_path).observe(stats.duration)
+
+
+@app.middleware("http")
+async def profiling_middleware(request: Request, call_next):
+    """
+    Per-request SQL profiling, enabled with the X-Debug-Profile header
+    
+    "1" records statements and flags repeated shapes (N+1); "sample" also
+    captures a sampled stack profile. The summary is returned in
+    X-Debug-Query-Report and the full report written to PROFILING_OUTPUT_DIR.
+    """
+    mode = request.headers.get("x-debug-profile")
+    if not settings.PROFILING_ENABLED or not mode:
+        return await call_next(request)
+    
+    profile = profiling.start_profile(
+        f"{request.method} {request.url.path}", sample=(mode == "sample")
+    )
+    try:
+        response = await call_next(request)
+    finally:
+        report = profiling.stop_profile(profile)
+    
+    path = profiling.write_report(report, profile.sampler.stacks if profile.sampler else None)
+    response.headers["X-Debug-Query-Report"] = profiling.summarize(report)
+    if path:
+        response.headers["X-Debug-Report-File"] = path
+    if report["n_plus_one"]:
+        logger.warning(f"Possible N+1 in {report['name']}: {profiling.summarize(report)}")
+    
+    return response
+
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
+    """Verify the database schema on startup (migrations run separately)"""
     logger.info("Starting up application...")
-    init_db()
-    logger.info("Database initialized")
+    check_schema()
+    logger.info("Database schema is up to date")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down application...")
+    await live_updates.hub.close()
 
 
 @app.get("/")
@@ -56,13 +115,44 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
+def health_check():
     """Detailed health check"""
-    return {
-        "status": "healthy",
-        "database": "connected",
-        "redis": "connected"
-    }
+    checks = {}
+    
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        checks["database"] = "connected"
+    except Exception as e:
+        checks["database"] = f"error: {str(e)}"
+    
+    try:
+        get_redis().ping()
+        checks["redis"] = "connected"
+    except Exception as e:
+        checks["redis"] = f"error: {str(e)}"
+    
+    healthy = all(value == "connected" for value in checks.values())
+    
+    # Provider breakers of this process; an open one degrades, it does not fail, the check
+    circuits = resilience.states()
+    if not healthy:
+        status = "unhealthy"
+    elif any(circuit["state"] != "closed" for circuit in circuits.values()):
+        status = "degraded"
+    else:
+        status = "healthy"
+    
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={"status": status, **checks, "circuits": circuits}
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics"""
+    return Response(generate_latest(monitoring.get_registry()), media_type=CONTENT_TYPE_LATEST)
 
 
 # Include routers
@@ -71,6 +161,8 @@ app.include_router(tweets.router, prefix="/tweets", tags=["Tweets"])
 app.include_router(ai.router, prefix="/ai", tags=["AI Generation"])
 app.include_router(campaigns.router, prefix="/campaigns", tags=["Campaigns"])
 app.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
+app.include_router(exports.router, prefix="/exports", tags=["Exports"])
+app.include_router(live.router, prefix="/live", tags=["Live updates"])
 
 
 if __name__ == "__main__":
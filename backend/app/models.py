@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -13,6 +13,12 @@ class User(Base):
     twitter_username = Column(String, index=True)
     api_key = Column(Text)  # Twitter API key (encrypted)
     settings = Column(JSON, default={})
+    # Timeline sync cursors (provider tweet IDs)
+    timeline_since_id = Column(String)  # Newest tweet synced; incremental runs fetch after it
+    timeline_backfill_max_id = Column(String)  # Backfill resumes at this ID and older
+    timeline_backfill_since_id = Column(String)  # ...down to (excluding) this ID; NULL for the whole history
+    timeline_backfill_done = Column(Boolean, default=False)
+    timeline_synced_at = Column(DateTime(timezone=True), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -29,22 +35,59 @@ class Tweet(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     scheduled_at = Column(DateTime(timezone=True))
     posted_at = Column(DateTime(timezone=True))
-    status = Column(String, default="draft")  # draft, scheduled, posted, failed
-    media_links = Column(JSON, default=[])
+    status = Column(String, default="draft")  # draft, scheduled, queued, retrying, posted, failed, dead
+    media_links = Column(JSON, default=[])  # URLs or MEDIA_LOCAL_DIR paths
+    media_ids = Column(JSON)  # Provider media IDs resolved from media_links
+    media_status = Column(String, index=True)  # None (no media), pending, ready, failed
+    media_expires_at = Column(DateTime(timezone=True))  # Earliest expiry of media_ids
     generated_by_ai = Column(Boolean, default=False)
     viral_score = Column(Float)
     campaign_id = Column(Integer, ForeignKey("campaigns.id"))
+    campaign_slot = Column(Integer)  # Index into Campaign.slots
+    occurrence_at = Column(DateTime(timezone=True))  # Campaign fire time this tweet was generated for
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), index=True)
+    last_error = Column(Text)
+    metrics_failures = Column(Integer, default=0)
+    metrics_next_attempt_at = Column(DateTime(timezone=True))
+    heatmap_engagement = Column(Float)  # Engagement already counted in the user's heatmap
+    sentiment_score = Column(Float)  # Local polarity, -1..1; None until scored
+    
+    # At most one tweet per campaign slot and occurrence
+    __table_args__ = (
+        Index("uq_tweets_campaign_occurrence", "campaign_id", "campaign_slot", "occurrence_at", unique=True),
+    )
     
     user = relationship("User", back_populates="tweets")
     metrics = relationship("Metric", back_populates="tweet", cascade="all, delete-orphan")
     campaign = relationship("Campaign", back_populates="tweets")
 
+class MediaAsset(Base):
+    """Media uploaded to the provider, cached per user and content hash"""
+    __tablename__ = "media_assets"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    size = Column(Integer)
+    media_type = Column(String)
+    media_id = Column(String)  # Provider media ID
+    expires_at = Column(DateTime(timezone=True))  # When the provider forgets media_id
+    source = Column(Text)  # Last URL or path this content was fetched from
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("uq_media_assets_user_sha256", "user_id", "sha256", unique=True),
+    )
+
 class Metric(Base):
     __tablename__ = "metrics"
     
     id = Column(Integer, primary_key=True, index=True)
     tweet_id = Column(Integer, ForeignKey("tweets.id"), nullable=False)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    # Partition key on Postgres, where the primary key is (id, timestamp)
+    timestamp = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     likes = Column(Integer, default=0)
     retweets = Column(Integer, default=0)
     replies = Column(Integer, default=0)
@@ -53,6 +96,20 @@ class Metric(Base):
     extra_json = Column(JSON, default={})
     
     tweet = relationship("Tweet", back_populates="metrics")
+    
+    __table_args__ = (
+        Index("ix_metrics_tweet_id_timestamp", "tweet_id", "timestamp"),
+    )
+
+class EngagementHeatmap(Base):
+    """Per-user engagement by hour of week (UTC), with exponential time decay"""
+    __tablename__ = "engagement_heatmaps"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # 168 cells each, Monday 00:00 first, decayed to updated_at
+    engagement = Column(JSON, nullable=False)  # Engagement of tweets posted in the cell
+    tweets = Column(JSON, nullable=False)  # Tweets posted in the cell
+    updated_at = Column(DateTime(timezone=True), nullable=False)
 
 class Campaign(Base):
     __tablename__ = "campaigns"
@@ -64,7 +121,26 @@ class Campaign(Base):
     recurrence = Column(String)  # Cron expression
     slots = Column(JSON, default=[])
     active = Column(Boolean, default=True)
+    next_fire_at = Column(DateTime(timezone=True), index=True)  # Null when paused or nothing is left to fire
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="campaigns")
-    tweets = relationship("Tweet", back_populates="campaign")
\ No newline at end of file
+    tweets = relationship("Tweet", back_populates="campaign")
+    drafts = relationship("CampaignDraft", back_populates="campaign", cascade="all, delete-orphan")
+
+class CampaignDraft(Base):
+    """Pre-generated content waiting to be scheduled for a campaign slot"""
+    __tablename__ = "campaign_drafts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=False)
+    slot = Column(Integer, nullable=False)  # Index into Campaign.slots
+    text = Column(Text, nullable=False)
+    viral_score = Column(Float)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_campaign_drafts_campaign_slot", "campaign_id", "slot"),
+    )
+    
+    campaign = relationship("Campaign", back_populates="drafts")
\ No newline at end of file
@@ -1,9 +1,10 @@
-import google.generativeai as genai
 from typing import List, Dict, Optional
 import json
 import random
 
 from app.config import settings
+from app.services import ai_quota, resilience
+from app.services.monitoring import track_external_call
 
 
 class GeminiAIGenerator:
@@ -14,7 +15,17 @@ class GeminiAIGenerator:
     """
     
     def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
+        # Imported on first use: the SDK adds ~100ms+ to API and worker cold starts
+        import google.generativeai as genai
+        
+        if settings.GEMINI_API_ENDPOINT:
+            genai.configure(
+                api_key=api_key,
+                transport="rest",
+                client_options={"api_endpoint": settings.GEMINI_API_ENDPOINT}
+            )
+        else:
+            genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-pro')
     
     def generate_tweet_variants(
@@ -23,7 +34,9 @@ class GeminiAIGenerator:
         tone: str = "professional",
         num_variants: int = 3,
         include_hashtags: bool = True,
-        include_cta: bool = True
+        include_cta: bool = True,
+        priority: str = ai_quota.INTERACTIVE,
+        coalesce: bool = True
     ) -> List[Dict]:
         """
         Generate multiple tweet variants using Gemini
@@ -34,6 +47,8 @@ class GeminiAIGenerator:
             num_variants: Number of variants (1-5)
             include_hashtags: Add relevant hashtags
             include_cta: Add call-to-action
+            priority: ai_quota priority the call waits with
+            coalesce: Share the answer with identical calls in flight
             
         Returns:
             List of dicts with 'text' and 'viral_score'
@@ -42,12 +57,24 @@ class GeminiAIGenerator:
         prompt = self._build_prompt(topic, tone, num_variants, include_hashtags, include_cta)
         
         try:
-            response = self.model.generate_content(prompt)
-            variants = self._parse_response(response.text, num_variants)
+            # Fail fast while the breaker is open, before taking a quota slot
+            resilience.breaker("gemini", "generate_tweet_variants").check()
+            text = ai_quota.run(prompt, lambda: self._generate("generate_tweet_variants", prompt), priority, coalesce)
+            variants = self._parse_response(text, num_variants)
             return variants
+        except (ai_quota.QuotaError, resilience.Rejected):
+            raise
         except Exception as e:
             raise Exception(f"Gemini API error: {str(e)}")
     
+    def _generate(self, endpoint: str, prompt: str) -> str:
+        # The SDK takes no timeout: the bulkhead runs the call and stops waiting for it
+        return resilience.call("gemini", endpoint, lambda: self._call(endpoint, prompt), settings.GEMINI_TIMEOUT_SECONDS)
+    
+    def _call(self, endpoint: str, prompt: str) -> str:
+        with track_external_call("gemini", endpoint):
+            return self.model.generate_content(prompt).text
+    
     def _build_prompt(
         self, 
         topic: str, 
@@ -127,10 +154,59 @@ Respond with JSON:
 {{"sentiment": "positive/negative/neutral", "engagement_score": 0.75, "suggestions": "brief tip"}}"""
         
         try:
-            response = self.model.generate_content(prompt)
-            return json.loads(response.text)
-        except:
-            return {"sentiment": "neutral", "engagement_score": 0.5, "suggestions": "N/A"}
+            resilience.breaker("gemini", "analyze_tweet_sentiment").check()
+            text = ai_quota.run(prompt, lambda: self._generate("analyze_tweet_sentiment", prompt))
+        except (ai_quota.QuotaError, resilience.Rejected):
+            raise
+        except Exception as e:
+            raise Exception(f"Gemini API error: {str(e)}")
+        
+        start = text.find('{')
+        end = text.rfind('}') + 1
+        try:
+            return json.loads(text[start:end])
+        except ValueError:
+            raise Exception(f"Gemini returned no sentiment JSON: {text[:200]!r}")
+    
+    def score_sentiments(self, texts: List[str]) -> List[Optional[float]]:
+        """
+        Polarity (-1..1) of each text in one call
+        
+        Used to settle texts the local scorer is unsure about. Entries the
+        answer leaves out or garbles come back as None.
+        """
+        
+        numbered = "\n".join(f"{i}. {json.dumps(t)}" for i, t in enumerate(texts))
+        prompt = f"""Rate the sentiment of each tweet from -1 (very negative) to 1 (very positive).
+Account for sarcasm and mixed feelings.
+
+{numbered}
+
+Respond with a JSON array of numbers, one per tweet, in the same order."""
+        
+        try:
+            resilience.breaker("gemini", "score_sentiments").check()
+            text = ai_quota.run(prompt, lambda: self._generate("score_sentiments", prompt))
+        except (ai_quota.QuotaError, resilience.Rejected):
+            raise
+        except Exception as e:
+            raise Exception(f"Gemini API error: {str(e)}")
+        
+        start = text.find('[')
+        end = text.rfind(']') + 1
+        try:
+            scores = json.loads(text[start:end]) if start >= 0 else []
+        except ValueError:
+            scores = []
+        
+        polarities = []
+        for i in range(len(texts)):
+            score = scores[i] if i < len(scores) else None
+            if isinstance(score, (int, float)) and not isinstance(score, bool):
+                polarities.append(max(-1.0, min(1.0, float(score))))
+            else:
+                polarities.append(None)
+        return polarities
 
 
 def get_ai_generator(api_key: Optional[str] = None) -> GeminiAIGenerator:
@@ -0,0 +1,325 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import redis
+
+from app.config import settings
+from app.database import get_redis
+from app.services import monitoring, resilience
+
+logger = logging.getLogger(__name__)
+
+# Interactive calls (API requests) are admitted before background ones (campaign refills)
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = {INTERACTIVE: 0, BACKGROUND: 1}
+
+_PREFIX = "ai:quota:"
+_QUEUE = _PREFIX + "queue"  # Waiting tickets, ordered by (priority, arrival)
+_SEEN = _PREFIX + "seen"  # Last poll of each waiting ticket
+_WINDOW = _PREFIX + "window"  # Grants of the last 60 seconds
+_BACKGROUND_WINDOW = _PREFIX + "window:background"
+_DAY = _PREFIX + "day:"  # Grants per UTC day, e.g. ai:quota:day:20261019
+
+# Admits the ticket (0), tells it how long to wait at most before asking
+# again (milliseconds), or reports the daily budget spent (-1). Only the
+# head of the queue is ever admitted, so interactive tickets overtake
+# background ones already waiting.
+_ACQUIRE = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local ticket = ARGV[1]
+local background = ARGV[2] == '1'
+
+redis.call('ZADD', KEYS[1], 'NX', string.format('%.0f', tonumber(ARGV[3]) * 1e13 + now), ticket)
+redis.call('ZADD', KEYS[2], now, ticket)
+
+-- Forget tickets of waiters that stopped polling (crashed processes)
+for _, stale in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now - tonumber(ARGV[7]))) do
+    redis.call('ZREM', KEYS[1], stale)
+    redis.call('ZREM', KEYS[2], stale)
+end
+
+local used = tonumber(redis.call('GET', KEYS[5]) or '0')
+if used >= tonumber(background and ARGV[6] or ARGV[5]) then
+    redis.call('ZREM', KEYS[1], ticket)
+    redis.call('ZREM', KEYS[2], ticket)
+    return -1
+end
+
+if redis.call('ZRANGE', KEYS[1], 0, 0)[1] ~= ticket then
+    return 1000
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now - 60000)
+redis.call('ZREMRANGEBYSCORE', KEYS[4], '-inf', now - 60000)
+local wait = 0
+if redis.call('ZCARD', KEYS[3]) >= tonumber(ARGV[4]) then
+    wait = tonumber(redis.call('ZRANGE', KEYS[3], 0, 0, 'WITHSCORES')[2]) + 60000 - now
+end
+if background and redis.call('ZCARD', KEYS[4]) >= tonumber(ARGV[8]) then
+    wait = math.max(wait, tonumber(redis.call('ZRANGE', KEYS[4], 0, 0, 'WITHSCORES')[2]) + 60000 - now)
+end
+if wait > 0 then
+    return wait
+end
+
+redis.call('ZADD', KEYS[3], now, ticket)
+if background then
+    redis.call('ZADD', KEYS[4], now, ticket)
+end
+redis.call('INCR', KEYS[5])
+redis.call('EXPIRE', KEYS[5], 172800)
+redis.call('ZREM', KEYS[1], ticket)
+redis.call('ZREM', KEYS[2], ticket)
+return 0
+"""
+
+
+class QuotaError(Exception):
+    """A Gemini call was not admitted; retry after `retry_after` seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QuotaExhausted(QuotaError):
+    """The daily budget for this priority is spent"""
+
+
+class QuotaTimeout(QuotaError):
+    """The call waited longer than its priority allows"""
+
+
+def _seconds_to_midnight(now: datetime) -> float:
+    return 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+
+
+def _timeout(priority: str, timeout: Optional[float]) -> float:
+    """Longest wait for a slot: `timeout`, or the priority's default"""
+    if timeout is not None:
+        return timeout
+    if priority == INTERACTIVE:
+        return settings.AI_QUOTA_INTERACTIVE_TIMEOUT_SECONDS
+    return settings.AI_QUOTA_BACKGROUND_TIMEOUT_SECONDS
+
+
+def _follow_timeout(priority: str, timeout: Optional[float]) -> float:
+    """Longest wait for a coalesced call's result: the slot wait plus the call itself"""
+    return _timeout(priority, timeout) + settings.GEMINI_TIMEOUT_SECONDS
+
+
+def _follow_timed_out(priority: str, timeout: Optional[float]) -> QuotaTimeout:
+    monitoring.AI_QUOTA_REJECTED.labels(priority, "timeout").inc()
+    return QuotaTimeout(
+        f"No result from a coalesced Gemini call within {_follow_timeout(priority, timeout):.0f}s",
+        settings.AI_QUOTA_POLL_SECONDS
+    )
+
+
+def acquire(priority: str = INTERACTIVE, timeout: Optional[float] = None) -> float:
+    """
+    Wait for a Gemini call slot shared by every process
+
+    Slots are granted in priority order, at most GEMINI_REQUESTS_PER_MINUTE
+    in any 60 seconds (background calls at most CAMPAIGN_REFILL_RPM_SHARE
+    of them) and GEMINI_REQUESTS_PER_DAY per UTC day, of which
+    background calls may not use the last AI_QUOTA_INTERACTIVE_RESERVE.
+    Returns the seconds waited. If Redis is unreachable the call is let
+    through unmetered rather than failing.
+    """
+    timeout = _timeout(priority, timeout)
+    daily = settings.GEMINI_REQUESTS_PER_DAY
+    background_rpm = max(1, int(settings.GEMINI_REQUESTS_PER_MINUTE * settings.CAMPAIGN_REFILL_RPM_SHARE))
+    ticket = f"{PRIORITIES[priority]}:{uuid.uuid4().hex}"
+    stale_ms = int(max(5.0, settings.AI_QUOTA_POLL_SECONDS * 10) * 1000)
+
+    start = time.monotonic()
+    granted = False
+    waiting = monitoring.AI_QUOTA_WAITING.labels(priority)
+    waiting.inc()
+    try:
+        client = get_redis()
+        script = client.register_script(_ACQUIRE)
+        keys = [_QUEUE, _SEEN, _WINDOW, _BACKGROUND_WINDOW, _DAY + datetime.utcnow().strftime("%Y%m%d")]
+        while True:
+            result = script(keys=keys, args=[
+                ticket,
+                int(priority == BACKGROUND),
+                PRIORITIES[priority],
+                settings.GEMINI_REQUESTS_PER_MINUTE,
+                daily,
+                int(daily * (1 - settings.AI_QUOTA_INTERACTIVE_RESERVE)),
+                stale_ms,
+                background_rpm
+            ])
+            if result == 0:
+                granted = True
+                waited = time.monotonic() - start
+                monitoring.AI_QUOTA_WAIT.labels(priority).observe(waited)
+                return waited
+            if result < 0:
+                monitoring.AI_QUOTA_REJECTED.labels(priority, "daily_budget").inc()
+                raise QuotaExhausted(
+                    f"Daily Gemini budget for {priority} calls is spent",
+                    _seconds_to_midnight(datetime.utcnow())
+                )
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                monitoring.AI_QUOTA_REJECTED.labels(priority, "timeout").inc()
+                raise QuotaTimeout(f"No Gemini call slot within {timeout:.0f}s", result / 1000)
+            time.sleep(min(result / 1000, settings.AI_QUOTA_POLL_SECONDS, remaining))
+    except redis.RedisError as e:
+        logger.warning(f"AI quota unavailable, calling Gemini unmetered: {str(e)}")
+        monitoring.AI_QUOTA_REJECTED.labels(priority, "unmetered").inc()
+        return time.monotonic() - start
+    finally:
+        waiting.dec()
+        if not granted:
+            _forget(ticket)
+
+
+def _forget(ticket: str) -> None:
+    try:
+        get_redis().pipeline(transaction=False).zrem(_QUEUE, ticket).zrem(_SEEN, ticket).execute()
+    except redis.RedisError:
+        pass
+
+
+class _Flight:
+    __slots__ = ("priority", "done", "result", "error")
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def run(
+    prompt: str,
+    call: Callable[[], str],
+    priority: str = INTERACTIVE,
+    coalesce: bool = True,
+    timeout: Optional[float] = None
+) -> str:
+    """
+    Run a Gemini call returning text under the shared quota
+
+    With `coalesce`, concurrent calls with the same prompt share one
+    provider call: within a process through a shared future, across
+    processes through a Redis lock and a result kept for
+    AI_QUOTA_RESULT_TTL_SECONDS. Calls that want a fresh answer for a
+    repeated prompt (e.g. more drafts for the same slot) pass
+    coalesce=False.
+
+    A coalesced caller waits at most its own slot timeout plus
+    GEMINI_TIMEOUT_SECONDS, then raises QuotaTimeout. Interactive calls
+    never wait on a background call (which may queue for minutes): they
+    call on their own at their own priority.
+    """
+    if not coalesce:
+        acquire(priority, timeout)
+        return call()
+
+    key = hashlib.sha256(prompt.encode()).hexdigest()
+    with _flights_lock:
+        flight = _flights.get(key)
+        behind_background = flight is not None and priority == INTERACTIVE and flight.priority == BACKGROUND
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight(priority)
+
+    if behind_background:
+        acquire(priority, timeout)
+        return call()
+
+    if not leader:
+        monitoring.AI_CALLS_COALESCED.labels("process").inc()
+        if not flight.done.wait(_follow_timeout(priority, timeout)):
+            raise _follow_timed_out(priority, timeout)
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _run_shared(key, call, priority, timeout)
+        return flight.result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def _run_shared(key: str, call: Callable[[], str], priority: str, timeout: Optional[float]) -> str:
+    """Single flight across processes; falls back to a plain call without Redis"""
+    lock_key = f"ai:flight:{key}"
+    result_key = f"ai:flight:{key}:result"
+    # The lock names the holder's priority, so interactive callers can tell
+    # a background holder apart
+    token = f"{priority}:{uuid.uuid4().hex}"
+    deadline = time.monotonic() + _follow_timeout(priority, timeout)
+    try:
+        client = get_redis()
+        while True:
+            cached = client.get(result_key)
+            if cached is not None:
+                monitoring.AI_CALLS_COALESCED.labels("redis").inc()
+                outcome = json.loads(cached)
+                if "error" in outcome:
+                    raise Exception(outcome["error"])
+                return outcome["text"]
+            if client.set(lock_key, token, nx=True, ex=settings.AI_QUOTA_FLIGHT_TTL_SECONDS):
+                break
+            # Another process is calling with this prompt; its result lands in result_key
+            holder = client.get(lock_key)
+            if priority == INTERACTIVE and holder is not None and holder.decode().startswith(f"{BACKGROUND}:"):
+                # A background holder may queue for minutes: call on our own
+                client = None
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise _follow_timed_out(priority, timeout)
+            time.sleep(min(settings.AI_QUOTA_POLL_SECONDS, remaining))
+    except redis.RedisError as e:
+        logger.warning(f"AI single-flight unavailable, calling directly: {str(e)}")
+        client = None
+
+    if client is None:
+        acquire(priority, timeout)
+        return call()
+
+    outcome = None
+    try:
+        acquire(priority, timeout)
+        text = call()
+        outcome = {"text": text}
+        return text
+    except (QuotaError, resilience.Rejected):
+        # Not shared: waiting callers try for a slot themselves
+        raise
+    except Exception as e:
+        outcome = {"error": str(e)}
+        raise
+    finally:
+        try:
+            if outcome is not None:
+                client.set(result_key, json.dumps(outcome), ex=settings.AI_QUOTA_RESULT_TTL_SECONDS)
+            if client.get(lock_key) == token.encode():
+                client.delete(lock_key)
+        except redis.RedisError:
+            pass
@@ -0,0 +1,363 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Type
+
+import redis
+from sqlalchemy import DateTime, event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app import models
+from app.config import settings
+from app.database import get_redis
+from app.services import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Cached models and their key names: user:42, campaign:7, campaign:user:42
+MODELS = {models.User: "user", models.Tweet: "tweet", models.Campaign: "campaign"}
+# Models also cached as per-user lists, invalidated through the row's user_id
+LISTED = {models.Campaign}
+# Credentials never leave the database: these columns are left unloaded on
+# cached rows and load from the session on first access
+UNCACHED_COLUMNS = {models.User: {"api_key"}}
+
+_PREFIX = "cache:"
+_CHANNEL = "cache:invalidate"
+# Stored for a while after an invalidation so that a read which raced the
+# write (loaded before the commit, fills after it) cannot put the old row back
+_GUARD = "-"
+
+
+def key(model: Type, pk) -> str:
+    return f"{MODELS[model]}:{pk}"
+
+
+def list_key(model: Type, user_id: int) -> str:
+    return f"{MODELS[model]}:user:{user_id}"
+
+
+def username_key(username: str) -> str:
+    return f"user:username:{username}"
+
+
+def _guard_seconds() -> float:
+    # Fills may come from the replica, which can lag the commit by up to REPLICA_MAX_LAG_SECONDS
+    if settings.DATABASE_REPLICA_URL:
+        return max(settings.CACHE_FILL_GUARD_SECONDS, settings.REPLICA_MAX_LAG_SECONDS)
+    return settings.CACHE_FILL_GUARD_SECONDS
+
+
+def _model_of(cache_key: str) -> str:
+    return cache_key.split(":", 1)[0]
+
+
+class _LocalCache:
+    """Thread-safe LRU of encoded values with per-entry expiry"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cache_key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            return entry[0]
+
+    def fill(self, cache_key: str, value: str, ttl: float) -> None:
+        """Store unless a guard (recent invalidation) is in place"""
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] == _GUARD and entry[1] >= time.monotonic():
+                return
+            self._entries[cache_key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def guard(self, cache_keys: Iterable[str]) -> None:
+        expires = time.monotonic() + _guard_seconds()
+        with self._lock:
+            for cache_key in cache_keys:
+                self._entries[cache_key] = (_GUARD, expires)
+                self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_local = _LocalCache(settings.CACHE_LOCAL_SIZE)
+
+
+class _Invalidations:
+    """
+    Subscription to the invalidation channel, one thread per process
+
+    The local tier is only read while the subscription is up: without it
+    this process would not hear about writes made elsewhere. It is
+    cleared on every (re)connect, since messages may have been missed.
+    """
+
+    def __init__(self):
+        self.live = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="cache-invalidations", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        backoff = 1.0
+        while True:
+            try:
+                # Own client: the shared one's socket timeout would end a blocking listen
+                client = redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=2, health_check_interval=30)
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(_CHANNEL)
+                _local.clear()
+                self.live = True
+                backoff = 1.0
+                for message in pubsub.listen():
+                    _drop_local(json.loads(message["data"]))
+            except Exception as e:
+                logger.warning(f"Cache invalidation feed lost, local cache off for {backoff:.0f}s: {str(e)}")
+            self.live = False
+            _local.clear()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
+_invalidations = _Invalidations()
+# After a Redis error the shared tier is skipped this long, so an outage costs one timeout, not one per read
+_redis_down_until = 0.0
+
+
+def _redis() -> Optional[redis.Redis]:
+    if time.monotonic() < _redis_down_until:
+        return None
+    return get_redis()
+
+
+def _redis_failed(e: Exception) -> None:
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + settings.CACHE_REDIS_RETRY_SECONDS
+    logger.warning(f"Cache Redis tier unavailable: {str(e)}")
+
+
+def _lookup(cache_key: str) -> Optional[str]:
+    """Encoded value from the local tier, then Redis; None on a miss"""
+    model = _model_of(cache_key)
+    _invalidations.ensure_started()
+    if _invalidations.live:
+        value = _local.get(cache_key)
+        if value is not None and value != _GUARD:
+            monitoring.CACHE_REQUESTS.labels(model, "local").inc()
+            return value
+
+    client = _redis()
+    if client is not None:
+        try:
+            value = client.get(_PREFIX + cache_key)
+        except redis.RedisError as e:
+            _redis_failed(e)
+        else:
+            if value is not None and value.decode() != _GUARD:
+                value = value.decode()
+                if _invalidations.live:
+                    _local.fill(cache_key, value, settings.CACHE_LOCAL_TTL_SECONDS)
+                monitoring.CACHE_REQUESTS.labels(model, "redis").inc()
+                return value
+
+    monitoring.CACHE_REQUESTS.labels(model, "miss").inc()
+    return None
+
+
+def _fill(cache_key: str, value: str) -> None:
+    client = _redis()
+    if client is None:
+        return
+    try:
+        # NX: a guard left by a recent invalidation wins
+        stored = client.set(_PREFIX + cache_key, value, ex=settings.CACHE_TTL_SECONDS, nx=True)
+    except redis.RedisError as e:
+        _redis_failed(e)
+        return
+    if stored and _invalidations.live:
+        _local.fill(cache_key, value, settings.CACHE_LOCAL_TTL_SECONDS)
+
+
+def _encode_row(obj) -> Dict:
+    row = {}
+    uncached = UNCACHED_COLUMNS.get(type(obj), set())
+    for column in obj.__mapper__.column_attrs:
+        if column.key in uncached:
+            continue
+        value = getattr(obj, column.key)
+        row[column.key] = value.isoformat() if isinstance(value, datetime) else value
+    return row
+
+
+def _decode_row(model: Type, row: Dict):
+    for column in model.__mapper__.columns:
+        if isinstance(column.type, DateTime) and row.get(column.key) is not None:
+            row[column.key] = datetime.fromisoformat(row[column.key])
+    obj = model(**row)
+    make_transient_to_detached(obj)
+    return obj
+
+
+def get(db: Session, model: Type, pk: int):
+    """
+    Row by primary key, read through the cache
+
+    Returns an instance attached to `db` without a query on a hit (it
+    behaves like a loaded row: changes to it are flushed as usual), or
+    None if the row does not exist. Misses are not cached.
+    """
+    if not settings.CACHE_ENABLED:
+        return db.get(model, pk)
+
+    cache_key = key(model, pk)
+    value = _lookup(cache_key)
+    if value is not None:
+        return db.merge(_decode_row(model, json.loads(value)), load=False)
+
+    obj = db.get(model, pk)
+    if obj is not None:
+        _fill(cache_key, json.dumps(_encode_row(obj)))
+    return obj
+
+
+def get_list(db: Session, model: Type, user_id: int, load: Callable[[], List]) -> List:
+    """A user's rows of a LISTED model, read through the cache; `load` queries them on a miss"""
+    if not settings.CACHE_ENABLED:
+        return load()
+
+    cache_key = list_key(model, user_id)
+    value = _lookup(cache_key)
+    if value is not None:
+        return [db.merge(_decode_row(model, row), load=False) for row in json.loads(value)]
+
+    rows = load()
+    _fill(cache_key, json.dumps([_encode_row(obj) for obj in rows]))
+    return rows
+
+
+def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
+    """User by username, for token authentication (usernames never change)"""
+    if not settings.CACHE_ENABLED:
+        return db.query(models.User).filter(models.User.username == username).first()
+
+    cache_key = username_key(username)
+    value = _lookup(cache_key)
+    if value is not None:
+        return get(db, models.User, int(value))
+
+    user = db.query(models.User).filter(models.User.username == username).first()
+    if user is not None:
+        _fill(cache_key, str(user.id))
+        _fill(key(models.User, user.id), json.dumps(_encode_row(user)))
+    return user
+
+
+def _drop_local(cache_keys: Iterable[str]) -> None:
+    cache_keys = list(cache_keys)
+    if any(cache_key.endswith(":*") for cache_key in cache_keys):
+        _local.clear()
+    _local.guard(cache_key for cache_key in cache_keys if not cache_key.endswith(":*"))
+
+
+def invalidate(cache_keys: Optional[Set[str]]) -> None:
+    """
+    Drop keys from every process's local tier and from Redis
+
+    "<model>:*" drops every cached row of a model; it is only needed
+    for criteria-based bulk writes, whose rows are unknown.
+    """
+    if not cache_keys:
+        return
+
+    _drop_local(cache_keys)
+    for cache_key in cache_keys:
+        monitoring.CACHE_INVALIDATIONS.labels(_model_of(cache_key)).inc()
+    client = _redis()
+    if client is None:
+        return
+    try:
+        guarded = {cache_key for cache_key in cache_keys if not cache_key.endswith(":*")}
+        for cache_key in cache_keys - guarded:
+            for redis_key in client.scan_iter(match=_PREFIX + cache_key, count=1000):
+                guarded.add(redis_key.decode()[len(_PREFIX):])
+        pipe = client.pipeline(transaction=False)
+        for cache_key in guarded:
+            pipe.set(_PREFIX + cache_key, _GUARD, px=int(_guard_seconds() * 1000))
+        pipe.publish(_CHANNEL, json.dumps(sorted(cache_keys)))
+        pipe.execute()
+    except redis.RedisError as e:
+        _redis_failed(e)
+
+
+def _pending(session: Session) -> Set[str]:
+    return session.info.setdefault("cache_invalidate", set())
+
+
+def _keys_of(obj) -> Set[str]:
+    model = type(obj)
+    keys = {key(model, obj.id)}
+    if model in LISTED and obj.user_id is not None:
+        keys.add(list_key(model, obj.user_id))
+    return keys
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session: Session, flush_context) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if type(obj) in MODELS:
+            _pending(session).update(_keys_of(obj))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk(orm_execute_state) -> None:
+    """Bulk UPDATE/DELETE statements never mark instances dirty"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    model = mapper.class_ if mapper is not None else None
+    if model not in MODELS:
+        return
+
+    params = orm_execute_state.parameters
+    rows = params if isinstance(params, list) else None
+    if rows and all("id" in row for row in rows) and model not in LISTED:
+        _pending(orm_execute_state.session).update(key(model, row["id"]) for row in rows)
+    else:
+        # Criteria-based: the rows are unknown, so nothing of the model may be served stale
+        _pending(orm_execute_state.session).add(f"{MODELS[model]}:*")
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    invalidate(session.info.pop("cache_invalidate", None))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop("cache_invalidate", None)
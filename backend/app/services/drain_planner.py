@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from app import models
+from app.config import settings
+from app.services.recurrence import to_utc_naive
+
+# Drain order within a user's backlog: lower first, then most overdue first
+PRIORITY_RESUMED = 0  # Queued/retrying tweets whose task was lost; already promised once
+PRIORITY_MANUAL = 1  # Scheduled by hand
+PRIORITY_CAMPAIGN = 2  # Generated for a campaign slot
+
+
+def priority(tweet: models.Tweet) -> int:
+    if tweet.status in ("queued", "retrying"):
+        return PRIORITY_RESUMED
+    if tweet.campaign_id is None:
+        return PRIORITY_MANUAL
+    return PRIORITY_CAMPAIGN
+
+
+def spacing() -> float:
+    """Seconds between drained posts of one user"""
+    return 3600.0 / max(1.0, settings.MAX_POSTS_PER_HOUR * settings.DRAIN_RATE_SHARE)
+
+
+def needs_drain(due: int, drain_until: Optional[datetime]) -> bool:
+    """
+    Whether a user's due tweets go through a drain plan
+
+    Yes for a backlog above DRAIN_BACKLOG_THRESHOLD, and for any tweet
+    that falls due while an earlier drain is still running, so it queues
+    behind the drain instead of bursting past it.
+    """
+    return drain_until is not None or due > settings.DRAIN_BACKLOG_THRESHOLD
+
+
+def plan(
+    tweets: Sequence[models.Tweet],
+    now: datetime,
+    posted_last_hour: int = 0,
+    drain_until: Optional[datetime] = None,
+    not_before: Optional[datetime] = None
+) -> List[Tuple[models.Tweet, datetime]]:
+    """
+    Posting time for each of one user's due tweets
+
+    Tweets are ordered by priority and then by lateness, and spaced
+    `spacing()` apart. That is DRAIN_RATE_SHARE of MAX_POSTS_PER_HOUR,
+    and the rest is left for "post now" requests. The first slot waits
+    out the user's posts of the last hour beyond that headroom or, while
+    a drain is running, follows its last slot (`drain_until`; those posts
+    are the drain's own and already paced), and waits out a rate-limit
+    cooldown (`not_before`). The last slot is the projected catch-up time.
+    """
+    gap = spacing()
+    headroom = settings.MAX_POSTS_PER_HOUR - 3600.0 / gap
+    if drain_until is not None:
+        start = drain_until + timedelta(seconds=gap)
+    else:
+        start = now + timedelta(seconds=gap * max(0.0, posted_last_hour - headroom))
+    if not_before is not None:
+        start = max(start, not_before)
+
+    ordered = sorted(
+        tweets,
+        key=lambda tweet: (priority(tweet), to_utc_naive(tweet.scheduled_at or tweet.next_attempt_at or now), tweet.id)
+    )
+    return [(tweet, start + timedelta(seconds=gap * i)) for i, tweet in enumerate(ordered)]
@@ -0,0 +1,275 @@
+"""
+Streaming export of a user's tweets and metric history
+
+    cd backend && python -m app.services.export --user alice --dataset metrics --format csv -o metrics.csv
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app import models
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+DATASETS = {
+    "tweets": (
+        models.Tweet.id,
+        models.Tweet.tweet_id_twitter,
+        models.Tweet.text,
+        models.Tweet.status,
+        models.Tweet.created_at,
+        models.Tweet.scheduled_at,
+        models.Tweet.posted_at,
+        models.Tweet.campaign_id,
+        models.Tweet.generated_by_ai,
+        models.Tweet.viral_score,
+    ),
+    "metrics": (
+        models.Metric.tweet_id,
+        models.Tweet.tweet_id_twitter,
+        models.Metric.timestamp,
+        models.Metric.likes,
+        models.Metric.retweets,
+        models.Metric.replies,
+        models.Metric.impressions,
+        models.Metric.engagement_rate,
+    ),
+}
+
+
+def check_format(fmt: str) -> None:
+    """Raise ValueError for an unknown format, or parquet without pyarrow"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet export needs pyarrow installed")
+
+
+def query(
+    dataset: str,
+    user_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    campaign_id: Optional[int] = None
+):
+    """
+    Column-only SELECT for a dataset, ordered for stable output
+
+    Time bounds apply to posted_at for tweets and to the snapshot
+    timestamp for metrics, which lets Postgres prune metric partitions.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset {dataset!r}, expected one of {', '.join(DATASETS)}")
+
+    stmt = select(*DATASETS[dataset]).where(models.Tweet.user_id == user_id)
+    if dataset == "metrics":
+        stmt = stmt.join(models.Tweet, models.Tweet.id == models.Metric.tweet_id)
+        time_column = models.Metric.timestamp
+        stmt = stmt.order_by(models.Metric.tweet_id, models.Metric.timestamp)
+    else:
+        time_column = models.Tweet.posted_at
+        stmt = stmt.order_by(models.Tweet.id)
+
+    if since is not None:
+        stmt = stmt.where(time_column >= since)
+    if until is not None:
+        stmt = stmt.where(time_column < until)
+    if campaign_id is not None:
+        stmt = stmt.where(models.Tweet.campaign_id == campaign_id)
+    return stmt
+
+
+def columns(dataset: str) -> List[str]:
+    return [column.key for column in DATASETS[dataset]]
+
+
+def iter_rows(db: Session, stmt) -> Iterator[Sequence[Sequence]]:
+    """
+    Batches of EXPORT_BATCH_ROWS row tuples from a server-side cursor
+
+    Only one batch is held in memory at a time.
+    """
+    result = db.execute(stmt.execution_options(yield_per=settings.EXPORT_BATCH_ROWS))
+    try:
+        for batch in result.partitions():
+            yield batch
+    finally:
+        result.close()
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def write_csv(dataset: str, batches: Iterable[Sequence[Sequence]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns(dataset))
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def write_ndjson(dataset: str, batches: Iterable[Sequence[Sequence]]) -> Iterator[bytes]:
+    names = columns(dataset)
+    dumps = json.JSONEncoder(default=_json_value, separators=(",", ":")).encode
+    for batch in batches:
+        yield "".join(
+            dumps(dict(zip(names, map(_json_value, row)))) + "\n" for row in batch
+        ).encode()
+
+
+class _Chunks(io.RawIOBase):
+    """Write-only file collecting what pyarrow writes, drained between row groups"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_schema(dataset: str):
+    """Arrow types from the column types, so all-NULL batches still match"""
+    import pyarrow as pa
+
+    fields = []
+    for column in DATASETS[dataset]:
+        column_type = column.type
+        if isinstance(column_type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column_type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column_type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column_type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.key, arrow_type))
+    return pa.schema(fields)
+
+
+def write_parquet(dataset: str, batches: Iterable[Sequence[Sequence]]) -> Iterator[bytes]:
+    """One row group per batch; pyarrow is imported only when used"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(dataset)
+    sink = _Chunks()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array([row[index] for row in batch], type=field.type) for index, field in enumerate(schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        # Writes the footer; an export with no rows is still a valid file
+        writer.close()
+    yield sink.drain()
+
+
+WRITERS: Dict[str, Callable[[str, Iterable[Sequence[Sequence]]], Iterator[bytes]]] = {
+    "csv": write_csv,
+    "ndjson": write_ndjson,
+    "parquet": write_parquet,
+}
+
+
+def stream(
+    session_factory: Callable[[], Session],
+    dataset: str,
+    fmt: str,
+    user_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    campaign_id: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Encoded export chunks, one per batch of rows
+
+    Opens its own session so the export can outlive the request handler
+    (StreamingResponse iterates after the endpoint returns).
+    """
+    stmt = query(dataset, user_id, since, until, campaign_id)
+    db = session_factory()
+    try:
+        yield from WRITERS[fmt](dataset, iter_rows(db, stmt))
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a user's tweets or metric history")
+    parser.add_argument("--user", required=True, help="username")
+    parser.add_argument("--dataset", choices=list(DATASETS), default="metrics")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv")
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    parser.add_argument("--campaign", type=int)
+    parser.add_argument("-o", "--output", help="file to write (default stdout)")
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+
+    try:
+        check_format(args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    db = SessionLocal()
+    try:
+        user_id = db.query(models.User.id).filter(models.User.username == args.user).scalar()
+    finally:
+        db.close()
+    if user_id is None:
+        parser.error(f"unknown user {args.user!r}")
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in stream(SessionLocal, args.dataset, args.format, user_id, args.since, args.until, args.campaign):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app import models
+from app.services.recurrence import to_utc_naive
+
+DAYS = 7
+HOURS = 24
+CELLS = DAYS * HOURS
+
+
+def cell_of(value: datetime) -> int:
+    """Hour-of-week cell of a time (UTC), Monday 00:00 first"""
+    value = to_utc_naive(value)
+    return value.weekday() * HOURS + value.hour
+
+
+def decay(seconds: float) -> float:
+    """Weight left after `seconds` with a HEATMAP_HALF_LIFE_DAYS half-life"""
+    return 0.5 ** (max(0.0, seconds) / (settings.HEATMAP_HALF_LIFE_DAYS * 86400))
+
+
+class HeatmapDeltas:
+    """
+    Engagement changes collected during a sweep, applied with apply()
+
+    Each observation is weighted by the tweet's age, so a cell reflects
+    recent tweets more than old ones.
+    """
+
+    def __init__(self, now: datetime):
+        self.now = now
+        self.engagement: Dict[int, List[float]] = defaultdict(lambda: [0.0] * CELLS)
+        self.tweets: Dict[int, List[float]] = defaultdict(lambda: [0.0] * CELLS)
+
+    def add(self, user_id: int, posted_at: datetime, engagement: float, previous: Optional[float]) -> None:
+        """Record a tweet's engagement; `previous` is what was counted before (None if never)"""
+        weight = decay((self.now - to_utc_naive(posted_at)).total_seconds())
+        cell = cell_of(posted_at)
+        self.engagement[user_id][cell] += weight * (engagement - (previous or 0))
+        if previous is None:
+            self.tweets[user_id][cell] += weight
+
+    def __bool__(self) -> bool:
+        return bool(self.engagement)
+
+
+def load(db: Session, user_ids: Iterable[int], for_update: bool = False) -> Dict[int, models.EngagementHeatmap]:
+    """Heatmaps of several users in one query"""
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return {}
+    query = db.query(models.EngagementHeatmap).filter(models.EngagementHeatmap.user_id.in_(user_ids))
+    if for_update:
+        query = query.with_for_update()
+    return {heatmap.user_id: heatmap for heatmap in query}
+
+
+def apply(db: Session, deltas: HeatmapDeltas) -> None:
+    """
+    Add collected deltas to the users' heatmaps; the caller commits
+
+    Stored values are decayed to `deltas.now` first, so they stay
+    comparable however long ago the row was last updated.
+    """
+    if not deltas:
+        return
+
+    heatmaps = load(db, deltas.engagement, for_update=True)
+    for user_id, engagement in deltas.engagement.items():
+        heatmap = heatmaps.get(user_id)
+        if heatmap is None:
+            heatmap = _create(db, user_id, deltas.now)
+
+        factor = decay((deltas.now - to_utc_naive(heatmap.updated_at)).total_seconds())
+        # Assign new lists so the JSON columns are flagged as changed
+        heatmap.engagement = [
+            stored * factor + delta for stored, delta in zip(heatmap.engagement, engagement)
+        ]
+        heatmap.tweets = [
+            stored * factor + delta for stored, delta in zip(heatmap.tweets, deltas.tweets[user_id])
+        ]
+        heatmap.updated_at = deltas.now
+
+
+def _create(db: Session, user_id: int, now: datetime) -> models.EngagementHeatmap:
+    heatmap = models.EngagementHeatmap(
+        user_id=user_id, engagement=[0.0] * CELLS, tweets=[0.0] * CELLS, updated_at=now
+    )
+    try:
+        with db.begin_nested():
+            db.add(heatmap)
+    except IntegrityError:
+        # Created concurrently by another sweep
+        heatmap = db.query(models.EngagementHeatmap).filter(
+            models.EngagementHeatmap.user_id == user_id
+        ).with_for_update().one()
+    return heatmap
+
+
+def _mean(heatmap: Optional[models.EngagementHeatmap]) -> Optional[float]:
+    """Average engagement per tweet over all cells, None without data"""
+    if heatmap is None:
+        return None
+    total_tweets = sum(heatmap.tweets)
+    if total_tweets <= 0:
+        return None
+    return sum(heatmap.engagement) / total_tweets
+
+
+def scores(heatmap: Optional[models.EngagementHeatmap]) -> List[Optional[float]]:
+    """
+    Expected engagement per tweet for each cell, None where nothing was posted
+
+    Cells are shrunk towards the user's overall average by
+    HEATMAP_PRIOR_TWEETS pseudo-tweets, so one lucky tweet does not make
+    an hour the best. Decay scales every cell equally, so scores are
+    read as stored.
+    """
+    mean = _mean(heatmap)
+    if mean is None:
+        return [None] * CELLS
+
+    prior = settings.HEATMAP_PRIOR_TWEETS
+    return [
+        (engagement + mean * prior) / (tweets + prior) if tweets > 0 else None
+        for engagement, tweets in zip(heatmap.engagement, heatmap.tweets)
+    ]
+
+
+def best_cells(heatmap: Optional[models.EngagementHeatmap], limit: int) -> List[Dict]:
+    """Top cells as {"day", "hour", "avg_engagement"}, day 0 being Monday"""
+    ranked = sorted(
+        ((score, cell) for cell, score in enumerate(scores(heatmap)) if score is not None),
+        key=lambda item: (-item[0], item[1])
+    )
+    return [
+        {"day": cell // HOURS, "hour": cell % HOURS, "avg_engagement": score}
+        for score, cell in ranked[:limit]
+    ]
+
+
+def grid(values: List) -> List[List]:
+    """168 cells as 7 rows (Monday first) of 24 hours"""
+    return [values[day * HOURS:(day + 1) * HOURS] for day in range(DAYS)]
+
+
+def hour_start(value: datetime) -> datetime:
+    return to_utc_naive(value).replace(minute=0, second=0, microsecond=0)
+
+
+def place(
+    heatmap: Optional[models.EngagementHeatmap],
+    start: datetime,
+    window_hours: int,
+    taken: Set[datetime]
+) -> Optional[datetime]:
+    """
+    Best open time in [start, start + window_hours)
+
+    Candidates are `start` and the same minute of each following hour;
+    hours already in `taken` (hour starts) are skipped. Hours never
+    posted in count as the user's average. Returns None if the heatmap
+    has no data or every hour is taken.
+    """
+    mean = _mean(heatmap)
+    if mean is None:
+        return None
+
+    cell_scores = scores(heatmap)
+    best = None
+    best_score = None
+    for offset in range(window_hours):
+        candidate = to_utc_naive(start) + timedelta(hours=offset)
+        if hour_start(candidate) in taken:
+            continue
+        score = cell_scores[cell_of(candidate)]
+        if score is None:
+            score = mean
+        if best_score is None or score > best_score:
+            best, best_score = candidate, score
+    return best
+
+
+def rebuild(db: Session, user_id: int, now: datetime) -> int:
+    """
+    Recompute a user's heatmap from stored metrics; the caller commits
+
+    Each posted tweet counts with its highest engagement snapshot. Used
+    to seed heatmaps for existing data and after HEATMAP_* changes.
+    Returns the number of tweets counted.
+    """
+    engagement = func.max(models.Metric.likes + models.Metric.retweets + models.Metric.replies)
+    rows = db.query(models.Tweet.id, models.Tweet.posted_at, engagement).join(
+        models.Metric, models.Metric.tweet_id == models.Tweet.id
+    ).filter(
+        models.Tweet.user_id == user_id,
+        models.Tweet.posted_at.isnot(None)
+    ).group_by(models.Tweet.id, models.Tweet.posted_at).all()
+
+    db.query(models.EngagementHeatmap).filter(models.EngagementHeatmap.user_id == user_id).delete()
+    deltas = HeatmapDeltas(now)
+    for _, posted_at, total in rows:
+        deltas.add(user_id, posted_at, total or 0, None)
+    if rows:
+        db.execute(update(models.Tweet), [{"id": tweet_id, "heatmap_engagement": total or 0} for tweet_id, _, total in rows])
+    apply(db, deltas)
+    return len(rows)
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Set
+
+import redis
+
+from app.config import settings
+from app.database import get_redis
+from app.services import monitoring
+
+logger = logging.getLogger(__name__)
+
+# One channel per user: live:user:42
+CHANNEL_PREFIX = "live:user:"
+
+
+def channel(user_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{user_id}"
+
+
+def encode(message: Dict) -> str:
+    return json.dumps(message, separators=(",", ":"), default=str)
+
+
+def publish(messages: Dict[int, Dict]) -> None:
+    """
+    Publish one message per user, all in a single Redis round trip
+
+    When Redis is unreachable the messages go to this process's hub
+    instead, which reaches dashboards connected to the same process
+    (single-process deployments, eager Celery).
+    """
+    if not messages:
+        return
+
+    payloads = {user_id: encode(message) for user_id, message in messages.items()}
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for user_id, payload in payloads.items():
+            pipe.publish(channel(user_id), payload)
+        pipe.execute()
+        monitoring.LIVE_UPDATES_PUBLISHED.labels("redis").inc(len(payloads))
+    except redis.RedisError as e:
+        logger.warning(f"Live update publish failed, delivering in-process: {str(e)}")
+        for user_id, payload in payloads.items():
+            hub.deliver_threadsafe(user_id, payload)
+        monitoring.LIVE_UPDATES_PUBLISHED.labels("local").inc(len(payloads))
+
+
+class LiveHub:
+    """
+    Fan-out of live updates to the WebSocket/SSE sessions of this process
+
+    A single Redis pattern subscription per process feeds every session;
+    each session has a bounded queue, and a session that falls behind
+    loses its oldest updates rather than holding memory.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._loop = None
+        self._listener = None
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        self._loop = asyncio.get_running_loop()
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+        queue = asyncio.Queue(maxsize=settings.LIVE_QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+        monitoring.LIVE_SESSIONS.inc()
+        try:
+            yield queue
+        finally:
+            monitoring.LIVE_SESSIONS.dec()
+            self._subscribers[user_id].discard(queue)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def deliver(self, user_id: int, payload: str) -> None:
+        """Queue a payload for every session of the user (event loop thread only)"""
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                queue.get_nowait()
+                monitoring.LIVE_UPDATES_DROPPED.inc()
+            queue.put_nowait(payload)
+
+    def deliver_threadsafe(self, user_id: int, payload: str) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self.deliver, user_id, payload)
+
+    async def _listen(self):
+        """Relay the live:user:* channels to local sessions, reconnecting with backoff"""
+        import redis.asyncio as aioredis
+
+        backoff = 1.0
+        while True:
+            client = aioredis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=2)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                    backoff = 1.0
+                    async for message in pubsub.listen():
+                        if message["type"] != "pmessage":
+                            continue
+                        user_id = int(message["channel"].decode()[len(CHANNEL_PREFIX):])
+                        self.deliver(user_id, message["data"].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Live update subscription lost, retrying in {backoff:.0f}s: {str(e)}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                await client.aclose()
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+hub = LiveHub()
+
+
+def metrics_message(now, tweets: List[Dict], engagement_delta: int) -> Dict:
+    """Update for one user's sweep: new counts per tweet and the change in total engagement"""
+    return {
+        "type": "metrics",
+        "at": now.isoformat(),
+        "tweets": tweets,
+        "totals": {"tweets": len(tweets), "engagement_delta": engagement_delta},
+    }
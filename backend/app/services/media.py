@@ -0,0 +1,291 @@
+import hashlib
+import ipaddress
+import logging
+import mimetypes
+import os
+import socket
+import tempfile
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from urllib.parse import SplitResult, urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app import models
+from app.services.recurrence import to_utc_naive
+
+logger = logging.getLogger(__name__)
+
+
+class MediaError(Exception):
+    """A media source that cannot be fetched or is not allowed"""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        # Only download timeouts and 5xx are worth retrying; a bad URL,
+        # a missing file or an oversized asset is not
+        self.retryable = retryable
+
+
+def is_provider_media_id(link: str) -> bool:
+    """Older tweets stored provider media IDs directly in media_links"""
+    return link.isdigit()
+
+
+def _resolve_public(url: str) -> Tuple[SplitResult, str]:
+    """
+    Parse a media URL and resolve its host to a public address
+
+    Users choose these URLs, and whatever the worker fetches is published
+    to their account, so anything that resolves to a loopback, private,
+    link-local or otherwise non-public address (cloud metadata, Redis,
+    the database) is refused.
+
+    Returns:
+        (parsed URL, an address to connect to)
+    """
+    parts = urlsplit(url)
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise MediaError(f"Invalid media URL: {url}")
+    if parts.scheme not in ("http", "https") or not parts.hostname or parts.username or parts.password:
+        raise MediaError(f"Unsupported media URL: {url}")
+
+    try:
+        infos = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise MediaError(f"Cannot resolve media host {parts.hostname}: {str(e)}", retryable=e.errno == socket.EAI_AGAIN)
+
+    addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+    if not addresses or any(not address.is_global or address.is_multicast for address in addresses):
+        raise MediaError(f"Media host {parts.hostname} is not a public address")
+    return parts, str(addresses[0])
+
+
+class _PinnedAdapter(HTTPAdapter):
+    """HTTPS to a resolved address, with SNI and certificate checks for the URL's host"""
+
+    def __init__(self, hostname: str):
+        self.hostname = hostname
+        super().__init__()
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, server_hostname=self.hostname, assert_hostname=self.hostname, **kwargs)
+
+
+def _get_public(url: str) -> requests.Response:
+    """
+    GET a media URL, connecting only to the address vetted for it
+
+    The connection goes to the resolved address rather than the name, so
+    DNS cannot switch to an internal address between the check and the
+    request. Redirects are followed here, each hop checked the same way.
+    """
+    for _ in range(settings.MEDIA_MAX_REDIRECTS + 1):
+        parts, address = _resolve_public(url)
+        host = f"[{address}]" if ":" in address else address
+        pinned = parts._replace(netloc=f"{host}:{parts.port}" if parts.port else host).geturl()
+
+        session = requests.Session()
+        session.mount("https://", _PinnedAdapter(parts.hostname))
+        response = session.get(
+            pinned,
+            headers={"Host": parts.netloc},
+            stream=True,
+            allow_redirects=False,
+            timeout=settings.MEDIA_DOWNLOAD_TIMEOUT_SECONDS
+        )
+        if not response.is_redirect:
+            return response
+        response.close()
+        session.close()
+        url = urljoin(url, response.headers["Location"])
+
+    raise MediaError(f"Too many redirects for media URL: {url}")
+
+
+def check_sources(sources: List[str]) -> None:
+    """
+    Raise MediaError for any URL that does not resolve to a public address
+
+    Run when links are attached; the worker checks again at fetch time.
+    """
+    for source in sources:
+        if "://" in source:
+            _resolve_public(source)
+
+
+def _local_path(source: str) -> str:
+    """Path of an allowed local media file"""
+    if not settings.MEDIA_LOCAL_DIR:
+        raise MediaError(f"Local media is disabled: {source}")
+    root = os.path.realpath(settings.MEDIA_LOCAL_DIR)
+    path = os.path.realpath(os.path.join(root, source))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise MediaError(f"Media file not found: {source}")
+    return path
+
+
+def _open_source(source: str):
+    """
+    Open a URL or an allowed local file for streaming
+
+    Returns:
+        (chunk iterator, media type, closer)
+    """
+    if source.startswith(("http://", "https://")):
+        try:
+            response = _get_public(source)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            status = getattr(e.response, "status_code", None)
+            raise MediaError(f"Failed to download {source}: {str(e)}", retryable=status is None or status >= 500)
+        media_type = response.headers.get("Content-Type", "").split(";")[0] or _guess_type(source)
+        return response.iter_content(settings.MEDIA_CHUNK_BYTES), media_type, response.close
+
+    path = _local_path(source)
+    f = open(path, "rb")
+    return iter(lambda: f.read(settings.MEDIA_CHUNK_BYTES), b""), _guess_type(path), f.close
+
+
+def _guess_type(name: str) -> str:
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def spool(source: str) -> Tuple[tempfile.SpooledTemporaryFile, str, int, str]:
+    """
+    Stream a media source into a temporary file, hashing it on the way
+
+    Only one chunk is held in memory at a time; anything larger than a
+    chunk spills to disk.
+
+    Returns:
+        (file positioned at 0, sha256 hex digest, size in bytes, media type)
+    """
+    chunks, media_type, close = _open_source(source)
+    spooled = tempfile.SpooledTemporaryFile(max_size=settings.MEDIA_CHUNK_BYTES)
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            if size > settings.MEDIA_MAX_BYTES:
+                raise MediaError(f"Media larger than {settings.MEDIA_MAX_BYTES} bytes: {source}")
+            digest.update(chunk)
+            spooled.write(chunk)
+    except requests.exceptions.RequestException as e:
+        spooled.close()
+        raise MediaError(f"Failed to download {source}: {str(e)}", retryable=True)
+    except BaseException:
+        spooled.close()
+        raise
+    finally:
+        close()
+
+    spooled.seek(0)
+    return spooled, digest.hexdigest(), size, media_type
+
+
+def upload_asset(db: Session, twitter_client, user_id: int, source: str, now: datetime) -> models.MediaAsset:
+    """
+    Provider media ID for `source`, uploading only if no live one exists
+
+    Assets are cached per user (media IDs belong to the uploading account)
+    and content hash, so the same image attached to many tweets, or
+    reachable under several URLs, is uploaded once per ID lifetime.
+    """
+    spooled, sha256, size, media_type = spool(source)
+
+    try:
+        asset = db.query(models.MediaAsset).filter(
+            models.MediaAsset.user_id == user_id,
+            models.MediaAsset.sha256 == sha256
+        ).first()
+
+        if asset and _is_live(asset.expires_at, now):
+            logger.info(f"Reusing media {asset.media_id} for {source}")
+            return asset
+
+        result = twitter_client.upload_media(spooled, size, media_type, settings.MEDIA_CHUNK_BYTES)
+    finally:
+        spooled.close()
+
+    ttl = result.get("expires_after_secs") or settings.MEDIA_ID_TTL_SECONDS
+    values = {
+        "media_id": result["media_id"],
+        "expires_at": now + timedelta(seconds=ttl),
+        "size": size,
+        "media_type": media_type,
+        "source": source[:2000]
+    }
+
+    if asset is None:
+        asset = models.MediaAsset(user_id=user_id, sha256=sha256, **values)
+        try:
+            with db.begin_nested():
+                db.add(asset)
+        except IntegrityError:
+            # Another worker cached the same content first; refresh its row
+            asset = db.query(models.MediaAsset).filter(
+                models.MediaAsset.user_id == user_id,
+                models.MediaAsset.sha256 == sha256
+            ).one()
+
+    for key, value in values.items():
+        setattr(asset, key, value)
+    return asset
+
+
+def prepare_tweet_media(db: Session, tweet: models.Tweet, twitter_client, now: datetime) -> Optional[List[str]]:
+    """
+    Resolve tweet.media_links to provider media IDs and store them on the tweet
+
+    Legacy entries that already are media IDs are passed through. The
+    caller commits.
+    """
+    if not tweet.media_links:
+        return None
+
+    media_ids = []
+    expires_at = None
+    for link in tweet.media_links:
+        if is_provider_media_id(link):
+            media_ids.append(link)
+            continue
+        asset = upload_asset(db, twitter_client, tweet.user_id, link, now)
+        media_ids.append(asset.media_id)
+        asset_expiry = to_utc_naive(asset.expires_at)
+        expires_at = asset_expiry if expires_at is None else min(expires_at, asset_expiry)
+
+    tweet.media_ids = media_ids
+    tweet.media_expires_at = expires_at
+    tweet.media_status = "ready"
+    return media_ids
+
+
+def media_ids_for_post(db: Session, tweet: models.Tweet, twitter_client, now: datetime) -> Optional[List[str]]:
+    """
+    Media IDs to post the tweet with
+
+    Uses the IDs pre-uploaded by the preupload_media task when they are
+    still live, so posting stays a single call; otherwise uploads now.
+    """
+    if not tweet.media_links:
+        return None
+    if tweet.media_status == "ready" and (tweet.media_expires_at is None or _is_live(tweet.media_expires_at, now)):
+        return tweet.media_ids
+    return prepare_tweet_media(db, tweet, twitter_client, now)
+
+
+def _is_live(expires_at: Optional[datetime], now: datetime) -> bool:
+    """Whether a media ID will still be valid by the time it is used"""
+    if expires_at is None:
+        return False
+    margin = timedelta(seconds=settings.MEDIA_EXPIRY_MARGIN_SECONDS)
+    return to_utc_naive(expires_at) > now + margin
@@ -0,0 +1,201 @@
+import atexit
+import io
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import insert
+
+from app.config import settings
+from app import models
+from app.services import monitoring
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("tweet_id", "timestamp", "likes", "retweets", "replies", "impressions", "engagement_rate", "extra_json")
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, dict):
+        # json.dumps escapes control characters; COPY only needs backslashes doubled
+        return json.dumps(value, separators=(",", ":")).replace("\\", "\\\\")
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return str(value)
+
+
+def _copy_text(rows: List[Dict]) -> io.StringIO:
+    """Rows in COPY text format"""
+    return io.StringIO("".join(
+        "\t".join(_copy_value(row.get(column, {} if column == "extra_json" else None)) for column in COLUMNS) + "\n"
+        for row in rows
+    ))
+
+
+def write_metrics(engine, rows: List[Dict]) -> None:
+    """Insert metric rows in one transaction: COPY on Postgres, a multi-row INSERT elsewhere"""
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            cursor = conn.connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {models.Metric.__tablename__} ({', '.join(COLUMNS)}) FROM STDIN",
+                    _copy_text(rows),
+                    size=1 << 16
+                )
+            finally:
+                cursor.close()
+        else:
+            conn.execute(insert(models.Metric), rows)
+
+
+class MetricBuffer:
+    """
+    Write-behind buffer for Metric rows
+
+    Sweeps add snapshots and return; rows are written in bulk once
+    METRICS_BUFFER_MAX_ROWS are waiting or the oldest is
+    METRICS_BUFFER_MAX_AGE_SECONDS old, by the adding thread or a
+    background flusher. A failed flush keeps its rows (a flush is one
+    transaction, so nothing is half written) and is retried with
+    exponential backoff. Pending rows are flushed on worker shutdown.
+    """
+
+    def __init__(self, engine=None):
+        self._engine = engine
+        self._rows: List[Dict] = []
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        # Serializes flushes; never held while adding
+        self._flush_lock = threading.Lock()
+        self._failures = 0
+        self._retry_at = 0.0
+        self._stop = threading.Event()
+        self._flusher_pid: Optional[int] = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.database import engine
+            self._engine = engine
+        return self._engine
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def extend(self, rows: Iterable[Dict]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        with self._lock:
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._rows.extend(rows)
+            full = len(self._rows) >= settings.METRICS_BUFFER_MAX_ROWS
+        monitoring.METRICS_BUFFERED.inc(len(rows))
+        self._ensure_flusher()
+        if full:
+            self.flush()
+
+    def due(self) -> bool:
+        with self._lock:
+            if not self._rows or time.monotonic() < self._retry_at:
+                return False
+            return (
+                len(self._rows) >= settings.METRICS_BUFFER_MAX_ROWS
+                or time.monotonic() - self._oldest >= settings.METRICS_BUFFER_MAX_AGE_SECONDS
+            )
+
+    def flush(self, force: bool = False) -> int:
+        """
+        Write all buffered rows; returns how many were written
+
+        Unless forced, does nothing while a failed flush is backing off.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._rows or (not force and time.monotonic() < self._retry_at):
+                    return 0
+                rows, oldest = self._rows, self._oldest
+                self._rows, self._oldest = [], None
+
+            try:
+                write_metrics(self.engine, rows)
+            except Exception as e:
+                self._requeue(rows, oldest)
+                monitoring.METRICS_FLUSH_FAILURES.inc()
+                logger.error(f"Metric flush of {len(rows)} rows failed (attempt {self._failures}): {str(e)}")
+                return 0
+
+            self._failures = 0
+            self._retry_at = 0.0
+            monitoring.METRICS_BUFFERED.dec(len(rows))
+            monitoring.METRICS_FLUSHED.inc(len(rows))
+            return len(rows)
+
+    def _requeue(self, rows: List[Dict], oldest: float) -> None:
+        """Put rows back in front of anything added since, and schedule a retry"""
+        with self._lock:
+            self._rows = rows + self._rows
+            self._oldest = oldest
+            overflow = len(self._rows) - settings.METRICS_BUFFER_MAX_PENDING
+            if overflow > 0:
+                del self._rows[:overflow]
+                monitoring.METRICS_BUFFERED.dec(overflow)
+                logger.error(f"Metric buffer full, dropped {overflow} oldest snapshots")
+            self._failures += 1
+            backoff = min(2.0 ** self._failures, settings.METRICS_BUFFER_RETRY_MAX_SECONDS)
+            self._retry_at = time.monotonic() + backoff
+
+    def close(self, attempts: int = 3) -> None:
+        """Stop the flusher and write what is left, retrying a few times"""
+        self._stop.set()
+        for attempt in range(attempts):
+            self.flush(force=True)
+            if not self._rows:
+                return
+            time.sleep(min(2.0 ** attempt, 5.0))
+        logger.error(f"Lost {len(self._rows)} buffered metric snapshots at shutdown")
+
+    def _ensure_flusher(self) -> None:
+        # One flusher per process; a forked worker starts its own
+        if self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        self._stop.clear()
+        threading.Thread(target=self._run_flusher, name="metric-buffer-flusher", daemon=True).start()
+
+    def _run_flusher(self) -> None:
+        interval = max(0.5, settings.METRICS_BUFFER_MAX_AGE_SECONDS / 4)
+        while not self._stop.wait(interval):
+            if self.due():
+                self.flush()
+
+
+_buffer: Optional[MetricBuffer] = None
+
+
+def get_buffer() -> MetricBuffer:
+    """The process-wide metric buffer"""
+    global _buffer
+    if _buffer is None:
+        _buffer = MetricBuffer()
+        atexit.register(_buffer.close)
+    return _buffer
+
+
+def instrument_celery() -> None:
+    """Flush buffered metrics when a worker process or a solo worker shuts down"""
+    from celery import signals
+
+    @signals.worker_process_shutdown.connect(weak=False)
+    @signals.worker_shutdown.connect(weak=False)
+    def _flush_on_shutdown(**kwargs):
+        if _buffer is not None:
+            _buffer.close()
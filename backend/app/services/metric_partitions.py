@@ -0,0 +1,170 @@
+import logging
+import re
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+TABLE = "metrics"
+COLUMNS = "id, tweet_id, timestamp, likes, retweets, replies, impressions, engagement_rate, extra_json"
+
+# One partition per calendar month (UTC): metrics_p202610 holds October 2026
+_PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+# Catches rows outside every monthly partition until maintenance moves them
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+def is_partition_name(name: str) -> bool:
+    return bool(_PARTITION_NAME.match(name)) or name == DEFAULT_PARTITION
+
+
+def is_partitioned(conn) -> bool:
+    """Whether `metrics` is a partitioned table (Postgres after migration 0006)"""
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+    ), {"table": TABLE}).scalar())
+
+
+def _attached(conn) -> List[str]:
+    return list(conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table AND pg_table_is_visible(p.oid)"
+    ), {"table": TABLE}).scalars())
+
+
+def existing_partitions(conn) -> Dict[datetime, str]:
+    """Attached monthly partitions by the month they hold"""
+    partitions = {}
+    for name in _attached(conn):
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions[datetime(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def ensure_partitions(conn, first: datetime, last: datetime) -> List[str]:
+    """
+    Create the monthly partitions covering [first, last] that are missing
+
+    Returns the names of the partitions created. A no-op unless the
+    table is partitioned.
+    """
+    if not is_partitioned(conn):
+        return []
+
+    has_default = DEFAULT_PARTITION in _attached(conn)
+    existing = existing_partitions(conn)
+    created = []
+    month = month_start(first)
+    while month <= last:
+        if month not in existing:
+            _create_partition(conn, month, has_default)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def _create_partition(conn, month: datetime, has_default: bool):
+    """
+    Create the partition for `month`, moving its rows out of the default partition
+
+    Postgres refuses to create a partition while the default one holds
+    rows in its range, so the default partition is detached, emptied of
+    them into the new partition and attached again.
+    """
+    start = f"{month:%Y-%m-%d} 00:00:00+00"
+    end = f"{add_months(month, 1):%Y-%m-%d} 00:00:00+00"
+    waiting = has_default and conn.execute(text(
+        f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE timestamp >= '{start}' AND timestamp < '{end}' LIMIT 1"
+    )).scalar()
+
+    if waiting:
+        conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    ))
+    if waiting:
+        conn.execute(text(
+            f"WITH moved AS ("
+            f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= '{start}' AND timestamp < '{end}' "
+            f"RETURNING {COLUMNS}"
+            f") INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM moved"
+        ))
+        conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+
+def stray_months(conn) -> List[datetime]:
+    """Months of the rows waiting in the default partition"""
+    if DEFAULT_PARTITION not in _attached(conn):
+        return []
+    return list(conn.execute(text(
+        f"SELECT DISTINCT date_trunc('month', timestamp AT TIME ZONE 'UTC') AS month "
+        f"FROM {DEFAULT_PARTITION} ORDER BY month"
+    )).scalars())
+
+
+def expire_partitions(conn, now: datetime) -> Tuple[List[str], bool]:
+    """
+    Detach (and unless METRICS_RETENTION_DETACH_ONLY, drop) partitions
+    wholly older than METRICS_RETENTION_MONTHS
+
+    Retention costs one catalog change per month instead of a DELETE of
+    every expired row. Returns the partitions expired and whether they
+    were dropped.
+    """
+    if settings.METRICS_RETENTION_MONTHS <= 0 or not is_partitioned(conn):
+        return [], False
+
+    cutoff = add_months(month_start(now), -settings.METRICS_RETENTION_MONTHS)
+    expired = []
+    for month, name in sorted(existing_partitions(conn).items()):
+        # A partition ends where the next month starts
+        if add_months(month, 1) > cutoff:
+            break
+        conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+        if not settings.METRICS_RETENTION_DETACH_ONLY:
+            conn.execute(text(f"DROP TABLE {name}"))
+        expired.append(name)
+    return expired, not settings.METRICS_RETENTION_DETACH_ONLY
+
+
+def maintain(conn, now: datetime) -> Dict[str, List[str]]:
+    """
+    Create partitions METRICS_PARTITION_MONTHS_AHEAD ahead, give rows that
+    landed in the default partition a monthly one, and expire old ones
+    """
+    created = ensure_partitions(
+        conn, month_start(now), add_months(month_start(now), settings.METRICS_PARTITION_MONTHS_AHEAD)
+    )
+    if is_partitioned(conn):
+        for month in stray_months(conn):
+            created += ensure_partitions(conn, month, month)
+    expired, dropped = expire_partitions(conn, now)
+    if created:
+        logger.info(f"Created metric partitions {', '.join(created)}")
+    if expired:
+        logger.info(f"{'Dropped' if dropped else 'Detached'} expired metric partitions {', '.join(expired)}")
+    return {"created": created, "expired": expired}
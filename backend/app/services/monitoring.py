@@ -0,0 +1,341 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+# HTTP
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"]
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries issued per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 500)
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in database queries per HTTP request",
+    ["route"]
+)
+
+# Database connections (label "primary" or "replica")
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    ["engine"],
+    multiprocess_mode="livesum"
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to get a connection from the pool, including waits for a free one",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+DB_READ_SESSIONS = Counter(
+    "db_read_sessions_total",
+    "Read-only sessions by the engine they were routed to",
+    ["engine"]
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag last measured on the read replica",
+    multiprocess_mode="livemax"
+)
+
+# External providers (twitterapi.io, Gemini)
+EXTERNAL_CALL_LATENCY = Histogram(
+    "external_call_duration_seconds",
+    "Latency of calls to external providers",
+    ["provider", "endpoint"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+EXTERNAL_CALL_ERRORS = Counter(
+    "external_call_errors_total",
+    "Failed calls to external providers",
+    ["provider", "endpoint", "error"]
+)
+CIRCUIT_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state per provider endpoint (0 closed, 1 half-open, 2 open)",
+    ["provider", "endpoint"],
+    multiprocess_mode="livemax"
+)
+RESILIENCE_REJECTED = Counter(
+    "external_call_rejected_total",
+    "Provider calls refused locally by a circuit breaker or bulkhead",
+    ["provider", "reason"]
+)
+
+# Celery
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time",
+    ["task", "state"],
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600)
+)
+TASK_DB_QUERIES = Histogram(
+    "celery_task_db_queries",
+    "Database queries issued per Celery task run",
+    ["task"],
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000)
+)
+
+# Scheduling
+SCHEDULING_LAG = Histogram(
+    "tweet_scheduling_lag_seconds",
+    "Delay between scheduled_at and posted_at",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+)
+CAMPAIGN_DRAFTS_GENERATED = Counter(
+    "campaign_drafts_generated_total",
+    "Drafts added to campaign pre-generation buffers"
+)
+CAMPAIGN_BUFFER_MISSES = Counter(
+    "campaign_buffer_misses_total",
+    "Campaign slot occurrences that found no buffered draft"
+)
+METRICS_SWEEP_BACKLOG = Gauge(
+    "metrics_sweep_backlog",
+    "Posted tweets due for a metrics refresh",
+    ["partition"],
+    multiprocess_mode="livemax"
+)
+POSTING_DRAINED = Counter(
+    "posting_drained_tweets_total",
+    "Overdue tweets spread out by a drain plan instead of posted in the sweep"
+)
+POSTING_CATCH_UP = Gauge(
+    "posting_catch_up_seconds",
+    "Projected time until the longest running drain of a partition is posted, as of its last sweep",
+    ["partition"],
+    multiprocess_mode="livemax"
+)
+METRICS_BUFFERED = Gauge(
+    "metrics_buffered_rows",
+    "Metric snapshots waiting in write-behind buffers",
+    multiprocess_mode="livesum"
+)
+METRICS_FLUSHED = Counter(
+    "metrics_flushed_rows_total",
+    "Metric snapshots written by buffer flushes"
+)
+METRICS_FLUSH_FAILURES = Counter(
+    "metrics_flush_failures_total",
+    "Failed metric buffer flushes (rows are kept and retried)"
+)
+
+
+# Read cache (hit rate: local + redis over all requests)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by model and the tier that answered (local, redis or miss)",
+    ["model", "tier"]
+)
+CACHE_INVALIDATIONS = Counter(
+    "cache_invalidations_total",
+    "Cache keys invalidated after commits",
+    ["model"]
+)
+
+# Gemini quota (shared across processes)
+AI_QUOTA_WAIT = Histogram(
+    "ai_quota_wait_seconds",
+    "Time Gemini calls waited for a quota slot",
+    ["priority"],
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+AI_QUOTA_WAITING = Gauge(
+    "ai_quota_waiting",
+    "Gemini calls currently waiting for a quota slot",
+    ["priority"],
+    multiprocess_mode="livesum"
+)
+AI_QUOTA_REJECTED = Counter(
+    "ai_quota_rejected_total",
+    "Gemini calls not admitted (daily_budget, timeout) or let through unmetered",
+    ["priority", "reason"]
+)
+AI_CALLS_COALESCED = Counter(
+    "ai_calls_coalesced_total",
+    "Gemini calls answered by an identical call already in flight",
+    ["scope"]
+)
+
+# Live updates (WebSocket/SSE)
+LIVE_SESSIONS = Gauge(
+    "live_sessions",
+    "Open live update sessions",
+    multiprocess_mode="livesum"
+)
+LIVE_UPDATES_PUBLISHED = Counter(
+    "live_updates_published_total",
+    "Live update messages published, by transport",
+    ["transport"]
+)
+LIVE_UPDATES_DROPPED = Counter(
+    "live_updates_dropped_total",
+    "Live updates dropped because a session fell behind"
+)
+
+
+class QueryStats:
+    """Query count and total duration for one request or task"""
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# Set for the duration of a request/task; None means nobody is listening
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_query_stats() -> QueryStats:
+    """Start collecting query stats for the current context"""
+    stats = QueryStats()
+    _query_stats.set(stats)
+    return stats
+
+
+def stop_query_stats() -> None:
+    """Stop collecting query stats for the current context"""
+    _query_stats.set(None)
+
+
+def instrument_engine(engine) -> None:
+    """Attach query counting/timing hooks to a SQLAlchemy engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _query_stats.get() is not None:
+            conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _query_stats.get()
+        if stats is None or not conn.info.get("query_start_time"):
+            return
+        stats.count += 1
+        stats.duration += time.perf_counter() - conn.info["query_start_time"].pop()
+
+
+def timed_pool(label: str):
+    """
+    QueuePool subclass recording checkout time under `label`
+
+    Passed to create_engine(poolclass=...). A subclass rather than an
+    event because SQLAlchemy only signals once a connection is handed out.
+    """
+
+    class TimedQueuePool(QueuePool):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                DB_POOL_CHECKOUT_WAIT.labels(label).observe(time.perf_counter() - start)
+
+    return TimedQueuePool
+
+
+def instrument_pool(engine, label: str) -> None:
+    """Track connections checked out of an engine's pool"""
+    checked_out = DB_POOL_CHECKED_OUT.labels(label)
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_out.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+
+
+@contextmanager
+def track_external_call(provider: str, endpoint: str):
+    """Record latency and errors of a call to an external provider"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        status_code = getattr(e, "status_code", None)
+        EXTERNAL_CALL_ERRORS.labels(
+            provider, endpoint, str(status_code) if status_code else type(e).__name__
+        ).inc()
+        raise
+    finally:
+        EXTERNAL_CALL_LATENCY.labels(provider, endpoint).observe(time.perf_counter() - start)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Normalise naive (assumed UTC) and aware datetimes for subtraction"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def observe_scheduling_lag(scheduled_at: Optional[datetime], posted_at: Optional[datetime]) -> None:
+    """Record posted_at - scheduled_at for tweets that had a schedule"""
+    if scheduled_at and posted_at:
+        SCHEDULING_LAG.observe(max(0.0, (_as_utc(posted_at) - _as_utc(scheduled_at)).total_seconds()))
+
+
+def get_registry():
+    """Registry to export; aggregates all processes in multiprocess mode"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def instrument_celery(metrics_port: int) -> None:
+    """
+    Connect Celery signal handlers for task metrics
+
+    The worker's main process serves /metrics on `metrics_port`. Prefork
+    children record into PROMETHEUS_MULTIPROC_DIR, which must be set for
+    their samples to show up.
+    """
+    from celery import signals
+    from prometheus_client import start_http_server
+
+    task_started = {}
+
+    @signals.worker_init.connect(weak=False)
+    def _start_exporter(**kwargs):
+        if metrics_port:
+            start_http_server(metrics_port, registry=get_registry())
+
+    @signals.worker_process_shutdown.connect(weak=False)
+    def _mark_process_dead(pid=None, **kwargs):
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            multiprocess.mark_process_dead(pid or os.getpid())
+
+    @signals.task_prerun.connect(weak=False)
+    def _task_prerun(task_id=None, **kwargs):
+        task_started[task_id] = (time.perf_counter(), start_query_stats())
+
+    @signals.task_postrun.connect(weak=False)
+    def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+        started = task_started.pop(task_id, None)
+        stop_query_stats()
+        if started is None:
+            return
+        start, stats = started
+        TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - start)
+        TASK_DB_QUERIES.labels(task.name).observe(stats.count)
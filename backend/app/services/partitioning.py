@@ -0,0 +1,106 @@
+import bisect
+import hashlib
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Live workers per queue, cached for SWEEP_MEMBERSHIP_TTL_SECONDS
+_membership: Dict[str, Tuple[float, List[str]]] = {}
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to nodes
+
+    Each node is placed on the ring `replicas` times. Adding or removing a
+    node only moves the keys that hashed next to it, about 1/N of them,
+    so the other workers keep their partitions (and warm state).
+    """
+
+    def __init__(self, nodes: Iterable[str], replicas: int = 128):
+        self.nodes = sorted(set(nodes))
+        self._ring = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in self.nodes
+            for replica in range(replicas)
+        )
+        self._points = [point for point, _ in self._ring]
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+    def assignments(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        return {key: self.node_for(key) for key in keys}
+
+
+def partition_filter(column, partition: int):
+    """SQL predicate selecting the rows of one partition by user ID"""
+    return column % settings.SWEEP_PARTITIONS == partition
+
+
+def share(counts: Dict[int, int], budget: int) -> Dict[int, int]:
+    """
+    Split a sweep-wide batch budget between partitions, in proportion to their due rows
+
+    Leftovers go to the largest remainders. Partitions left with nothing
+    are omitted.
+    """
+    total = sum(counts.values())
+    if total <= budget:
+        return dict(counts)
+
+    exact = {partition: budget * count / total for partition, count in counts.items()}
+    shares = {partition: int(value) for partition, value in exact.items()}
+    leftover = budget - sum(shares.values())
+    for partition in sorted(exact, key=lambda partition: shares[partition] - exact[partition])[:leftover]:
+        shares[partition] += 1
+    return {partition: count for partition, count in shares.items() if count}
+
+
+def live_workers(celery_app, queue: str) -> List[str]:
+    """
+    Names of the workers currently consuming `queue`
+
+    Asks the workers over the broker at most once per
+    SWEEP_MEMBERSHIP_TTL_SECONDS. Returns an empty list if none answer.
+    """
+    now = time.monotonic()
+    cached = _membership.get(queue)
+    if cached and now - cached[0] < settings.SWEEP_MEMBERSHIP_TTL_SECONDS:
+        return cached[1]
+
+    try:
+        replies = celery_app.control.inspect(timeout=1.0).active_queues() or {}
+    except Exception as e:
+        logger.warning(f"Worker discovery failed: {str(e)}")
+        replies = {}
+
+    workers = sorted(
+        name for name, queues in replies.items()
+        if any(q.get("name") == queue for q in queues)
+    )
+    previous = cached[1] if cached else None
+    if previous is not None and workers != previous:
+        logger.info(f"Workers on {queue} changed from {previous} to {workers}, rebalancing partitions")
+    _membership[queue] = (now, workers)
+    return workers
+
+
+def plan(celery_app, queue: str) -> Dict[int, Optional[str]]:
+    """Worker for each partition of `queue`'s sweeps, or None to use the shared queue"""
+    ring = HashRing(live_workers(celery_app, queue), replicas=settings.SWEEP_RING_REPLICAS)
+    return {
+        partition: ring.node_for(f"partition-{partition}")
+        for partition in range(settings.SWEEP_PARTITIONS)
+    }
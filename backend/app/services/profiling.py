@@ -0,0 +1,228 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+
+
+# Bind placeholders in every paramstyle SQLAlchemy may render
+_PLACEHOLDER = r"(?:%\(\w+\)s|%s|\?|:\w+|\$\d+)"
+_IN_LIST_RE = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_BIND_RE = re.compile(_PLACEHOLDER)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalise a SQL statement so repeated queries with different values match"""
+    shape = _STRING_RE.sub("?", statement)
+    shape = _IN_LIST_RE.sub("(?)", shape)
+    shape = _BIND_RE.sub("?", shape)
+    shape = _NUMBER_RE.sub("?", shape)
+    return _SPACE_RE.sub(" ", shape).strip()
+
+
+class StackSampler:
+    """
+    Low-overhead sampling profiler for a single thread
+
+    A daemon thread snapshots the target thread's stack every `interval`
+    seconds and counts collapsed stacks ("outer;inner;leaf"), the format
+    flamegraph tools consume.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def top_functions(self, limit: int = 20) -> List[Dict]:
+        """Leaf functions ranked by sample count"""
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [
+            {"function": name, "samples": count, "percent": round(count * 100 / total, 1)}
+            for name, count in leaves.most_common(limit)
+        ]
+
+
+class QueryProfile:
+    """Statements executed during one profiled request or task"""
+
+    def __init__(self, name: str, sample: bool = False):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.statements = []  # (shape, seconds)
+        self.sampler = None
+        if sample:
+            self.sampler = StackSampler(
+                threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL_MS / 1000
+            )
+            self.sampler.start()
+
+    def finish(self) -> Dict:
+        """Stop collecting and build the report"""
+        self.duration = time.perf_counter() - self.started
+        if self.sampler:
+            self.sampler.stop()
+
+        by_shape = defaultdict(lambda: [0, 0.0])
+        for shape, seconds in self.statements:
+            by_shape[shape][0] += 1
+            by_shape[shape][1] += seconds
+
+        repeated = [
+            {"shape": shape, "count": count, "duration_ms": round(seconds * 1000, 2)}
+            for shape, (count, seconds) in sorted(by_shape.items(), key=lambda item: -item[1][0])
+            if count >= settings.PROFILING_REPEAT_THRESHOLD
+        ]
+
+        report = {
+            "name": self.name,
+            "duration_ms": round(self.duration * 1000, 2),
+            "queries": len(self.statements),
+            "query_duration_ms": round(sum(seconds for _, seconds in self.statements) * 1000, 2),
+            "distinct_statements": len(by_shape),
+            "n_plus_one": repeated
+        }
+        if self.sampler:
+            report["profile"] = self.sampler.top_functions()
+        return report
+
+
+_active_profile: ContextVar[Optional[QueryProfile]] = ContextVar("active_profile", default=None)
+
+
+def start_profile(name: str, sample: bool = False) -> QueryProfile:
+    """Start profiling SQL (and optionally stacks) in the current context"""
+    profile = QueryProfile(name, sample=sample)
+    _active_profile.set(profile)
+    return profile
+
+
+def stop_profile(profile: QueryProfile) -> Dict:
+    """Stop profiling and return the report"""
+    _active_profile.set(None)
+    return profile.finish()
+
+
+def instrument_engine(engine) -> None:
+    """Attach statement recording hooks; a no-op unless a profile is active"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _active_profile.get() is not None:
+            conn.info.setdefault("profile_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _active_profile.get()
+        if profile is None or not conn.info.get("profile_start_time"):
+            return
+        seconds = time.perf_counter() - conn.info["profile_start_time"].pop()
+        profile.statements.append((statement_shape(statement), seconds))
+
+
+def summarize(report: Dict) -> str:
+    """Compact single-line report for a response header"""
+    return json.dumps({
+        "queries": report["queries"],
+        "query_duration_ms": report["query_duration_ms"],
+        "n_plus_one": [
+            {"count": item["count"], "shape": item["shape"][:120]}
+            for item in report["n_plus_one"][:3]
+        ]
+    }, separators=(",", ":"))
+
+
+def write_report(report: Dict, stacks: Optional[Counter] = None) -> Optional[str]:
+    """Write the full report (and collapsed stacks) to PROFILING_OUTPUT_DIR"""
+    if not settings.PROFILING_OUTPUT_DIR:
+        return None
+
+    os.makedirs(settings.PROFILING_OUTPUT_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", report["name"]).strip("_")
+    base = os.path.join(
+        settings.PROFILING_OUTPUT_DIR,
+        f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{slug}"
+    )
+
+    with open(f"{base}.json", "w") as f:
+        json.dump(report, f, indent=2)
+
+    if stacks:
+        with open(f"{base}.folded", "w") as f:
+            for stack, count in stacks.items():
+                f.write(f"{stack} {count}\n")
+
+    return f"{base}.json"
+
+
+def should_profile_task(task_name: str) -> bool:
+    """Whether PROFILING_TASKS selects this task"""
+    selected = {name.strip() for name in settings.PROFILING_TASKS.split(",") if name.strip()}
+    return "*" in selected or task_name in selected
+
+
+def instrument_celery() -> None:
+    """Profile the tasks listed in PROFILING_TASKS and log/write their reports"""
+    if not settings.PROFILING_TASKS:
+        return
+
+    import logging
+    from celery import signals
+
+    logger = logging.getLogger(__name__)
+    profiles = {}
+
+    @signals.task_prerun.connect(weak=False)
+    def _task_prerun(task_id=None, task=None, **kwargs):
+        if should_profile_task(task.name):
+            profiles[task_id] = start_profile(task.name, sample=settings.PROFILING_SAMPLE_TASKS)
+
+    @signals.task_postrun.connect(weak=False)
+    def _task_postrun(task_id=None, task=None, **kwargs):
+        profile = profiles.pop(task_id, None)
+        if profile is None:
+            return
+        report = stop_profile(profile)
+        path = write_report(report, profile.sampler.stacks if profile.sampler else None)
+        if report["n_plus_one"]:
+            logger.warning(f"Possible N+1 in {task.name}: {summarize(report)}")
+        logger.info(
+            f"Profiled {task.name}: {report['queries']} queries in "
+            f"{report['query_duration_ms']}ms" + (f", report at {path}" if path else "")
+        )
@@ -0,0 +1,89 @@
+from typing import Optional
+from datetime import datetime, timezone
+
+from croniter import croniter, CroniterBadCronError, CroniterBadDateError
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Normalise a datetime to naive UTC (the app compares against utcnow())"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def validate(expression: str) -> None:
+    """Raise ValueError unless `expression` is a valid cron expression"""
+    if not croniter.is_valid(expression):
+        raise ValueError(f"Invalid cron expression: {expression!r}")
+
+
+def next_fire_time(expression: Optional[str], after: datetime) -> Optional[datetime]:
+    """
+    First occurrence of the cron expression strictly after `after` (UTC)
+
+    Returns None for expressions that never fire again (e.g. Feb 30), and
+    for no expression: a one-off campaign has nothing after its occurrence.
+    """
+    if not expression:
+        return None
+    try:
+        return croniter(expression, to_utc_naive(after)).get_next(datetime)
+    except (CroniterBadCronError, CroniterBadDateError):
+        return None
+
+
+def count_occurrences(expression: Optional[str], first: datetime, until: datetime, limit: int) -> int:
+    """Occurrences from `first` (itself an occurrence) up to `until`, capped at `limit`"""
+    first, until = to_utc_naive(first), to_utc_naive(until)
+    if first > until or limit <= 0:
+        return 0
+    if not expression:
+        return 1
+    try:
+        schedule = croniter(expression, first)
+    except (CroniterBadCronError, CroniterBadDateError):
+        return 0
+    count = 1
+    while count < limit:
+        try:
+            if schedule.get_next(datetime) > until:
+                break
+        except CroniterBadDateError:
+            break
+        count += 1
+    return count
+
+
+def slot_time(slot: dict) -> Optional[datetime]:
+    """
+    A slot's fixed scheduled_at (ISO 8601) as naive UTC, if it has one
+
+    Only one-off campaigns use it. Raises ValueError if it does not parse.
+    """
+    value = slot.get('scheduled_at')
+    if not value:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    return to_utc_naive(value)
+
+
+def schedule_campaign(campaign, now: datetime, fired: bool = False) -> None:
+    """
+    Set campaign.next_fire_at, or clear it if there is nothing to fire
+
+    A recurring campaign fires at each occurrence of its recurrence. A
+    one-off campaign (no recurrence) fires once: at its earliest slot
+    scheduled_at, or straight away if no slot has one. Once it has
+    `fired`, it stays off. Paused campaigns have no fire time, so the
+    due-campaign index only ever holds campaigns with work ahead.
+    """
+    if not campaign.active:
+        campaign.next_fire_at = None
+    elif campaign.recurrence:
+        campaign.next_fire_at = next_fire_time(campaign.recurrence, now)
+    elif fired:
+        campaign.next_fire_at = None
+    else:
+        times = [slot_time(slot) for slot in campaign.slots or []]
+        campaign.next_fire_at = min([t for t in times if t is not None], default=to_utc_naive(now))
@@ -0,0 +1,289 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, TypeVar
+
+from app.config import settings
+from app.services import monitoring
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class Rejected(Exception):
+    """
+    A call refused locally, without reaching the provider
+
+    Transient like a 503: `retryable` for app.services.retry, with
+    `retry_after` as the earliest sensible retry.
+    """
+
+    retryable = True
+    status_code = None
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(Rejected):
+    """The endpoint's circuit breaker is open"""
+
+
+class BulkheadFull(Rejected):
+    """The provider already has its maximum of calls in flight"""
+
+
+class CallTimeout(Exception):
+    """The call outlived its timeout budget"""
+
+    retryable = True
+    status_code = None
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    """
+    Whether an error says the provider is unhealthy
+
+    Transport errors, timeouts and 5xx count; 4xx (bad input, auth, 429)
+    mean the provider answered and leave the breaker alone.
+    """
+    if isinstance(exc, Rejected):
+        return False
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        code = getattr(exc, "code", None)
+        status = code if isinstance(code, int) else None
+    return status is None or status >= 500
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker for one provider endpoint
+
+    Closed: calls go through and outcomes of the last
+    BREAKER_WINDOW_SECONDS are kept. Once at least BREAKER_MIN_CALLS
+    of them failed at BREAKER_FAILURE_RATE or more, the breaker opens
+    and calls fail fast with CircuitOpen for BREAKER_OPEN_SECONDS. After
+    that it is half-open: BREAKER_HALF_OPEN_CALLS probes go through, and
+    the first outcome closes it again or reopens it.
+
+    State is per process, like the Twitter client cooldown.
+    """
+
+    def __init__(self, provider: str, endpoint: str):
+        self.provider = provider
+        self.endpoint = endpoint
+        self.state = CLOSED
+        self._outcomes = deque()  # (time.monotonic(), failed)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self._publish()
+
+    def _publish(self):
+        monitoring.CIRCUIT_STATE.labels(self.provider, self.endpoint).set(_STATE_VALUES[self.state])
+
+    def _transition(self, state: str, now: float):
+        if state == self.state:
+            return
+        logger.warning(f"Circuit {self.provider}:{self.endpoint} {self.state} -> {state}")
+        self.state = state
+        self._outcomes.clear()
+        self._failures = 0
+        self._probes = 0
+        if state == OPEN:
+            self._opened_at = now
+        self._publish()
+
+    def _trim(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - settings.BREAKER_WINDOW_SECONDS:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+
+    def retry_after(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._opened_at + settings.BREAKER_OPEN_SECONDS - now)
+
+    def check(self) -> None:
+        """Raise CircuitOpen while open; takes no half-open probe"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and self.retry_after(now) > 0:
+                raise self._rejection(now)
+
+    def allow(self) -> None:
+        """Admit one call or raise CircuitOpen"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if self.retry_after(now) > 0:
+                    raise self._rejection(now)
+                self._transition(HALF_OPEN, now)
+            if self.state == HALF_OPEN:
+                if self._probes >= settings.BREAKER_HALF_OPEN_CALLS:
+                    raise self._rejection(now)
+                self._probes += 1
+
+    def cancel(self) -> None:
+        """Return a half-open probe that never reached the provider"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def _rejection(self, now: float) -> CircuitOpen:
+        monitoring.RESILIENCE_REJECTED.labels(self.provider, "circuit_open").inc()
+        return CircuitOpen(
+            f"{self.provider} {self.endpoint} is failing, circuit open",
+            max(1.0, self.retry_after(now))
+        )
+
+    def record(self, failed: bool) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self._transition(OPEN if failed else CLOSED, now)
+                return
+            if self.state == OPEN:
+                # A call admitted before the breaker opened
+                return
+            self._outcomes.append((now, failed))
+            self._failures += failed
+            self._trim(now)
+            calls = len(self._outcomes)
+            if calls >= settings.BREAKER_MIN_CALLS and self._failures >= calls * settings.BREAKER_FAILURE_RATE:
+                self._transition(OPEN, now)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            snapshot = {"state": self.state, "calls": len(self._outcomes), "failures": self._failures}
+            if self.state == OPEN:
+                snapshot["retry_after"] = round(self.retry_after(now), 1)
+            return snapshot
+
+
+class Bulkhead:
+    """
+    Cap on concurrent calls to one provider within a process
+
+    Callers wait up to BULKHEAD_WAIT_SECONDS for a free slot, then get
+    BulkheadFull. A degraded provider thus holds at most `limit` threads
+    instead of every worker thread.
+    """
+
+    def __init__(self, provider: str, limit: int):
+        self.provider = provider
+        self.limit = limit
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=settings.BULKHEAD_WAIT_SECONDS):
+            monitoring.RESILIENCE_REJECTED.labels(self.provider, "bulkhead_full").inc()
+            raise BulkheadFull(f"{self.provider} has {self.limit} calls in flight", settings.BULKHEAD_WAIT_SECONDS)
+
+    @contextmanager
+    def slot(self):
+        self._acquire()
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def call(self, fn: Callable[[], T], timeout: float) -> T:
+        """
+        Run `fn` in a slot, giving up on it after `timeout` seconds
+
+        For clients that cannot time out themselves. A call that times
+        out keeps running in its thread, and keeps its slot, until it
+        returns, so hung calls stay bounded by the bulkhead.
+        """
+        self._acquire()
+        outcome = {}
+        done = threading.Event()
+
+        def run():
+            try:
+                outcome["result"] = fn()
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                self._slots.release()
+                done.set()
+
+        threading.Thread(target=run, name=f"{self.provider}-call", daemon=True).start()
+        if not done.wait(timeout):
+            raise CallTimeout(f"{self.provider} call timed out after {timeout:.0f}s")
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_bulkheads: Dict[str, Bulkhead] = {}
+_registry_lock = threading.Lock()
+
+
+def breaker(provider: str, endpoint: str) -> CircuitBreaker:
+    key = f"{provider}:{endpoint}"
+    with _registry_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(provider, endpoint)
+        return _breakers[key]
+
+
+def bulkhead(provider: str) -> Bulkhead:
+    with _registry_lock:
+        if provider not in _bulkheads:
+            limits = {"twitterapi": settings.BULKHEAD_TWITTER_CALLS, "gemini": settings.BULKHEAD_GEMINI_CALLS}
+            _bulkheads[provider] = Bulkhead(provider, limits[provider])
+        return _bulkheads[provider]
+
+
+@contextmanager
+def _recorded(provider: str, endpoint: str):
+    circuit = breaker(provider, endpoint)
+    circuit.allow()
+    try:
+        yield
+    except Rejected:
+        # Turned away by the bulkhead: no outcome, and a probe is handed back
+        circuit.cancel()
+        raise
+    except Exception as e:
+        circuit.record(is_provider_failure(e))
+        raise
+    except BaseException:
+        circuit.cancel()
+        raise
+    circuit.record(False)
+
+
+@contextmanager
+def guard(provider: str, endpoint: str):
+    """Run the enclosed provider call through its breaker and bulkhead"""
+    with _recorded(provider, endpoint), bulkhead(provider).slot():
+        yield
+
+
+def call(provider: str, endpoint: str, fn: Callable[[], T], timeout: float) -> T:
+    """Like guard(), for clients without their own timeouts (see Bulkhead.call)"""
+    with _recorded(provider, endpoint):
+        return bulkhead(provider).call(fn, timeout)
+
+
+def states() -> Dict[str, Dict]:
+    """Breakers of this process by provider:endpoint, for /health"""
+    with _registry_lock:
+        breakers = dict(_breakers)
+    return {key: circuit.snapshot() for key, circuit in sorted(breakers.items())}
@@ -0,0 +1,94 @@
+from typing import Optional
+from datetime import datetime, timedelta
+
+from tenacity import RetryCallState, wait_exponential_jitter
+
+from app.config import settings
+from app import models
+
+
+# Exponential backoff with jitter, shared by posting and metrics retries
+_backoff = wait_exponential_jitter(
+    initial=settings.RETRY_BACKOFF_INITIAL_SECONDS,
+    max=settings.RETRY_BACKOFF_MAX_SECONDS,
+    jitter=settings.RETRY_BACKOFF_INITIAL_SECONDS
+)
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Only errors that flag themselves as transient are retried"""
+    return bool(getattr(exc, "retryable", False))
+
+
+def is_rate_limited(exc: Exception) -> bool:
+    """Provider rejected the call with 429 Too Many Requests"""
+    return getattr(exc, "status_code", None) == 429
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Seconds to wait before the next attempt
+
+    Args:
+        attempt: Number of failed attempts so far (1-based)
+        retry_after: Provider Retry-After hint, used as a lower bound
+    """
+    state = RetryCallState(retry_object=None, fn=None, args=(), kwargs={})
+    state.attempt_number = attempt
+    delay = _backoff(state)
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def record_post_failure(tweet: models.Tweet, exc: Exception, now: datetime) -> Optional[float]:
+    """
+    Record a failed posting attempt on the tweet
+
+    Transient errors move the tweet to "retrying" with `next_attempt_at`
+    set; after RETRY_MAX_ATTEMPTS it is moved to the "dead" (dead-letter)
+    status. Permanent errors mark it "failed" straight away.
+
+    Returns:
+        Delay in seconds before the caller should re-enqueue the post,
+        or None if the tweet will not be retried
+    """
+    tweet.attempts = (tweet.attempts or 0) + 1
+    tweet.last_error = str(exc)[:1000]
+    tweet.next_attempt_at = None
+
+    if not is_retryable(exc):
+        tweet.status = "failed"
+        return None
+
+    if tweet.attempts >= settings.RETRY_MAX_ATTEMPTS:
+        tweet.status = "dead"
+        return None
+
+    delay = backoff_delay(tweet.attempts, getattr(exc, "retry_after", None))
+    tweet.status = "retrying"
+    tweet.next_attempt_at = now + timedelta(seconds=delay)
+    return delay
+
+
+def record_post_success(tweet: models.Tweet, result: dict, now: datetime) -> None:
+    """Mark the tweet posted and clear its retry state"""
+    tweet.tweet_id_twitter = result.get("id_str")
+    tweet.status = "posted"
+    tweet.posted_at = now
+    tweet.next_attempt_at = None
+    tweet.last_error = None
+
+
+def next_metrics_attempt(failures: int, exc: Exception, now: datetime) -> datetime:
+    """
+    When to fetch metrics for a tweet again after `failures` failures
+
+    Metrics are never dead-lettered; permanent errors (deleted tweet,
+    bad credentials) simply back off to the maximum interval.
+    """
+    if is_retryable(exc):
+        delay = backoff_delay(failures, getattr(exc, "retry_after", None))
+    else:
+        delay = settings.RETRY_BACKOFF_MAX_SECONDS
+    return now + timedelta(seconds=delay)
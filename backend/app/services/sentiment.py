@@ -0,0 +1,116 @@
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+_analyzer = None
+
+
+def _get_analyzer():
+    """TextBlob's lexicon analyzer, imported on first use (it loads a ~3MB lexicon)"""
+    global _analyzer
+    if _analyzer is None:
+        from textblob.en.sentiments import PatternAnalyzer
+        _analyzer = PatternAnalyzer()
+    return _analyzer
+
+
+def label(polarity: float) -> str:
+    if polarity >= settings.SENTIMENT_NEUTRAL_BAND:
+        return "positive"
+    if polarity <= -settings.SENTIMENT_NEUTRAL_BAND:
+        return "negative"
+    return "neutral"
+
+
+def score_texts(texts: List[str]) -> List[Dict]:
+    """
+    Score texts locally, no API calls
+
+    Each result has sentiment (positive/negative/neutral), polarity
+    (-1..1), subjectivity (0..1) and `uncertain`: opinionated text whose
+    polarity still lands in the neutral band, i.e. mixed or sarcastic
+    wording the lexicon cannot settle. Repeated texts are scored once.
+    """
+    analyze = _get_analyzer().analyze
+    scored: Dict[str, Dict] = {}
+    results = []
+    for text in texts:
+        result = scored.get(text)
+        if result is None:
+            polarity, subjectivity = analyze(text or "")
+            result = scored[text] = {
+                "sentiment": label(polarity),
+                "polarity": polarity,
+                "subjectivity": subjectivity,
+                "uncertain": (
+                    abs(polarity) < settings.SENTIMENT_NEUTRAL_BAND
+                    and subjectivity >= settings.SENTIMENT_UNCERTAIN_SUBJECTIVITY
+                ),
+                "source": "local"
+            }
+        results.append(result)
+    return [dict(result) for result in results] if len(scored) < len(results) else results
+
+
+def refine(results: List[Dict], texts: List[str], ai_generator) -> int:
+    """
+    Re-score uncertain results with the LLM, in place
+
+    Sends at most SENTIMENT_REFINE_MAX_TEXTS distinct texts in a single
+    call under the shared Gemini quota. Results the LLM does not answer
+    keep their local score. Returns the number of results refined.
+    """
+    pending: Dict[str, List[int]] = {}
+    for index, result in enumerate(results):
+        if result["uncertain"]:
+            pending.setdefault(texts[index], []).append(index)
+    if not pending:
+        return 0
+
+    batch = list(pending)[:settings.SENTIMENT_REFINE_MAX_TEXTS]
+    polarities = ai_generator.score_sentiments(batch)
+
+    refined = 0
+    for text, polarity in zip(batch, polarities):
+        if polarity is None:
+            continue
+        for index in pending[text]:
+            results[index].update(
+                sentiment=label(polarity), polarity=polarity, uncertain=False, source="llm"
+            )
+            refined += 1
+    return refined
+
+
+def backfill(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Score every tweet without a sentiment_score, SENTIMENT_BACKFILL_BATCH at a time
+
+    Local scoring only, so the historical corpus costs no API quota.
+    Walks the primary key and commits per batch; returns tweets scored.
+    """
+    scored = 0
+    last_id = 0
+    while True:
+        query = db.query(models.Tweet.id, models.Tweet.text).filter(
+            models.Tweet.sentiment_score.is_(None),
+            models.Tweet.id > last_id
+        )
+        if user_id is not None:
+            query = query.filter(models.Tweet.user_id == user_id)
+        rows = query.order_by(models.Tweet.id).limit(settings.SENTIMENT_BACKFILL_BATCH).all()
+        if not rows:
+            return scored
+
+        results = score_texts([row.text for row in rows])
+        db.execute(update(models.Tweet), [
+            {"id": row.id, "sentiment_score": result["polarity"]}
+            for row, result in zip(rows, results)
+        ])
+        db.commit()
+        scored += len(rows)
+        last_id = rows[-1].id
@@ -0,0 +1,190 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app import models
+from app.services import heatmap
+from app.services.recurrence import to_utc_naive
+
+# Provider timestamp format, e.g. "Tue Dec 10 07:00:30 +0000 2024"
+TWITTER_TIME_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+
+def _tweet_id(raw: Dict) -> Optional[str]:
+    value = raw.get("id_str") or raw.get("id")
+    return str(value) if value else None
+
+
+def _count(raw: Dict, *keys) -> Optional[int]:
+    for key in keys:
+        if raw.get(key) is not None:
+            return int(raw[key])
+    return None
+
+
+def _created_at(raw: Dict) -> Optional[datetime]:
+    value = raw.get("createdAt") or raw.get("created_at")
+    if not value:
+        return None
+    for parse in (lambda v: datetime.strptime(v, TWITTER_TIME_FORMAT), datetime.fromisoformat):
+        try:
+            return to_utc_naive(parse(value.replace("Z", "+00:00")))
+        except ValueError:
+            continue
+    return None
+
+
+def _insert_new(db: Session):
+    """INSERT that skips tweets already stored (posted by us or synced before)"""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(models.Tweet).on_conflict_do_nothing(index_elements=["tweet_id_twitter"])
+
+
+def store_tweets(db: Session, user_id: int, raw_tweets: List[Dict], now: datetime) -> int:
+    """
+    Bulk-insert provider tweets as posted tweets, with an initial metrics snapshot
+
+    Tweets that already exist are left untouched; inserted ones are added
+    to the user's engagement heatmap. Returns the number of tweets
+    inserted.
+    """
+    rows, counts = [], {}
+    for raw in raw_tweets:
+        tweet_id = _tweet_id(raw)
+        if not tweet_id or tweet_id in counts:
+            continue
+        created = _created_at(raw) or now
+        data = {
+            "likes": _count(raw, "likeCount", "like_count", "favorite_count") or 0,
+            "retweets": _count(raw, "retweetCount", "retweet_count") or 0,
+            "replies": _count(raw, "replyCount", "reply_count") or 0,
+            "impressions": _count(raw, "viewCount", "impression_count")
+        }
+        engagement = data["likes"] + data["retweets"] + data["replies"]
+        rows.append({
+            "user_id": user_id,
+            "tweet_id_twitter": tweet_id,
+            "text": raw.get("text") or "",
+            "created_at": created,
+            "posted_at": created,
+            "status": "posted",
+            "generated_by_ai": False,
+            "heatmap_engagement": engagement
+        })
+        counts[tweet_id] = (created, engagement, data)
+
+    if not rows:
+        return 0
+
+    inserted = db.execute(
+        _insert_new(db).returning(models.Tweet.id, models.Tweet.tweet_id_twitter), rows
+    ).all()
+
+    metrics = []
+    deltas = heatmap.HeatmapDeltas(now)
+    for tweet_pk, tweet_id in inserted:
+        created, engagement, data = counts[tweet_id]
+        deltas.add(user_id, created, engagement, None)
+        metrics.append({
+            "tweet_id": tweet_pk,
+            "timestamp": now,
+            "engagement_rate": engagement / data["impressions"] * 100 if data["impressions"] else 0,
+            **data
+        })
+    if metrics:
+        db.execute(insert(models.Metric), metrics)
+    heatmap.apply(db, deltas)
+
+    return len(inserted)
+
+
+def _walk(
+    db: Session,
+    twitter_client,
+    user: models.User,
+    now: datetime,
+    since_id: Optional[str],
+    max_id: Optional[str],
+    max_pages: int
+) -> Tuple[int, Optional[str], Optional[str], bool]:
+    """
+    Page from max_id (or the newest tweet) towards the past, stopping at since_id
+
+    Returns:
+        (tweets stored, newest ID seen, max_id for the next page, reached the end)
+    """
+    page_size = settings.TIMELINE_SYNC_PAGE_SIZE
+    stored = 0
+    newest = None
+
+    for _ in range(max_pages):
+        page = twitter_client.get_user_tweets(
+            user.twitter_username, count=page_size, since_id=since_id, max_id=max_id
+        )
+        ids = [int(tweet_id) for tweet_id in map(_tweet_id, page) if tweet_id and tweet_id.isdigit()]
+        if not ids:
+            return stored, newest, max_id, True
+
+        stored += store_tweets(db, user.id, page, now)
+        newest = str(max(ids + ([int(newest)] if newest else [])))
+        max_id = str(min(ids) - 1)
+
+        if len(page) < page_size:
+            return stored, newest, max_id, True
+
+    return stored, newest, max_id, False
+
+
+def sync_user(db: Session, twitter_client, user: models.User, now: datetime) -> int:
+    """
+    One sync step for a user: tweets newer than the cursor, then a slice of history
+
+    After the backfill has walked the whole timeline, a run is a single
+    call returning only new tweets. If more than TIMELINE_SYNC_MAX_PAGES
+    of new tweets arrived, the cursor moves to the newest one and the
+    part not yet fetched is queued as a backfill range, so no gap is
+    left. The caller commits.
+
+    Returns:
+        Number of tweets stored
+    """
+    stored = 0
+
+    if user.timeline_since_id:
+        new, newest, next_max_id, complete = _walk(
+            db, twitter_client, user, now,
+            since_id=user.timeline_since_id, max_id=None, max_pages=settings.TIMELINE_SYNC_MAX_PAGES
+        )
+        stored += new
+        if complete:
+            user.timeline_since_id = newest or user.timeline_since_id
+        elif user.timeline_backfill_done:
+            # Fill (old cursor, next_max_id] through the backfill
+            user.timeline_backfill_max_id = next_max_id
+            user.timeline_backfill_since_id = user.timeline_since_id
+            user.timeline_backfill_done = False
+            user.timeline_since_id = newest
+        # Otherwise the backfill range is still in use; keep the cursor
+        # and re-read from the top next run (stored tweets are skipped)
+
+    if not user.timeline_backfill_done:
+        from_top = user.timeline_backfill_max_id is None
+        new, newest, next_max_id, complete = _walk(
+            db, twitter_client, user, now,
+            since_id=user.timeline_backfill_since_id, max_id=user.timeline_backfill_max_id,
+            max_pages=settings.TIMELINE_BACKFILL_PAGES_PER_RUN
+        )
+        stored += new
+        if from_top and newest and not user.timeline_since_id:
+            user.timeline_since_id = newest
+        user.timeline_backfill_max_id = next_max_id
+        user.timeline_backfill_done = complete
+        if complete:
+            user.timeline_backfill_since_id = None
+
+    user.timeline_synced_at = now
+    return stored
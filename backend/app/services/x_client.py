@@ -1,8 +1,53 @@
 import requests
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import BinaryIO, Dict, List, Optional
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 
 from app.config import settings
+from app.services import resilience
+from app.services.monitoring import track_external_call
+
+
+class TwitterAPIError(Exception):
+    """Error raised for a failed twitterapi.io call"""
+    
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+    
+    @property
+    def retryable(self) -> bool:
+        """Rate limits, server errors and transport failures are transient"""
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _api_error(message: str, exc: requests.exceptions.RequestException) -> TwitterAPIError:
+    """Wrap a requests exception, keeping status code and Retry-After"""
+    response = exc.response
+    if response is None:
+        return TwitterAPIError(f"{message}: {str(exc)}")
+    return TwitterAPIError(
+        f"{message}: {str(exc)}",
+        status_code=response.status_code,
+        retry_after=_parse_retry_after(response.headers.get("Retry-After"))
+    )
 
 
 class TwitterAPIClient:
@@ -13,11 +58,19 @@ class TwitterAPIClient:
     
     def __init__(self, api_key: str):
         self.api_key = api_key
-        self.base_url = "https://api.twitterapi.io"
+        self.base_url = settings.TWITTER_API_BASE_URL
         self.headers = {
             'x-api-key': self.api_key,
             'Content-Type': 'application/json'
         }
+        # Keep-alive connection pool shared by all calls on this client
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # time.monotonic() before which sweeps skip this account after a 429
+        self.cooldown_until = 0.0
+        # (connect, read) seconds; without them one hung connection pins a worker
+        self.timeout = (settings.TWITTER_CONNECT_TIMEOUT_SECONDS, settings.TWITTER_READ_TIMEOUT_SECONDS)
+        self.upload_timeout = (settings.TWITTER_CONNECT_TIMEOUT_SECONDS, settings.TWITTER_UPLOAD_TIMEOUT_SECONDS)
     
     def post_tweet(self, text: str, media_ids: Optional[List[str]] = None) -> Dict:
         """Post a new tweet"""
@@ -26,46 +79,130 @@ class TwitterAPIClient:
         if media_ids:
             payload["media_ids"] = media_ids
         
-        try:
-            response = requests.post(url, json=payload, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Failed to post tweet: {str(e)}")
+        with resilience.guard("twitterapi", "post_tweet"), track_external_call("twitterapi", "post_tweet"):
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                return response.json()
+            except requests.exceptions.RequestException as e:
+                raise _api_error("Failed to post tweet", e)
     
-    def get_user_tweets(self, username: str, count: int = 10) -> List[Dict]:
-        """Get recent tweets from a user"""
+    def upload_media(self, stream: BinaryIO, total_bytes: int, media_type: str, chunk_size: int) -> Dict:
+        """
+        Upload media with the chunked INIT / APPEND / FINALIZE protocol
+        
+        `stream` is read one chunk at a time, so memory use does not grow
+        with the file size.
+        
+        Returns:
+            Dict with 'media_id' and 'expires_after_secs' (None if not reported)
+        """
+        url = f"{self.base_url}/twitter/media/upload"
+        # Let requests set the form / multipart content type
+        form_headers = {'Content-Type': None}
+        
+        with resilience.guard("twitterapi", "upload_media"), track_external_call("twitterapi", "upload_media"):
+            try:
+                response = self.session.post(url, headers=form_headers, timeout=self.upload_timeout, data={
+                    "command": "INIT",
+                    "total_bytes": total_bytes,
+                    "media_type": media_type
+                })
+                response.raise_for_status()
+                media_id = response.json()["media_id_string"]
+                
+                segment = 0
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    response = self.session.post(
+                        url,
+                        headers=form_headers,
+                        data={"command": "APPEND", "media_id": media_id, "segment_index": segment},
+                        files={"media": chunk},
+                        timeout=self.upload_timeout
+                    )
+                    response.raise_for_status()
+                    segment += 1
+                
+                response = self.session.post(url, headers=form_headers, timeout=self.upload_timeout, data={
+                    "command": "FINALIZE",
+                    "media_id": media_id
+                })
+                response.raise_for_status()
+                data = response.json()
+            except requests.exceptions.RequestException as e:
+                raise _api_error("Failed to upload media", e)
+        
+        return {"media_id": media_id, "expires_after_secs": data.get("expires_after_secs")}
+    
+    def get_user_tweets(
+        self,
+        username: str,
+        count: int = 10,
+        since_id: Optional[str] = None,
+        max_id: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Get a user's tweets, newest first
+        
+        Args:
+            since_id: Only tweets newer than this ID
+            max_id: Only tweets with this ID or older (page towards the past)
+        """
         url = f"{self.base_url}/twitter/user/tweets"
         params = {"userName": username, "count": count}
+        if since_id:
+            params["sinceId"] = since_id
+        if max_id:
+            params["maxId"] = max_id
         
-        try:
-            response = requests.get(url, params=params, headers=self.headers)
-            response.raise_for_status()
-            return response.json().get("tweets", [])
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Failed to fetch tweets: {str(e)}")
+        with resilience.guard("twitterapi", "get_user_tweets"), track_external_call("twitterapi", "get_user_tweets"):
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                response.raise_for_status()
+                return response.json().get("tweets", [])
+            except requests.exceptions.RequestException as e:
+                raise _api_error("Failed to fetch tweets", e)
     
     def get_tweet_metrics(self, tweet_id: str) -> Dict:
         """Get metrics for a specific tweet"""
         url = f"{self.base_url}/twitter/tweet/metrics"
         params = {"tweetId": tweet_id}
         
-        try:
-            response = requests.get(url, params=params, headers=self.headers)
-            response.raise_for_status()
-            data = response.json()
-            
-            return {
-                "likes": data.get("like_count", 0),
-                "retweets": data.get("retweet_count", 0),
-                "replies": data.get("reply_count", 0),
-                "impressions": data.get("impression_count"),
-                "timestamp": datetime.utcnow()
-            }
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Failed to fetch metrics: {str(e)}")
+        with resilience.guard("twitterapi", "get_tweet_metrics"), track_external_call("twitterapi", "get_tweet_metrics"):
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                response.raise_for_status()
+                data = response.json()
+            except requests.exceptions.RequestException as e:
+                raise _api_error("Failed to fetch metrics", e)
+        
+        return {
+            "likes": data.get("like_count", 0),
+            "retweets": data.get("retweet_count", 0),
+            "replies": data.get("reply_count", 0),
+            "impressions": data.get("impression_count"),
+            "timestamp": datetime.utcnow()
+        }
+
+
+# Most recently used clients, per process
+_clients: "OrderedDict[str, TwitterAPIClient]" = OrderedDict()
 
 
 def get_twitter_client(api_key: str) -> TwitterAPIClient:
-    """Factory function to create Twitter API client"""
-    return TwitterAPIClient(api_key)
\ No newline at end of file
+    """
+    Twitter API client for an API key
+    
+    Clients are reused across tasks in the same process, so an account's
+    keep-alive connections and rate-limit cooldown survive between sweeps.
+    Sweep partitioning sends each user to the same worker every time.
+    """
+    client = _clients.pop(api_key, None) or TwitterAPIClient(api_key)
+    _clients[api_key] = client
+    while len(_clients) > settings.TWITTER_CLIENT_CACHE_SIZE:
+        _, evicted = _clients.popitem(last=False)
+        evicted.session.close()
+    return client
\ No newline at end of file
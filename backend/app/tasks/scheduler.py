@@ -1,16 +1,35 @@
 from celery import Celery
-from datetime import datetime
-from sqlalchemy.orm import Session
+from kombu import Queue
+from celery.utils.nodenames import worker_direct
+from datetime import datetime, timedelta
+from collections import defaultdict
+from itertools import groupby
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, or_, case, func, update
+from sqlalchemy.orm import Session, contains_eager
 
 from app.config import settings
-from app.database import SessionLocal
+from app.database import SessionLocal, engine
 from app import models
 from app.services.x_client import get_twitter_client
 from app.services.ai_generator import get_ai_generator
+from app.services import retry, monitoring, profiling, recurrence, media, timeline_sync, partitioning, metric_buffer, metric_partitions, heatmap, live_updates, ai_quota, sentiment, drain_planner, resilience
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Most variants the generator is asked for in one call
+DRAFTS_PER_CALL = 5
+
+# Sweeps run once per partition, each on the worker owning it (see
+# dispatch_sweep), and the queue whose workers share them out
+PARTITIONED_SWEEPS = {
+    'app.tasks.scheduler.check_scheduled_tweets': 'posting',
+    'app.tasks.scheduler.update_tweet_metrics': 'metrics',
+}
+
 # Initialize Celery
 celery_app = Celery(
     'x_post_automation',
@@ -24,65 +43,230 @@ celery_app.conf.update(
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
+    # One queue per workload so a long campaign-generation run or a big
+    # metrics backlog can never sit in front of a due post. Each queue is
+    # served by its own worker profile (see docker-compose.yml); a single
+    # dev worker can take all of them with
+    # -Q posting,metrics,ai_generation,maintenance,default
+    task_queues=(
+        Queue('posting'),  # Due and "post now" tweets, latency critical
+        Queue('metrics'),  # Engagement metric sweeps, media pre-upload, timeline sync
+        Queue('ai_generation'),  # Campaign draft pre-generation (slow LLM calls)
+        Queue('maintenance'),  # Campaign scheduling from the draft buffer, housekeeping
+        Queue('default'),
+    ),
+    task_default_queue='default',
+    # Each worker also consumes its own direct queue, which partitioned
+    # sweeps are sent to
+    worker_direct=True,
+    task_routes={
+        'app.tasks.scheduler.dispatch_sweep': {'queue': 'posting', 'priority': 0},
+        'app.tasks.scheduler.check_scheduled_tweets': {'queue': 'posting', 'priority': 0},
+        'app.tasks.scheduler.post_tweet_now': {'queue': 'posting', 'priority': 0},
+        'app.tasks.scheduler.update_tweet_metrics': {'queue': 'metrics', 'priority': 5},
+        'app.tasks.scheduler.preupload_media': {'queue': 'metrics', 'priority': 3},
+        'app.tasks.scheduler.sync_user_timelines': {'queue': 'metrics', 'priority': 7},
+        'app.tasks.scheduler.process_campaigns': {'queue': 'maintenance', 'priority': 3},
+        'app.tasks.scheduler.maintain_metric_partitions': {'queue': 'maintenance', 'priority': 7},
+        'app.tasks.scheduler.rebuild_heatmaps': {'queue': 'maintenance', 'priority': 9},
+        'app.tasks.scheduler.score_tweet_sentiment': {'queue': 'maintenance', 'priority': 9},
+        'app.tasks.scheduler.refill_campaign_buffers': {'queue': 'ai_generation', 'priority': 7},
+    },
+    # Redis has no native priorities: emulate them within a queue, and drain
+    # queues in the order given to -Q (posting first) when a worker serves several.
+    # Countdown tasks stay unacked until they run, and Redis redelivers them after
+    # the visibility timeout: it must outlast the longest countdown (retry backoff,
+    # drain dispatch horizon)
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'queue_order_strategy': 'priority',
+        'visibility_timeout': settings.BROKER_VISIBILITY_TIMEOUT_SECONDS,
+    },
+    # Reserve one task at a time so a slow task never holds others hostage
+    # in its prefetch buffer; throughput-bound workers raise it with
+    # --prefetch-multiplier
+    worker_prefetch_multiplier=1,
     beat_schedule={
         'check-scheduled-tweets': {
-            'task': 'app.tasks.scheduler.check_scheduled_tweets',
+            'task': 'app.tasks.scheduler.dispatch_sweep',
             'schedule': 60.0,  # Run every minute
+            'args': ('app.tasks.scheduler.check_scheduled_tweets', 55),
+            'options': {'expires': 55},  # Drop ticks a backed-up queue could not start in time
         },
         'update-tweet-metrics': {
-            'task': 'app.tasks.scheduler.update_tweet_metrics',
+            'task': 'app.tasks.scheduler.dispatch_sweep',
+            'schedule': 300.0,  # Run every 5 minutes
+            'args': ('app.tasks.scheduler.update_tweet_metrics', 290),
+            'options': {'expires': 290, 'queue': 'metrics', 'priority': 5},
+        },
+        'preupload-media': {
+            'task': 'app.tasks.scheduler.preupload_media',
             'schedule': 300.0,  # Run every 5 minutes
+            'options': {'expires': 290},
+        },
+        'sync-user-timelines': {
+            'task': 'app.tasks.scheduler.sync_user_timelines',
+            'schedule': float(settings.TIMELINE_SYNC_INTERVAL_SECONDS),
+            'options': {'expires': settings.TIMELINE_SYNC_INTERVAL_SECONDS - 10},
         },
         'process-campaigns': {
             'task': 'app.tasks.scheduler.process_campaigns',
-            'schedule': 3600.0,  # Run every hour
+            'schedule': 60.0,  # Run every minute; idle runs are one indexed query
+            'options': {'expires': 55},
+        },
+        'maintain-metric-partitions': {
+            'task': 'app.tasks.scheduler.maintain_metric_partitions',
+            'schedule': 21600.0,  # Every 6 hours; partitions exist months ahead
+            'options': {'expires': 3600},
+        },
+        'score-tweet-sentiment': {
+            'task': 'app.tasks.scheduler.score_tweet_sentiment',
+            'schedule': 900.0,  # Every 15 minutes; picks up synced and new tweets
+            'options': {'expires': 840},
+        },
+        'refill-campaign-buffers': {
+            'task': 'app.tasks.scheduler.refill_campaign_buffers',
+            'schedule': float(settings.CAMPAIGN_REFILL_INTERVAL_SECONDS),
+            'options': {'expires': settings.CAMPAIGN_REFILL_INTERVAL_SECONDS - 10},
         }
     }
 )
 
+monitoring.instrument_celery(settings.WORKER_METRICS_PORT)
+profiling.instrument_celery()
+metric_buffer.instrument_celery()
 
-@celery_app.task(name='app.tasks.scheduler.check_scheduled_tweets')
-def check_scheduled_tweets():
-    """Check and post scheduled tweets"""
+
+@celery_app.task(name='app.tasks.scheduler.dispatch_sweep')
+def dispatch_sweep(task_name: str, expires: int):
+    """
+    Fan a sweep out into one task per partition with due work
+    
+    Users are split into SWEEP_PARTITIONS partitions by user ID, and
+    partitions are assigned to the workers consuming the sweep's queue by
+    consistent hashing. A user's sweeps therefore keep landing on the same
+    worker, which keeps its client, connections and rate-limit cooldown
+    warm, and a worker joining or leaving only moves about 1/N of the
+    partitions. If no worker answers discovery, partitions go to the
+    shared queue instead.
+    
+    One grouped query finds the partitions with due rows; idle partitions
+    get no task. The metrics sweep's METRICS_SWEEP_BATCH_SIZE is a budget
+    for the whole sweep, shared out between the due partitions.
+    """
+    queue = PARTITIONED_SWEEPS[task_name]
+    sweep = celery_app.tasks[task_name]
+    
     db: Session = SessionLocal()
+    try:
+        due = _due_per_partition(db, task_name, datetime.utcnow())
+    finally:
+        db.close()
+    
+    if task_name == update_tweet_metrics.name:
+        args = {
+            partition: [partition, limit]
+            for partition, limit in partitioning.share(due, settings.METRICS_SWEEP_BATCH_SIZE).items()
+        }
+    else:
+        args = {partition: [partition] for partition in due}
+    
+    assignments = partitioning.plan(celery_app, queue)
+    for partition, partition_args in sorted(args.items()):
+        worker = assignments[partition]
+        options = {'queue': worker_direct(worker)} if worker else {}
+        sweep.apply_async(args=partition_args, expires=expires, **options)
+    
+    workers = {assignments[partition] for partition in args}
+    return f"Dispatched {len(args)} of {len(assignments)} partitions to {len(workers)} workers"
+
+
+@celery_app.task(name='app.tasks.scheduler.check_scheduled_tweets')
+def check_scheduled_tweets(partition: Optional[int] = None):
+    """
+    Check and post scheduled tweets
+    
+    Due tweets are loaded with their users in a single query and posted
+    per user through one shared client. Each user's batch is claimed
+    with one locked SELECT, so overlapping sweeps never post a tweet
+    twice, and its outcomes are written in one commit.
+    Queued/retrying tweets whose task was lost go back through
+    post_tweet_now rather than being posted here. A backlog (e.g.
+    after an outage) is not posted in a burst: drain_planner spreads it
+    within the user's rate budget, and each sweep sends the slots of the
+    next few minutes as delayed post_tweet_now tasks.
+    With `partition` only that partition's users are swept.
+    """
+    # Posted tweets are not re-read after each commit
+    db: Session = SessionLocal(expire_on_commit=False)
     
     try:
         now = datetime.utcnow()
         
-        # Get tweets scheduled for posting
-        scheduled_tweets = db.query(models.Tweet).filter(
-            models.Tweet.status == "scheduled",
-            models.Tweet.scheduled_at <= now
-        ).all()
+        # Get tweets scheduled for posting, plus queued/retrying tweets
+        # whose re-enqueued task was lost (worker restart, broker flush)
+        query = db.query(models.Tweet).join(models.Tweet.user).options(
+            contains_eager(models.Tweet.user)
+        ).filter(*_posting_due(now))
+        if partition is not None:
+            query = query.filter(partitioning.partition_filter(models.Tweet.user_id, partition))
+        scheduled_tweets = query.order_by(models.Tweet.user_id, models.Tweet.scheduled_at).all()
         
         logger.info(f"Found {len(scheduled_tweets)} tweets to post")
         
-        for tweet in scheduled_tweets:
-            try:
-                user = db.query(models.User).filter(
-                    models.User.id == tweet.user_id
-                ).first()
-                
-                if not user or not user.api_key:
-                    logger.warning(f"User {tweet.user_id} has no API key")
-                    continue
-                
-                # Post to Twitter
-                twitter_client = get_twitter_client(user.api_key)
-                result = twitter_client.post_tweet(tweet.text, tweet.media_links)
-                
-                # Update tweet status
-                tweet.tweet_id_twitter = result.get("id_str")
-                tweet.status = "posted"
-                tweet.posted_at = datetime.utcnow()
-                
-                db.commit()
-                logger.info(f"Posted tweet {tweet.id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to post tweet {tweet.id}: {str(e)}")
-                tweet.status = "failed"
-                db.commit()
+        posted_last_hour, drain_until = _posting_state(db, {tweet.user_id for tweet in scheduled_tweets}, now)
+        catch_up = max(drain_until.values(), default=now)
+        
+        for user_id, user_tweets in groupby(scheduled_tweets, key=attrgetter("user_id")):
+            user_tweets = list(user_tweets)
+            user = user_tweets[0].user
+            
+            if not user.api_key:
+                logger.warning(f"User {user_id} has no API key")
+                continue
+            
+            twitter_client = get_twitter_client(user.api_key)
+            
+            if drain_planner.needs_drain(len(user_tweets), drain_until.get(user_id)):
+                slots = drain_planner.plan(
+                    user_tweets,
+                    now,
+                    posted_last_hour.get(user_id, 0),
+                    drain_until.get(user_id),
+                    _cooldown_end(twitter_client, now)
+                )
+                dispatched = _dispatch_drain(db, slots, now)
+                catch_up = max(catch_up, slots[-1][1])
+                logger.warning(
+                    f"User {user_id} draining a backlog of {len(slots)} tweets "
+                    f"{drain_planner.spacing():.0f}s apart: queued the next {dispatched}, "
+                    f"caught up by {slots[-1][1]:%Y-%m-%d %H:%M} UTC"
+                )
+                continue
+            
+            # Per-user hourly budget; the rest waits for a later sweep
+            budget = max(0, settings.MAX_POSTS_PER_HOUR - posted_last_hour.get(user_id, 0))
+            if budget < len(user_tweets):
+                logger.warning(
+                    f"User {user_id} over hourly post budget, deferring "
+                    f"{len(user_tweets) - budget} tweets"
+                )
+            
+            if _cooling_down(twitter_client):
+                logger.info(f"User {user_id} rate limited, deferring {len(user_tweets)} tweets")
+                continue
+            
+            # A lost task may only be late: resume through post_tweet_now,
+            # whose row lock and status check stop the original posting again
+            user_tweets = user_tweets[:budget]
+            _resume_lost(db, [tweet for tweet in user_tweets if tweet.status != "scheduled"], now)
+            _post_claimed(db, twitter_client, user_id, _claim(db, [
+                tweet for tweet in user_tweets if tweet.status == "scheduled"
+            ]))
+        
+        monitoring.POSTING_CATCH_UP.labels(
+            partition="all" if partition is None else str(partition)
+        ).set((catch_up - now).total_seconds())
         
         return f"Processed {len(scheduled_tweets)} tweets"
         
@@ -91,61 +275,236 @@ def check_scheduled_tweets():
 
 
 @celery_app.task(name='app.tasks.scheduler.update_tweet_metrics')
-def update_tweet_metrics():
-    """Update metrics for posted tweets"""
+def update_tweet_metrics(partition: Optional[int] = None, limit: Optional[int] = None):
+    """
+    Update metrics for posted tweets
+    
+    Reads are a column-only projection joined with users. New metric rows
+    go to the process's write-behind buffer, which writes them in bulk
+    (COPY on Postgres) across sweeps; backoff changes are one bulk update.
+    Engagement changes are folded into the users' hour-of-week heatmaps
+    and pushed to their live dashboards, one message per user.
+    With `partition` only that partition's users are swept. At most
+    `limit` tweets are refreshed, by default METRICS_SWEEP_BATCH_SIZE
+    (dispatch_sweep splits that between partitions).
+    """
     db: Session = SessionLocal()
     
     try:
-        # Get recently posted tweets (last 7 days)
-        recent_tweets = db.query(models.Tweet).filter(
-            models.Tweet.status == "posted",
-            models.Tweet.tweet_id_twitter.isnot(None)
-        ).limit(100).all()
+        now = datetime.utcnow()
+        
+        # Recently posted tweets (last 7 days), skipping those in backoff
+        due_filter = _metrics_due(now)
+        if partition is not None:
+            due_filter += (partitioning.partition_filter(models.Tweet.user_id, partition),)
+        monitoring.METRICS_SWEEP_BACKLOG.labels(
+            partition="all" if partition is None else str(partition)
+        ).set(
+            db.query(func.count(models.Tweet.id)).filter(*due_filter).scalar()
+        )
+        
+        recent_tweets = db.query(
+            models.Tweet.id,
+            models.Tweet.user_id,
+            models.Tweet.tweet_id_twitter,
+            models.Tweet.posted_at,
+            models.Tweet.metrics_failures,
+            models.Tweet.heatmap_engagement,
+            models.User.api_key
+        ).join(models.User).filter(
+            *due_filter,
+            models.User.api_key.isnot(None)
+        ).order_by(models.Tweet.user_id).limit(limit or settings.METRICS_SWEEP_BATCH_SIZE).all()
         
         logger.info(f"Updating metrics for {len(recent_tweets)} tweets")
         
-        for tweet in recent_tweets:
+        new_metrics = []
+        backoff_updates = []
+        heatmap_updates = []
+        heatmap_deltas = heatmap.HeatmapDeltas(now)
+        live_tweets = defaultdict(list)
+        live_engagement = defaultdict(int)
+        
+        for user_id, user_tweets in groupby(recent_tweets, key=attrgetter("user_id")):
+            user_tweets = list(user_tweets)
+            twitter_client = get_twitter_client(user_tweets[0].api_key)
+            if _cooling_down(twitter_client):
+                continue
+            
+            for tweet in user_tweets:
+                try:
+                    # Fetch metrics from Twitter
+                    metrics_data = twitter_client.get_tweet_metrics(tweet.tweet_id_twitter)
+                    
+                    # Calculate engagement rate
+                    total_engagement = (
+                        metrics_data['likes'] + 
+                        metrics_data['retweets'] + 
+                        metrics_data['replies']
+                    )
+                    engagement_rate = (
+                        total_engagement / metrics_data.get('impressions', 1) * 100
+                        if metrics_data.get('impressions') else 0
+                    )
+                    
+                    new_metrics.append({
+                        "tweet_id": tweet.id,
+                        "likes": metrics_data['likes'],
+                        "retweets": metrics_data['retweets'],
+                        "replies": metrics_data['replies'],
+                        "impressions": metrics_data.get('impressions'),
+                        "engagement_rate": engagement_rate,
+                        "timestamp": datetime.utcnow()
+                    })
+                    
+                    if total_engagement != tweet.heatmap_engagement:
+                        heatmap_deltas.add(user_id, tweet.posted_at, total_engagement, tweet.heatmap_engagement)
+                        heatmap_updates.append({"id": tweet.id, "heatmap_engagement": total_engagement})
+                        live_tweets[user_id].append({
+                            "id": tweet.id,
+                            "likes": metrics_data['likes'],
+                            "retweets": metrics_data['retweets'],
+                            "replies": metrics_data['replies'],
+                            "impressions": metrics_data.get('impressions'),
+                            "engagement": total_engagement
+                        })
+                        live_engagement[user_id] += total_engagement - (tweet.heatmap_engagement or 0)
+                    
+                    if tweet.metrics_failures:
+                        backoff_updates.append({
+                            "id": tweet.id,
+                            "metrics_failures": 0,
+                            "metrics_next_attempt_at": None
+                        })
+                    
+                except Exception as e:
+                    logger.error(f"Failed to update metrics for tweet {tweet.id}: {str(e)}")
+                    failures = (tweet.metrics_failures or 0) + 1
+                    backoff_updates.append({
+                        "id": tweet.id,
+                        "metrics_failures": failures,
+                        "metrics_next_attempt_at": retry.next_metrics_attempt(failures, e, now)
+                    })
+                    if retry.is_rate_limited(e):
+                        _start_cooldown(twitter_client, e)
+                        break
+        
+        metric_buffer.get_buffer().extend(new_metrics)
+        if backoff_updates:
+            db.execute(update(models.Tweet), backoff_updates)
+        if heatmap_updates:
+            db.execute(update(models.Tweet), heatmap_updates)
+        heatmap.apply(db, heatmap_deltas)
+        db.commit()
+        
+        # One message per user with the tweets whose engagement changed
+        live_updates.publish({
+            user_id: live_updates.metrics_message(now, tweets, live_engagement[user_id])
+            for user_id, tweets in live_tweets.items()
+        })
+        
+        return f"Updated metrics for {len(new_metrics)} of {len(recent_tweets)} tweets"
+        
+    finally:
+        db.close()
+
+
+@celery_app.task(name='app.tasks.scheduler.preupload_media')
+def preupload_media():
+    """
+    Upload media for tweets due within MEDIA_PREUPLOAD_LEAD_MINUTES
+    
+    Posting then reuses the stored media IDs and stays a single provider
+    call. IDs that would expire before use are uploaded again. Transient
+    failures are retried next run; permanent ones mark the media "failed"
+    and the tweet fails when it comes up for posting.
+    """
+    db: Session = SessionLocal(expire_on_commit=False)
+    
+    try:
+        now = datetime.utcnow()
+        horizon = now + timedelta(minutes=settings.MEDIA_PREUPLOAD_LEAD_MINUTES)
+        refresh_before = horizon + timedelta(seconds=settings.MEDIA_EXPIRY_MARGIN_SECONDS)
+        
+        tweets = db.query(models.Tweet).join(models.Tweet.user).options(
+            contains_eager(models.Tweet.user)
+        ).filter(
+            models.Tweet.status == "scheduled",
+            models.Tweet.scheduled_at <= horizon,
+            or_(
+                models.Tweet.media_status == "pending",
+                and_(
+                    models.Tweet.media_status == "ready",
+                    models.Tweet.media_expires_at < refresh_before
+                )
+            )
+        ).order_by(models.Tweet.user_id, models.Tweet.scheduled_at).all()
+        
+        prepared = 0
+        for user_id, user_tweets in groupby(tweets, key=attrgetter('user_id')):
+            user_tweets = list(user_tweets)
+            twitter_client = get_twitter_client(user_tweets[0].user.api_key)
+            
+            for tweet in user_tweets:
+                tweet_id = tweet.id
+                try:
+                    media.prepare_tweet_media(db, tweet, twitter_client, datetime.utcnow())
+                    db.commit()
+                    prepared += 1
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Media pre-upload failed for tweet {tweet_id}: {str(e)}")
+                    if not retry.is_retryable(e):
+                        tweet.media_status = "failed"
+                        tweet.last_error = str(e)[:1000]
+                        db.commit()
+                    elif retry.is_rate_limited(e):
+                        break
+        
+        return f"Prepared media for {prepared} tweets"
+        
+    finally:
+        db.close()
+
+
+@celery_app.task(name='app.tasks.scheduler.sync_user_timelines')
+def sync_user_timelines(user_id: Optional[int] = None):
+    """
+    Import users' existing tweets and metrics from their timelines
+    
+    Users are synced least recently synced first, TIMELINE_SYNC_BATCH_SIZE
+    per run, each committed on its own. New accounts are backfilled a few
+    pages per run; after that a run is one call per user fetching only
+    tweets newer than the stored cursor. Pass `user_id` to sync one user
+    straight away (e.g. after registration).
+    """
+    db: Session = SessionLocal()
+    
+    try:
+        query = db.query(models.User).filter(
+            models.User.twitter_username.isnot(None),
+            models.User.api_key.isnot(None)
+        )
+        if user_id is not None:
+            query = query.filter(models.User.id == user_id)
+        users = query.order_by(
+            models.User.timeline_synced_at.asc().nullsfirst()
+        ).limit(settings.TIMELINE_SYNC_BATCH_SIZE).all()
+        
+        stored = 0
+        for user in users:
+            current_id = user.id
             try:
-                user = db.query(models.User).filter(
-                    models.User.id == tweet.user_id
-                ).first()
-                
-                if not user or not user.api_key:
-                    continue
-                
-                # Fetch metrics from Twitter
                 twitter_client = get_twitter_client(user.api_key)
-                metrics_data = twitter_client.get_tweet_metrics(tweet.tweet_id_twitter)
-                
-                # Calculate engagement rate
-                total_engagement = (
-                    metrics_data['likes'] + 
-                    metrics_data['retweets'] + 
-                    metrics_data['replies']
-                )
-                engagement_rate = (
-                    total_engagement / metrics_data.get('impressions', 1) * 100
-                    if metrics_data.get('impressions') else 0
-                )
-                
-                # Create new metric entry
-                metric = models.Metric(
-                    tweet_id=tweet.id,
-                    likes=metrics_data['likes'],
-                    retweets=metrics_data['retweets'],
-                    replies=metrics_data['replies'],
-                    impressions=metrics_data.get('impressions'),
-                    engagement_rate=engagement_rate,
-                    timestamp=datetime.utcnow()
-                )
-                
-                db.add(metric)
+                stored += timeline_sync.sync_user(db, twitter_client, user, datetime.utcnow())
                 db.commit()
-                
             except Exception as e:
-                logger.error(f"Failed to update metrics for tweet {tweet.id}: {str(e)}")
+                db.rollback()
+                logger.error(f"Timeline sync failed for user {current_id}: {str(e)}")
+                if retry.is_rate_limited(e):
+                    break
         
-        return f"Updated metrics for {len(recent_tweets)} tweets"
+        return f"Synced {len(users)} users, stored {stored} tweets"
         
     finally:
         db.close()
@@ -153,98 +512,699 @@ def update_tweet_metrics():
 
 @celery_app.task(name='app.tasks.scheduler.process_campaigns')
 def process_campaigns():
-    """Process active campaigns and generate/schedule tweets"""
+    """
+    Schedule buffered drafts for due campaign occurrences
+    
+    Campaigns are picked through the next_fire_at index, so a run costs
+    a few queries plus work for the due campaigns only. Claimed rows are
+    locked with SKIP LOCKED so overlapping runs never share a campaign.
+    Each occurrence's tweets are written together with the advanced
+    next_fire_at; with the unique (campaign_id, campaign_slot,
+    occurrence_at) index this gives at most one tweet per slot and
+    occurrence.
+    
+    Content comes only from the pre-generated buffer kept full by
+    refill_campaign_buffers; no provider call is made here. Slots without
+    an offset_minutes are placed in the user's best open hour within
+    CAMPAIGN_AUTO_PLACE_WINDOW_HOURS of the occurrence, read from the
+    stored engagement heatmap. One-off campaigns (no recurrence) fire
+    once and then drop out of the index.
+    """
     db: Session = SessionLocal()
     
     try:
-        active_campaigns = db.query(models.Campaign).filter(
+        now = datetime.utcnow()
+        horizon = now + timedelta(minutes=settings.CAMPAIGN_LEAD_MINUTES)
+        misfire_before = now - timedelta(minutes=settings.CAMPAIGN_MISFIRE_GRACE_MINUTES)
+        
+        # Due campaigns and their users in one query
+        due_campaigns = db.query(models.Campaign).join(models.Campaign.user).options(
+            contains_eager(models.Campaign.user)
+        ).filter(
+            models.Campaign.next_fire_at <= horizon,
             models.Campaign.active == True
+        ).order_by(
+            models.Campaign.next_fire_at
+        ).limit(settings.CAMPAIGN_BATCH_SIZE).with_for_update(
+            of=models.Campaign, skip_locked=True
         ).all()
         
-        logger.info(f"Processing {len(active_campaigns)} active campaigns")
+        if not due_campaigns:
+            return "Processed 0 campaigns"
+        
+        logger.info(f"Processing {len(due_campaigns)} due campaigns")
+        campaign_ids = [c.id for c in due_campaigns]
+        
+        # Slots already scheduled for these occurrences (earlier partial run)
+        existing = set(db.query(
+            models.Tweet.campaign_id, models.Tweet.campaign_slot, models.Tweet.occurrence_at
+        ).filter(
+            models.Tweet.campaign_id.in_(campaign_ids),
+            models.Tweet.occurrence_at.in_(list({c.next_fire_at for c in due_campaigns}))
+        ).all())
         
-        for campaign in active_campaigns:
+        # Buffered drafts per slot, best scored first; expired ones wait for the refill to prune them
+        drafts = defaultdict(list)
+        for draft in db.query(models.CampaignDraft).filter(
+            models.CampaignDraft.campaign_id.in_(campaign_ids),
+            models.CampaignDraft.created_at >= _drafts_expire_before(now)
+        ).order_by(
+            models.CampaignDraft.viral_score.desc().nullslast(), models.CampaignDraft.id
+        ):
+            drafts[(draft.campaign_id, draft.slot)].append(draft)
+        
+        placement = _auto_placement(db, due_campaigns)
+        
+        scheduled = 0
+        starved = []
+        
+        for campaign in due_campaigns:
+            occurrence = campaign.next_fire_at
             try:
-                user = db.query(models.User).filter(
-                    models.User.id == campaign.user_id
-                ).first()
-                
-                if not user:
-                    continue
+                with db.begin_nested():
+                    if recurrence.to_utc_naive(occurrence) < misfire_before:
+                        logger.warning(f"Campaign {campaign.id} missed its {occurrence} occurrence, skipping")
+                        campaign.next_fire_at = recurrence.next_fire_time(campaign.recurrence, now)
+                        continue
+                    
+                    created, missing = _schedule_occurrence(db, campaign, occurrence, existing, drafts, placement)
+                    scheduled += created
+                    
+                    if missing and recurrence.to_utc_naive(occurrence) > now:
+                        # Keep the occurrence due; a refill may still land before it fires
+                        starved.append(campaign.id)
+                        continue
+                    
+                    if missing:
+                        logger.warning(f"Campaign {campaign.id}: no draft for {missing} slot(s) at {occurrence}")
+                        monitoring.CAMPAIGN_BUFFER_MISSES.inc(missing)
+                    campaign.next_fire_at = recurrence.next_fire_time(campaign.recurrence, occurrence)
                 
-                # Check if we need to generate new tweets for this campaign
-                # Based on campaign slots and recurrence
+            except Exception as e:
+                # next_fire_at is left as is, so the occurrence is retried next run
+                logger.error(f"Failed to process campaign {campaign.id}: {str(e)}")
+        
+        db.commit()
+        
+        for campaign_id in starved:
+            refill_campaign_buffers.apply_async(args=[campaign_id], expires=60)
+        
+        return f"Processed {len(due_campaigns)} campaigns, scheduled {scheduled} tweets"
+        
+    finally:
+        db.close()
+
+
+def _auto_placement(db: Session, campaigns: List[models.Campaign]) -> Optional[Tuple[dict, dict]]:
+    """
+    Heatmaps and already used posting hours of the users whose campaigns
+    have auto-placed slots, or None if no campaign has one
+    
+    Two queries for the whole batch; _schedule_occurrence adds the hours
+    it picks so slots of one run spread out.
+    """
+    auto = [
+        c for c in campaigns
+        if any(_auto_placed(c, slot) for slot in (c.slots or []))
+    ]
+    if not auto:
+        return None
+    
+    user_ids = list({c.user_id for c in auto})
+    occurrences = [recurrence.to_utc_naive(c.next_fire_at) for c in auto]
+    window_end = max(occurrences) + timedelta(hours=settings.CAMPAIGN_AUTO_PLACE_WINDOW_HOURS)
+    
+    taken = defaultdict(set)
+    for user_id, scheduled_at in db.query(models.Tweet.user_id, models.Tweet.scheduled_at).filter(
+        models.Tweet.user_id.in_(user_ids),
+        models.Tweet.status.in_(["scheduled", "queued", "retrying"]),
+        models.Tweet.scheduled_at >= min(occurrences),
+        models.Tweet.scheduled_at < window_end
+    ):
+        taken[user_id].add(heatmap.hour_start(scheduled_at))
+    
+    return heatmap.load(db, user_ids), taken
+
+
+def _auto_placed(campaign: models.Campaign, slot: dict) -> bool:
+    """Whether a slot goes to the best open hour rather than a set time"""
+    if 'offset_minutes' in slot:
+        return False
+    return bool(campaign.recurrence) or recurrence.slot_time(slot) is None
+
+
+def _schedule_occurrence(
+    db: Session,
+    campaign: models.Campaign,
+    occurrence: datetime,
+    existing: set,
+    drafts: Dict[tuple, list],
+    placement: Optional[Tuple[dict, dict]] = None
+) -> Tuple[int, int]:
+    """
+    Schedule the best buffered draft for each campaign slot at `occurrence`
+    
+    Slots with offset_minutes fire that long after the occurrence, and
+    slots of one-off campaigns with a scheduled_at at that time; the
+    others go to the best open hour found by heatmap.place(), or the
+    occurrence itself while the user has no engagement data.
+    
+    Returns:
+        (tweets scheduled, slots with no draft available)
+    """
+    created = missing = 0
+    
+    for index, slot in enumerate(campaign.slots or []):
+        if (campaign.id, index, occurrence) in existing:
+            continue
+        
+        buffered = drafts.get((campaign.id, index))
+        if not buffered:
+            missing += 1
+            continue
+        
+        draft = buffered.pop(0)
+        fixed_at = None if campaign.recurrence else recurrence.slot_time(slot)
+        if fixed_at is not None:
+            scheduled_at = fixed_at
+        elif not _auto_placed(campaign, slot) or placement is None:
+            scheduled_at = occurrence + timedelta(minutes=slot.get('offset_minutes', 0))
+        else:
+            heatmaps, taken = placement
+            scheduled_at = heatmap.place(
+                heatmaps.get(campaign.user_id),
+                occurrence,
+                settings.CAMPAIGN_AUTO_PLACE_WINDOW_HOURS,
+                taken[campaign.user_id]
+            ) or occurrence
+        if placement is not None:
+            placement[1][campaign.user_id].add(heatmap.hour_start(scheduled_at))
+        
+        db.add(models.Tweet(
+            user_id=campaign.user_id,
+            text=draft.text,
+            generated_by_ai=True,
+            viral_score=draft.viral_score,
+            campaign_id=campaign.id,
+            campaign_slot=index,
+            occurrence_at=occurrence,
+            status="scheduled",
+            scheduled_at=scheduled_at
+        ))
+        db.delete(draft)
+        created += 1
+    
+    return created, missing
+
+
+@celery_app.task(name='app.tasks.scheduler.refill_campaign_buffers')
+def refill_campaign_buffers(campaign_id: Optional[int] = None):
+    """
+    Top up the pre-generated draft buffer of every campaign slot
+    
+    Each slot keeps one draft per occurrence within CAMPAIGN_BUFFER_HOURS
+    during off-peak hours, and within CAMPAIGN_BUFFER_URGENT_HOURS
+    otherwise. Drafts older than CAMPAIGN_DRAFT_MAX_AGE_HOURS are pruned
+    first and replaced. Generation calls wait in the shared Gemini quota at
+    background priority, which caps them at CAMPAIGN_REFILL_RPM_SHARE of
+    the per-minute limit and keeps interactive calls ahead of them; the
+    soonest occurrences are filled first. process_campaigns passes `campaign_id` to refill a campaign
+    whose buffer ran dry.
+    """
+    db: Session = SessionLocal()
+    
+    try:
+        now = datetime.utcnow()
+        hours = settings.CAMPAIGN_BUFFER_HOURS if _is_off_peak(now) else settings.CAMPAIGN_BUFFER_URGENT_HOURS
+        horizon = now + timedelta(hours=hours)
+        
+        # Low-scored drafts may never be picked; drop them before they go stale
+        expired = db.query(models.CampaignDraft).filter(
+            models.CampaignDraft.created_at < _drafts_expire_before(now)
+        ).delete(synchronize_session=False)
+        if expired:
+            db.commit()
+            logger.info(f"Pruned {expired} expired campaign drafts")
+        
+        query = db.query(models.Campaign).filter(
+            models.Campaign.next_fire_at <= horizon,
+            models.Campaign.active == True
+        )
+        if campaign_id is not None:
+            query = query.filter(models.Campaign.id == campaign_id)
+        campaigns = query.order_by(models.Campaign.next_fire_at).all()
+        
+        if not campaigns:
+            return "Refilled 0 drafts"
+        
+        buffered = {
+            (row.campaign_id, row.slot): row.count
+            for row in db.query(
+                models.CampaignDraft.campaign_id,
+                models.CampaignDraft.slot,
+                func.count(models.CampaignDraft.id).label("count")
+            ).filter(
+                models.CampaignDraft.campaign_id.in_([c.id for c in campaigns])
+            ).group_by(models.CampaignDraft.campaign_id, models.CampaignDraft.slot)
+        }
+        
+        needs = []
+        for campaign in campaigns:
+            wanted = recurrence.count_occurrences(
+                campaign.recurrence, campaign.next_fire_at, horizon, settings.CAMPAIGN_BUFFER_MAX_DRAFTS
+            )
+            for index, slot in enumerate(campaign.slots or []):
+                deficit = wanted - buffered.get((campaign.id, index), 0)
+                if deficit > 0:
+                    needs.append((campaign.id, index, slot, deficit))
+        
+        if not needs:
+            return "Refilled 0 drafts"
+        
+        rpm = max(settings.GEMINI_REQUESTS_PER_MINUTE * settings.CAMPAIGN_REFILL_RPM_SHARE, 1)
+        budget = max(1, int(rpm * settings.CAMPAIGN_REFILL_INTERVAL_SECONDS / 60))
+        ai_generator = get_ai_generator()
+        calls = added = 0
+        
+        for target_id, index, slot, deficit in needs:
+            while deficit > 0 and calls < budget:
+                calls += 1
                 
-                for slot in campaign.slots:
-                    # Generate AI content for each slot
-                    ai_generator = get_ai_generator()
+                try:
+                    # Not coalesced: repeated prompts for a slot must yield new drafts
                     variants = ai_generator.generate_tweet_variants(
                         topic=slot.get('topic', 'general'),
                         tone=slot.get('tone', 'professional'),
-                        num_variants=1
+                        num_variants=min(deficit, DRAFTS_PER_CALL),
+                        priority=ai_quota.BACKGROUND,
+                        coalesce=False
                     )
-                    
-                    if variants:
-                        # Schedule the tweet
-                        tweet = models.Tweet(
-                            user_id=user.id,
-                            text=variants[0]['text'],
-                            generated_by_ai=True,
-                            viral_score=variants[0].get('viral_score'),
-                            campaign_id=campaign.id,
-                            status="scheduled",
-                            scheduled_at=slot.get('scheduled_at')
-                        )
-                        db.add(tweet)
+                except ai_quota.QuotaError as e:
+                    logger.warning(f"Draft generation for campaign {target_id} deferred: {str(e)}")
+                    return f"Refilled {added} drafts in {calls - 1} calls (quota)"
+                except Exception as e:
+                    # Provider trouble: stop here, the next run picks up the rest
+                    logger.error(f"Draft generation failed for campaign {target_id}: {str(e)}")
+                    return f"Refilled {added} drafts in {calls} calls (stopped on error)"
                 
-                db.commit()
-                logger.info(f"Processed campaign {campaign.id}")
+                new_drafts = [
+                    models.CampaignDraft(
+                        campaign_id=target_id,
+                        slot=index,
+                        text=variant['text'],
+                        viral_score=variant.get('viral_score')
+                    )
+                    for variant in variants[:deficit] if variant.get('text')
+                ]
+                if not new_drafts:
+                    break
                 
+                db.add_all(new_drafts)
+                db.commit()
+                monitoring.CAMPAIGN_DRAFTS_GENERATED.inc(len(new_drafts))
+                added += len(new_drafts)
+                deficit -= len(new_drafts)
+        
+        return f"Refilled {added} drafts in {calls} calls"
+        
+    finally:
+        db.close()
+
+
+def _drafts_expire_before(now: datetime) -> datetime:
+    """Drafts created before this are too old to post (CAMPAIGN_DRAFT_MAX_AGE_HOURS)"""
+    return now - timedelta(hours=settings.CAMPAIGN_DRAFT_MAX_AGE_HOURS)
+
+
+def _is_off_peak(now: datetime) -> bool:
+    """Whether `now` (UTC) falls in CAMPAIGN_REFILL_OFF_PEAK_HOURS"""
+    start, _, end = settings.CAMPAIGN_REFILL_OFF_PEAK_HOURS.partition("-")
+    start, end = int(start), int(end or start)
+    if start <= end:
+        return start <= now.hour <= end
+    return now.hour >= start or now.hour <= end
+
+
+@celery_app.task(name='app.tasks.scheduler.maintain_metric_partitions')
+def maintain_metric_partitions():
+    """
+    Create upcoming monthly metric partitions and expire old ones
+    
+    A no-op unless metrics is partitioned (Postgres).
+    """
+    with engine.begin() as conn:
+        result = metric_partitions.maintain(conn, datetime.utcnow())
+    
+    return f"Created {len(result['created'])} and expired {len(result['expired'])} metric partitions"
+
+
+@celery_app.task(name='app.tasks.scheduler.rebuild_heatmaps')
+def rebuild_heatmaps(user_id: Optional[int] = None):
+    """
+    Recompute engagement heatmaps from stored metrics
+    
+    Not scheduled: sweeps keep heatmaps current incrementally. Run once
+    after upgrading to seed them for existing tweets, or after changing
+    HEATMAP_HALF_LIFE_DAYS. One transaction per user.
+    """
+    db: Session = SessionLocal()
+    
+    try:
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = [row.id for row in db.query(models.User.id).order_by(models.User.id)]
+        
+        now = datetime.utcnow()
+        counted = 0
+        for current_id in user_ids:
+            try:
+                counted += heatmap.rebuild(db, current_id, now)
+                db.commit()
             except Exception as e:
-                logger.error(f"Failed to process campaign {campaign.id}: {str(e)}")
+                db.rollback()
+                logger.error(f"Heatmap rebuild failed for user {current_id}: {str(e)}")
         
-        return f"Processed {len(active_campaigns)} campaigns"
+        return f"Rebuilt {len(user_ids)} heatmaps from {counted} tweets"
         
     finally:
         db.close()
 
 
+@celery_app.task(name='app.tasks.scheduler.score_tweet_sentiment')
+def score_tweet_sentiment(user_id: Optional[int] = None):
+    """
+    Score tweets that have no sentiment yet with the local model
+    
+    Makes no Gemini calls, so backfilling the whole history is free.
+    """
+    db: Session = SessionLocal()
+    
+    try:
+        scored = sentiment.backfill(db, user_id)
+        return f"Scored sentiment of {scored} tweets"
+    finally:
+        db.close()
+
+
 @celery_app.task(name='app.tasks.scheduler.post_tweet_now')
 def post_tweet_now(tweet_id: int):
     """Post a tweet immediately (async task)"""
     db: Session = SessionLocal()
+    tweet = None
     
     try:
-        tweet = db.query(models.Tweet).filter(models.Tweet.id == tweet_id).first()
+        # Lock the row so a duplicate delivery waits and then sees "posted";
+        # the API key comes with it (it is never cached)
+        row = db.query(models.Tweet, models.User.api_key).join(
+            models.User, models.User.id == models.Tweet.user_id
+        ).filter(
+            models.Tweet.id == tweet_id
+        ).with_for_update(of=models.Tweet).first()
         
-        if not tweet:
+        if not row:
             raise ValueError(f"Tweet {tweet_id} not found")
+        tweet, api_key = row
         
-        user = db.query(models.User).filter(models.User.id == tweet.user_id).first()
+        # Redelivered or duplicate task: never post the same tweet twice
+        if tweet.status in ("posted", "dead"):
+            logger.info(f"Tweet {tweet_id} is {tweet.status}, skipping")
+            return {"status": "skipped", "tweet_id": tweet_id}
         
-        if not user or not user.api_key:
+        if not api_key:
             raise ValueError("User API key not configured")
         
         # Post to Twitter
-        twitter_client = get_twitter_client(user.api_key)
-        result = twitter_client.post_tweet(tweet.text, tweet.media_links)
+        twitter_client = get_twitter_client(api_key)
+        media_ids = media.media_ids_for_post(db, tweet, twitter_client, datetime.utcnow())
+        result = twitter_client.post_tweet(tweet.text, media_ids)
         
         # Update tweet
-        tweet.tweet_id_twitter = result.get("id_str")
-        tweet.status = "posted"
-        tweet.posted_at = datetime.utcnow()
+        retry.record_post_success(tweet, result, datetime.utcnow())
         
         db.commit()
+        monitoring.observe_scheduling_lag(tweet.scheduled_at, tweet.posted_at)
         logger.info(f"Posted tweet {tweet_id}")
         
         return {"status": "success", "tweet_id": tweet_id}
         
+    except resilience.Rejected as e:
+        # Never reached the provider: no attempt used, try again once the
+        # breaker or bulkhead lets calls through
+        db.rollback()
+        logger.warning(f"Posting tweet {tweet_id} deferred: {str(e)}")
+        _defer(db, tweet_id, e.retry_after)
+        return {"status": "deferred", "tweet_id": tweet_id}
+    
     except Exception as e:
         logger.error(f"Failed to post tweet {tweet_id}: {str(e)}")
-        if tweet:
-            tweet.status = "failed"
-            db.commit()
-        raise
+        if not tweet:
+            raise
+        if _handle_post_failure(db, tweet, e) is None:
+            raise
+        return {"status": "retrying", "tweet_id": tweet_id}
         
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def _cooling_down(twitter_client) -> bool:
+    """Whether the account behind this client is still waiting out a 429"""
+    return getattr(twitter_client, 'cooldown_until', 0.0) > time.monotonic()
+
+
+def _start_cooldown(twitter_client, exc: Exception) -> None:
+    """Skip the account in this process's sweeps until its Retry-After passes"""
+    wait = getattr(exc, 'retry_after', None) or settings.RETRY_BACKOFF_INITIAL_SECONDS
+    twitter_client.cooldown_until = time.monotonic() + wait
+
+
+def _cooldown_end(twitter_client, now: datetime) -> Optional[datetime]:
+    """When the account's 429 cooldown in this process ends, if it is cooling down"""
+    remaining = getattr(twitter_client, 'cooldown_until', 0.0) - time.monotonic()
+    return now + timedelta(seconds=remaining) if remaining > 0 else None
+
+
+def _dispatch_drain(db: Session, slots: List[Tuple[models.Tweet, datetime]], now: datetime) -> int:
+    """
+    Queue the tweets of a drain plan whose slot is within DRAIN_DISPATCH_HORIZON_SECONDS
+    
+    Later slots are left as they are: the next sweeps plan them again,
+    after the last queued slot, so countdowns stay short and hours-long
+    drains never sit in the broker. Tweets are marked queued with
+    next_attempt_at at their slot before any task is sent, so a lost task
+    (or a broker that is down) is picked up by the stale-retry recovery
+    of a later sweep. Returns how many tweets were queued.
+    """
+    horizon = now + timedelta(seconds=settings.DRAIN_DISPATCH_HORIZON_SECONDS)
+    slots = [(tweet, slot) for tweet, slot in slots if slot <= horizon]
+    if not slots:
+        return 0
+    
+    db.execute(update(models.Tweet), [
+        {"id": tweet.id, "status": "queued", "next_attempt_at": slot} for tweet, slot in slots
+    ])
+    db.commit()
+    monitoring.POSTING_DRAINED.inc(len(slots))
+    
+    for tweet, slot in slots:
+        try:
+            post_tweet_now.apply_async(args=[tweet.id], countdown=max(0.0, (slot - now).total_seconds()))
+        except Exception as e:
+            logger.error(f"Failed to queue drained tweet {tweet.id}, left for recovery: {str(e)}")
+            break
+    
+    return len(slots)
+
+
+def _claim(db: Session, tweets: List[models.Tweet]) -> List[models.Tweet]:
+    """
+    Lock a user's swept tweets for posting, until the next commit or rollback
+    
+    One locked SELECT for the batch. Tweets no longer scheduled, or held
+    by another sweep (e.g. an overlapping run of their partition after it
+    moved workers), are left out.
+    """
+    if not tweets:
+        return []
+    
+    claimed = {tweet_id for tweet_id, in db.query(models.Tweet.id).filter(
+        models.Tweet.id.in_([tweet.id for tweet in tweets]),
+        models.Tweet.status == "scheduled"
+    ).with_for_update(skip_locked=True)}
+    return [tweet for tweet in tweets if tweet.id in claimed]
+
+
+def _post_claimed(db: Session, twitter_client, user_id: int, tweets: List[models.Tweet]) -> None:
+    """
+    Post a user's claimed tweets and record every outcome in one commit
+    
+    The claim's row locks are held until that commit, so no other sweep
+    and no post_tweet_now can post these tweets meanwhile. The outcomes
+    go out as one batched UPDATE. A worker dying mid-batch loses the
+    batch's outcomes and its tweets are posted again by the next sweep;
+    batches stay small, since backlogs above DRAIN_BACKLOG_THRESHOLD
+    drain one tweet per post_tweet_now task instead.
+    """
+    if not tweets:
+        return
+    
+    posted = []
+    retrying = []
+    for tweet in tweets:
+        try:
+            media_ids = media.media_ids_for_post(db, tweet, twitter_client, datetime.utcnow())
+            result = twitter_client.post_tweet(tweet.text, media_ids)
+            retry.record_post_success(tweet, result, datetime.utcnow())
+            posted.append(tweet)
+        
+        except resilience.Rejected as e:
+            # Never reached the provider: no attempt used, the rest stay due
+            logger.warning(f"Posting for user {user_id} deferred: {str(e)}")
+            break
+        except Exception as e:
+            logger.error(f"Failed to post tweet {tweet.id}: {str(e)}")
+            delay = retry.record_post_failure(tweet, e, datetime.utcnow())
+            if delay is None:
+                logger.warning(f"Tweet {tweet.id} marked {tweet.status} after {tweet.attempts} attempts")
+            else:
+                retrying.append((tweet, delay))
+            # Rate limited: this user's remaining tweets wait for the next sweep
+            if retry.is_rate_limited(e):
+                _start_cooldown(twitter_client, e)
+                break
+    
+    db.commit()
+    
+    for tweet in posted:
+        monitoring.observe_scheduling_lag(tweet.scheduled_at, tweet.posted_at)
+        logger.info(f"Posted tweet {tweet.id}")
+    for tweet, delay in retrying:
+        post_tweet_now.apply_async(args=[tweet.id], countdown=delay)
+        logger.info(f"Retrying tweet {tweet.id} in {delay:.0f}s (attempt {tweet.attempts})")
+
+
+def _resume_lost(db: Session, tweets: List[models.Tweet], now: datetime) -> None:
+    """
+    Re-send queued/retrying tweets whose task was lost to post_tweet_now
+    
+    next_attempt_at moves to now first, so the tweets are only picked up
+    again if this task is lost as well.
+    """
+    if not tweets:
+        return
+    
+    db.execute(update(models.Tweet), [{"id": tweet.id, "next_attempt_at": now} for tweet in tweets])
+    db.commit()
+    for tweet in tweets:
+        post_tweet_now.apply_async(args=[tweet.id])
+    logger.warning(f"Resumed {len(tweets)} tweets whose posting task was lost")
+
+
+def _defer(db: Session, tweet_id: int, delay: float) -> None:
+    """
+    Re-send a tweet to post_tweet_now after `delay` seconds, attempts unchanged
+    
+    next_attempt_at moves with it, so stale-retry recovery only picks the
+    tweet up if this task is lost.
+    """
+    delay = max(1.0, delay)
+    db.execute(update(models.Tweet), [
+        {"id": tweet_id, "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay)}
+    ])
+    db.commit()
+    post_tweet_now.apply_async(args=[tweet_id], countdown=delay)
+
+
+def _handle_post_failure(db: Session, tweet: models.Tweet, exc: Exception):
+    """Record a failed post and re-enqueue it with backoff if it is transient"""
+    # Drop whatever half-flushed state the failed attempt left behind
+    db.rollback()
+    # The rollback released the row: take it back, and leave it alone if
+    # another worker has posted it meanwhile
+    db.refresh(tweet, with_for_update=True)
+    if tweet.status == "posted":
+        db.commit()
+        logger.info(f"Tweet {tweet.id} was posted by another worker meanwhile")
+        return None
+    delay = retry.record_post_failure(tweet, exc, datetime.utcnow())
+    db.commit()
+    
+    if delay is None:
+        logger.warning(f"Tweet {tweet.id} marked {tweet.status} after {tweet.attempts} attempts")
+        return None
+    
+    # Countdown instead of sleeping: the worker is free for other posts
+    post_tweet_now.apply_async(args=[tweet.id], countdown=delay)
+    logger.info(f"Retrying tweet {tweet.id} in {delay:.0f}s (attempt {tweet.attempts})")
+    return delay
+
+
+def _posting_due(now: datetime) -> Tuple:
+    """Criteria of tweets the posting sweep picks up"""
+    stale_before = now - timedelta(seconds=settings.RETRY_STALE_AFTER_SECONDS)
+    return (
+        or_(
+            and_(
+                models.Tweet.status == "scheduled",
+                models.Tweet.scheduled_at <= now
+            ),
+            and_(
+                models.Tweet.status.in_(("queued", "retrying")),
+                models.Tweet.next_attempt_at <= stale_before
+            )
+        ),
+    )
+
+
+def _metrics_due(now: datetime) -> Tuple:
+    """Criteria of tweets due for a metrics refresh"""
+    return (
+        models.Tweet.status == "posted",
+        models.Tweet.tweet_id_twitter.isnot(None),
+        models.Tweet.posted_at >= now - timedelta(days=7),
+        or_(
+            models.Tweet.metrics_next_attempt_at.is_(None),
+            models.Tweet.metrics_next_attempt_at <= now
+        )
+    )
+
+
+def _due_per_partition(db: Session, task_name: str, now: datetime) -> Dict[int, int]:
+    """Due tweets of a partitioned sweep per partition, omitting partitions with none"""
+    partition = (models.Tweet.user_id % settings.SWEEP_PARTITIONS).label("partition")
+    query = db.query(partition, func.count(models.Tweet.id))
+    if task_name == update_tweet_metrics.name:
+        query = query.join(models.User).filter(*_metrics_due(now), models.User.api_key.isnot(None))
+    else:
+        query = query.filter(*_posting_due(now))
+    return dict(query.group_by(partition).all())
+
+
+def _posting_state(
+    db: Session, user_ids: Iterable[int], now: datetime
+) -> Tuple[Dict[int, int], Dict[int, datetime]]:
+    """
+    Posts per user in the last hour (for MAX_POSTS_PER_HOUR accounting)
+    and the last slot of each user's running drain, in one query
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}, {}
+    
+    posted = and_(models.Tweet.status == "posted", models.Tweet.posted_at >= now - timedelta(hours=1))
+    draining = and_(models.Tweet.status == "queued", models.Tweet.next_attempt_at > now)
+    rows = db.query(
+        models.Tweet.user_id,
+        func.count(case((posted, models.Tweet.id))),
+        func.max(case((draining, models.Tweet.next_attempt_at)))
+    ).filter(
+        models.Tweet.user_id.in_(user_ids),
+        or_(posted, draining)
+    ).group_by(models.Tweet.user_id).all()
+    
+    posted_last_hour = {user_id: count for user_id, count, _ in rows if count}
+    drain_until = {
+        user_id: recurrence.to_utc_naive(last_slot) for user_id, _, last_slot in rows if last_slot is not None
+    }
+    return posted_last_hour, drain_until
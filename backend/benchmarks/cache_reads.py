@@ -0,0 +1,140 @@
+"""
+Read cache benchmark for the hot ORM reads
+
+Seeds users with campaigns and tweets, then sends a random mix of
+GET /campaigns/, GET /campaigns/{id} and GET /tweets/{id} (each also
+authenticating its user) through the app in-process, three ways:
+
+- off: CACHE_ENABLED=False, every read goes to the database
+- redis: only the Redis tier (local tier emptied before each request,
+  as in a process that has not seen the rows yet)
+- two-tier: local LRU in front of Redis
+
+Reports requests/second, database statements per request and the hit
+rate. Needs a reachable Redis (REDIS_URL). Against a local database the
+statements cost microseconds and the framework dominates; pass
+--db-latency-ms to add a network round trip to each statement.
+
+    cd backend && DATABASE_URL=postgresql://... python -m benchmarks.cache_reads --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+
+def seed(num_users: int, campaigns: int, tweets: int):
+    from app.database import SessionLocal, init_db, reset_db
+    from app import models
+
+    reset_db()
+    init_db()
+    db = SessionLocal()
+    try:
+        users = [models.User(username=f"bench-{i}", api_key=f"key-{i}") for i in range(num_users)]
+        db.add_all(users)
+        db.flush()
+        paths = []
+        for user in users:
+            rows = [models.Campaign(user_id=user.id, name=f"c{i}", slots=[{"topic": "t"}]) for i in range(campaigns)]
+            rows += [models.Tweet(user_id=user.id, text=f"tweet {i}", status="draft") for i in range(tweets)]
+            db.add_all(rows)
+            db.flush()
+            paths += [(user.username, "/campaigns/")]
+            paths += [(user.username, f"/campaigns/{row.id}") for row in rows if isinstance(row, models.Campaign)]
+            paths += [(user.username, f"/tweets/{row.id}") for row in rows if isinstance(row, models.Tweet)]
+        db.commit()
+        return paths
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--campaigns", type=int, default=5)
+    parser.add_argument("--tweets", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Added to every statement")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    elif "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/cache.db"
+
+    import httpx
+    from sqlalchemy import event
+
+    from app.auth.dependencies import create_access_token
+    from app.config import settings
+    from app.database import engine, get_redis
+    from app.main import app
+    from app.services import cache, monitoring
+
+    get_redis().ping()
+    # The local tier is only used once the invalidation feed is connected
+    cache._invalidations.ensure_started()
+    for _ in range(50):
+        if cache._invalidations.live:
+            break
+        time.sleep(0.1)
+    paths = seed(args.users, args.campaigns, args.tweets)
+    tokens = {username: create_access_token({"sub": username}) for username, _ in paths}
+    rng = random.Random(7)
+    workload = [rng.choice(paths) for _ in range(args.requests)]
+    print(
+        f"backend: {engine.dialect.name} (+{args.db_latency_ms:g} ms/statement), "
+        f"{len(paths)} distinct reads, {args.requests} requests"
+    )
+
+    statements = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(*_):
+        statements[0] += 1
+        if args.db_latency_ms:
+            time.sleep(args.db_latency_ms / 1000)
+
+    async def send(requests, local_tier=True):
+        # One event loop for the whole run: TestClient's per-request portals pile up garbage that skews later modes
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for username, path in requests:
+                if not local_tier:
+                    cache._local.clear()
+                response = await client.get(path, headers={"Authorization": f"Bearer {tokens[username]}"})
+                assert response.status_code == 200, (path, response.status_code)
+
+    # Untimed pass so that the first mode does not pay for warm-up
+    settings.CACHE_ENABLED = False
+    asyncio.run(send(paths))
+
+    def tiers():
+        return {
+            tier: sum(monitoring.CACHE_REQUESTS.labels(model, tier)._value.get() for model in cache.MODELS.values())
+            for tier in ("local", "redis", "miss")
+        }
+
+    for mode in ("off", "redis", "two-tier"):
+        settings.CACHE_ENABLED = mode != "off"
+        get_redis().flushdb()
+        before = tiers()
+        statements[0] = 0
+        start = time.perf_counter()
+        asyncio.run(send(workload, local_tier=mode != "redis"))
+        elapsed = time.perf_counter() - start
+
+        counts = {tier: value - before[tier] for tier, value in tiers().items()}
+        lookups = sum(counts.values())
+        hit_rate = (counts["local"] + counts["redis"]) / lookups if lookups else 0.0
+        print(
+            f"  {mode:<9}{args.requests / elapsed:>8,.0f} req/s{statements[0] / args.requests:>7.2f} queries/req"
+            f"{hit_rate:>8.1%} hits (local {counts['local']:.0f}, redis {counts['redis']:.0f}, miss {counts['miss']:.0f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Metric history export throughput and memory
+
+Seeds one user with N metric snapshots, then exports them:
+
+- list: the ORM query + list the per-tweet metrics endpoint uses, as a baseline
+- csv / ndjson / parquet: app.services.export streamed to /dev/null
+  (parquet only when pyarrow is installed)
+
+Reports rows/minute and the peak Python heap (tracemalloc, measured in a
+second pass so it does not slow the timed one). Streamed peaks should
+stay flat as N grows; the script exits non-zero if one grows more than
+--max-growth times between the smallest and largest N.
+
+    cd backend && DATABASE_URL=postgresql://... python -m benchmarks.export_throughput --rows 100000 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+SEED_BATCH = 100000
+
+
+def seed(num_rows: int, num_tweets: int) -> int:
+    from app.database import SessionLocal, engine, init_db, reset_db
+    from app import models
+    from app.services.metric_buffer import write_metrics
+    from sqlalchemy import insert
+
+    reset_db()
+    init_db()
+    db = SessionLocal()
+    try:
+        user = models.User(username="bench", api_key="key")
+        db.add(user)
+        db.flush()
+        tweet_ids = db.execute(
+            insert(models.Tweet).returning(models.Tweet.id),
+            [
+                {"user_id": user.id, "text": f"tweet {i}", "status": "posted", "tweet_id_twitter": str(i)}
+                for i in range(num_tweets)
+            ]
+        ).scalars().all()
+        db.commit()
+        user_id = user.id
+    finally:
+        db.close()
+
+    # Spread over the last few days, all in partitions the migration created
+    now = datetime.utcnow()
+    for start in range(0, num_rows, SEED_BATCH):
+        write_metrics(engine, [
+            {
+                "tweet_id": tweet_ids[i % num_tweets],
+                "timestamp": now - timedelta(seconds=i % 259200),
+                "likes": i % 97,
+                "retweets": i % 31,
+                "replies": i % 13,
+                "impressions": 1000 + i,
+                "engagement_rate": (i % 141) / (1000 + i) * 100,
+                "extra_json": {}
+            }
+            for i in range(start, min(start + SEED_BATCH, num_rows))
+        ])
+    return user_id
+
+
+def listed(user_id: int) -> int:
+    """Baseline: every snapshot loaded as ORM objects, then serialised"""
+    from app.database import SessionLocal
+    from app import models, schemas
+
+    db = SessionLocal()
+    try:
+        metrics = db.query(models.Metric).join(models.Tweet).filter(models.Tweet.user_id == user_id).all()
+        payload = [schemas.Metric.model_validate(metric).model_dump_json() for metric in metrics]
+        return sum(len(item) for item in payload)
+    finally:
+        db.close()
+
+
+def streamed(fmt: str):
+    def run(user_id: int) -> int:
+        from app.database import SessionLocal
+        from app.services import export
+
+        size = 0
+        for chunk in export.stream(SessionLocal, "metrics", fmt, user_id):
+            size += len(chunk)
+        return size
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[50000, 200000])
+    parser.add_argument("--tweets", type=int, default=1000)
+    parser.add_argument("--max-growth", type=float, default=2.0)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    elif "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/export.db"
+
+    from app.database import engine
+    from app.services import export
+    print(f"backend: {engine.dialect.name}")
+
+    runners = [("list", listed)]
+    for fmt in export.FORMATS:
+        try:
+            export.check_format(fmt)
+        except ValueError as e:
+            print(f"skipping {fmt}: {e}")
+            continue
+        runners.append((fmt, streamed(fmt)))
+
+    peaks = {}
+    for num_rows in sorted(args.rows):
+        user_id = seed(num_rows, args.tweets)
+        print(f"{num_rows} snapshots:")
+        for name, fn in runners:
+            start = time.perf_counter()
+            size = fn(user_id)
+            elapsed = time.perf_counter() - start
+
+            tracemalloc.start()
+            fn(user_id)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            peaks.setdefault(name, []).append(peak)
+            print(
+                f"  {name:<8}{num_rows / elapsed * 60:>14,.0f} rows/min"
+                f"{size / 1e6:>10.1f} MB out{peak / 1e6:>10.1f} MB peak heap"
+            )
+
+    failed = False
+    for name, values in peaks.items():
+        if name != "list" and len(values) > 1 and values[-1] > values[0] * args.max_growth:
+            print(f"FAIL: {name} peak heap grew from {values[0] / 1e6:.1f} to {values[-1] / 1e6:.1f} MB")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
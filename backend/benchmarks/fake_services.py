@@ -0,0 +1,230 @@
+"""
+Local fake twitterapi.io and Gemini servers for load testing
+
+Both fakes speak just enough of the real wire format for
+TwitterAPIClient and GeminiAIGenerator (REST transport) to work against
+them, with configurable latency, error rate and 429 behaviour:
+
+    cd backend && python -m benchmarks.fake_services twitter --port 9101 \\
+        --latency-ms 150 --latency-sigma 0.6 --error-rate 0.02 --rate-limit 300 --rate-window 900
+    cd backend && python -m benchmarks.fake_services gemini --port 9102 --latency-ms 1200 --rate-limit 15 --rate-window 60
+
+Point the app at them with TWITTER_API_BASE_URL=http://127.0.0.1:9101 and
+GEMINI_API_ENDPOINT=http://127.0.0.1:9102.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from itertools import count
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+# Tweets already on each fake account's timeline at start
+TIMELINE_HISTORY = 250
+
+@dataclass
+class FaultProfile:
+    """Latency distribution, error injection and rate limiting for a fake"""
+
+    latency_ms: float = 100.0  # Median latency
+    latency_sigma: float = 0.5  # Log-normal spread; 0 gives a fixed latency
+    error_rate: float = 0.0  # Fraction of requests answered with 500
+    timeout_rate: float = 0.0  # Fraction of requests that hang for hang_seconds
+    hang_seconds: float = 60.0
+    rate_limit: int = 0  # Requests per key per window; 0 disables 429s
+    rate_window: float = 900.0
+    seed: int = 0
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+        self.hits = defaultdict(deque)
+
+    def latency(self) -> float:
+        if self.latency_sigma <= 0:
+            return self.latency_ms / 1000
+        return self.rng.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000
+
+    def throttle(self, key: str):
+        """Seconds until `key` may call again, or None if it is within its limit"""
+        if not self.rate_limit:
+            return None
+        now = time.monotonic()
+        hits = self.hits[key]
+        while hits and hits[0] <= now - self.rate_window:
+            hits.popleft()
+        if len(hits) >= self.rate_limit:
+            return hits[0] + self.rate_window - now
+        hits.append(now)
+        return None
+
+    async def inject(self, key: str):
+        """Apply faults for one request; returns an error response or None"""
+        retry_after = self.throttle(key)
+        if retry_after is not None:
+            return JSONResponse(
+                status_code=429,
+                content={"error": "rate limited"},
+                headers={"Retry-After": str(max(1, int(retry_after)))}
+            )
+        if self.timeout_rate and self.rng.random() < self.timeout_rate:
+            await asyncio.sleep(self.hang_seconds)
+        await asyncio.sleep(self.latency())
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return JSONResponse(status_code=500, content={"error": "injected failure"})
+        return None
+
+
+def create_twitter_app(profile: FaultProfile) -> FastAPI:
+    """Fake of the twitterapi.io endpoints used by TwitterAPIClient"""
+    app = FastAPI(title="fake twitterapi.io")
+    ids = count(10 ** 17)
+    app.state.posted = 0
+    app.state.uploads = 0
+    started = time.time()
+
+    @app.post("/twitter/tweet")
+    async def post_tweet(request: Request):
+        error = await profile.inject(request.headers.get("x-api-key", ""))
+        if error:
+            return error
+        body = await request.json()
+        app.state.posted += 1
+        return {"id_str": str(next(ids)), "text": body.get("text", "")}
+
+    @app.post("/twitter/media/upload")
+    async def upload_media(request: Request):
+        # INIT / APPEND / FINALIZE; only INIT and FINALIZE pay the fault profile
+        form = await request.form()
+        command = form.get("command")
+        if command == "APPEND":
+            return Response(status_code=204)
+        error = await profile.inject(request.headers.get("x-api-key", ""))
+        if error:
+            return error
+        if command == "INIT":
+            return {"media_id_string": str(next(ids)), "expires_after_secs": 86400}
+        app.state.uploads += 1
+        return {"media_id_string": form.get("media_id"), "expires_after_secs": 86400}
+
+    @app.get("/twitter/tweet/metrics")
+    async def tweet_metrics(tweetId: str, request: Request):
+        error = await profile.inject(request.headers.get("x-api-key", ""))
+        if error:
+            return error
+        seed = int(tweetId) if tweetId.isdigit() else hash(tweetId)
+        age = time.time() % 3600
+        return {
+            "like_count": int(seed % 97 + age / 60),
+            "retweet_count": int(seed % 31 + age / 300),
+            "reply_count": int(seed % 13 + age / 600),
+            "impression_count": int(seed % 5000 + age * 3)
+        }
+
+    @app.get("/twitter/user/tweets")
+    async def user_tweets(
+        userName: str,
+        request: Request,
+        count: int = 20,
+        sinceId: Optional[str] = None,
+        maxId: Optional[str] = None
+    ):
+        error = await profile.inject(request.headers.get("x-api-key", ""))
+        if error:
+            return error
+        # Synthetic timeline: TIMELINE_HISTORY old tweets plus one new tweet
+        # per minute since start, newest first
+        base = 10 ** 16 + (zlib.crc32(userName.encode()) % 10 ** 6) * 10 ** 6
+        newest = base + TIMELINE_HISTORY + int((time.time() - started) // 60)
+        top = min(newest, int(maxId)) if maxId else newest
+        bottom = max(base, int(sinceId) + 1) if sinceId else base
+        return {"tweets": [
+            {"id": str(tweet_id), "text": f"{userName} tweet {tweet_id}", "likeCount": tweet_id % 97, "viewCount": tweet_id % 5000}
+            for tweet_id in range(top, max(bottom, top - count + 1) - 1, -1)
+        ]}
+
+    @app.get("/_stats")
+    async def stats():
+        return {"posted": app.state.posted, "uploads": app.state.uploads}
+
+    return app
+
+
+def create_gemini_app(profile: FaultProfile) -> FastAPI:
+    """Fake of the Gemini generateContent REST endpoint"""
+    app = FastAPI(title="fake gemini")
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def generate_content(model: str, request: Request):
+        error = await profile.inject(request.query_params.get("key", "") or request.headers.get("x-goog-api-key", ""))
+        if error:
+            return error
+        variants = [
+            {"text": f"Load test tweet #{profile.rng.randint(1, 10 ** 6)} #loadtest", "viral_score": round(profile.rng.random(), 2)}
+            for _ in range(3)
+        ]
+        return {
+            "candidates": [{
+                "content": {"parts": [{"text": json.dumps(variants)}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0
+            }]
+        }
+
+    return app
+
+
+PROFILE_FIELDS = (
+    "latency_ms", "latency_sigma", "error_rate", "timeout_rate", "hang_seconds", "rate_limit", "rate_window"
+)
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser, prefix: str = ""):
+    """Register FaultProfile options, optionally prefixed (e.g. "twitter-")"""
+    defaults = FaultProfile()
+    for field in PROFILE_FIELDS:
+        parser.add_argument(
+            f"--{prefix}{field.replace('_', '-')}",
+            type=type(getattr(defaults, field)),
+            default=getattr(defaults, field)
+        )
+
+
+def profile_from_args(args) -> FaultProfile:
+    """Build a FaultProfile from options registered by add_profile_arguments"""
+    return FaultProfile(**{field: getattr(args, field) for field in PROFILE_FIELDS}, seed=args.seed)
+
+
+def profile_cli_args(args, prefix: str) -> list:
+    """Turn prefixed options (e.g. --twitter-latency-ms) back into a fake's CLI"""
+    attr = prefix.replace("-", "_")
+    cli = []
+    for field in PROFILE_FIELDS:
+        cli += [f"--{field.replace('_', '-')}", str(getattr(args, f"{attr}{field}"))]
+    return cli
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a fake external service")
+    parser.add_argument("service", choices=["twitter", "gemini"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    profile = profile_from_args(args)
+    app = create_twitter_app(profile) if args.service == "twitter" else create_gemini_app(profile)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Import-time check for the API and Celery entry points
+
+Imports each entry point in a fresh interpreter under `python -X
+importtime`. It reports the total time and the slowest top-level
+packages. It exits non-zero if a module that must load lazily (provider
+SDKs, ML libraries, alembic) is imported at startup, or if --budget-ms
+is exceeded.
+
+    cd backend && python -m benchmarks.import_time --repeat 5 --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from statistics import median
+
+ENTRY_POINTS = ["app.main", "app.tasks.scheduler"]
+
+# Loaded on first use only; importing any of these at startup is a regression
+LAZY_MODULES = [
+    "google.generativeai",
+    "openai",
+    "tweepy",
+    "textblob",
+    "numpy",
+    "pandas",
+    "sklearn",
+    "xgboost",
+    "lightgbm",
+    "sentence_transformers",
+    "alembic",
+    "pyarrow",
+]
+
+
+def import_profile(module: str) -> dict:
+    """Cumulative microseconds per imported module for one cold import of `module`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr}")
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cum, name = line[len("import time:"):].split("|")
+            cumulative[name.strip()] = int(cum)
+        except ValueError:
+            continue  # Header line
+    return cumulative
+
+
+def summarize(module: str, runs: list, top: int) -> dict:
+    """Median total and per-package times over several cold imports"""
+    by_package = defaultdict(list)
+    for cumulative in runs:
+        packages = defaultdict(int)
+        for name, micros in cumulative.items():
+            root = name.split(".")[0]
+            # Cumulative time of the outermost module of each package
+            if name == root or root not in cumulative:
+                packages[root] = max(packages[root], micros)
+        for root, micros in packages.items():
+            by_package[root].append(micros)
+
+    slowest = sorted(
+        ((name, median(values)) for name, values in by_package.items() if name != "app"),
+        key=lambda item: item[1],
+        reverse=True
+    )
+    return {
+        "total_ms": round(median(run[module] for run in runs) / 1000, 1),
+        "top_packages_ms": {name: round(micros / 1000, 1) for name, micros in slowest[:top]},
+        "eager_lazy_modules": sorted(
+            name for name in LAZY_MODULES if any(name in run for run in runs)
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--modules", nargs="+", default=ENTRY_POINTS)
+    parser.add_argument("--repeat", type=int, default=3, help="Cold imports per module (median is reported)")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, help="Fail if any entry point takes longer")
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    results = {}
+    failed = False
+    for module in args.modules:
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        r = results[module] = summarize(module, runs, args.top)
+
+        print(f"{module}: {r['total_ms']:.1f}ms")
+        for name, ms in r["top_packages_ms"].items():
+            print(f"  {name:<30}{ms:>9.1f}ms")
+        if r["eager_lazy_modules"]:
+            print(f"  FAIL: imported at startup: {', '.join(r['eager_lazy_modules'])}")
+            failed = True
+        if args.budget_ms and r["total_ms"] > args.budget_ms:
+            print(f"  FAIL: over the {args.budget_ms:.0f}ms budget")
+            failed = True
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+End-to-end load harness
+
+Starts the fake twitterapi.io and Gemini servers, a Celery worker, Celery
+beat and the API as local processes. Then it schedules N tweets across M
+users and drives concurrent dashboard traffic at the API while the beat
+posts them. It reports tweets posted/sec, posted_at - scheduled_at lag
+percentiles and API latency per route.
+
+Only local Postgres and Redis are needed (e.g. `docker compose up
+postgres redis`); nothing leaves the machine. Use a scratch database:
+--reset drops every table and re-runs the migrations.
+
+    cd backend && python -m benchmarks.load_driver --reset --tweets 2000 --users 50 \\
+        --spread 120 --dashboard-clients 20 --twitter-latency-ms 300 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import insert, text
+
+from benchmarks.fake_services import add_profile_arguments, profile_cli_args
+from benchmarks.stats import summarize
+
+DASHBOARD_ROUTES = [
+    "/analytics/summary",
+    "/analytics/top-tweets",
+    "/analytics/engagement-over-time",
+    "/tweets/?limit=50",
+    "/campaigns/",
+]
+
+
+def seed(args):
+    """Create users (with some posted history) and the tweets to schedule"""
+    from app.database import SessionLocal, init_db, reset_db
+    from app import models
+
+    if args.reset:
+        reset_db()
+    init_db()
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        users = [
+            models.User(username=f"load_{now:%H%M%S}_{i}", api_key=f"load-key-{i}")
+            for i in range(args.users)
+        ]
+        db.add_all(users)
+        db.flush()
+
+        history = [
+            {
+                "user_id": user.id,
+                "text": f"history {i}",
+                "status": "posted",
+                "tweet_id_twitter": f"load-{user.id}-{i}",
+                "scheduled_at": now - timedelta(days=rng.uniform(0, 30)),
+                "posted_at": now - timedelta(days=rng.uniform(0, 30)),
+            }
+            for user in users
+            for i in range(args.history_per_user)
+        ]
+        if history:
+            db.execute(insert(models.Tweet), history)
+
+        first_due = now + timedelta(seconds=args.lead)
+        run_tweets = [
+            {
+                "user_id": users[i % len(users)].id,
+                "text": f"load test tweet {i}",
+                "status": "scheduled",
+                "scheduled_at": first_due + timedelta(seconds=rng.uniform(0, args.spread)),
+            }
+            for i in range(args.tweets)
+        ]
+        db.execute(insert(models.Tweet), run_tweets)
+        db.commit()
+
+        return [user.username for user in users], [user.id for user in users]
+    finally:
+        db.close()
+
+
+def start_processes(args, log_dir: str):
+    """Launch fakes, worker, beat and API with the app pointed at the fakes"""
+    env = dict(
+        os.environ,
+        TWITTER_API_BASE_URL=f"http://127.0.0.1:{args.twitter_port}",
+        GEMINI_API_ENDPOINT=f"http://127.0.0.1:{args.gemini_port}",
+        GEMINI_API_KEY="load-test-key",
+        WORKER_METRICS_PORT="0",
+        MAX_POSTS_PER_HOUR=str(args.max_posts_per_hour),
+    )
+    python = sys.executable
+    commands = {
+        "fake_twitter": [python, "-m", "benchmarks.fake_services", "twitter", "--port", str(args.twitter_port),
+                         "--seed", str(args.seed)] + profile_cli_args(args, "twitter-"),
+        "fake_gemini": [python, "-m", "benchmarks.fake_services", "gemini", "--port", str(args.gemini_port),
+                        "--seed", str(args.seed)] + profile_cli_args(args, "gemini-"),
+        "worker": [python, "-m", "celery", "-A", "app.tasks.scheduler.celery_app", "worker",
+                   "--loglevel", "warning", "--concurrency", str(args.worker_concurrency),
+                   "-Q", "posting,metrics,ai_generation,maintenance,default"],
+        "beat": [python, "-m", "celery", "-A", "app.tasks.scheduler.celery_app", "beat",
+                 "--loglevel", "warning", "--schedule", os.path.join(log_dir, "celerybeat-schedule")],
+        "api": [python, "-m", "uvicorn", "app.main:app", "--port", str(args.api_port),
+                "--workers", str(args.api_workers), "--log-level", "warning"],
+    }
+
+    processes = {}
+    for name, command in commands.items():
+        log = open(os.path.join(log_dir, f"{name}.log"), "w")
+        processes[name] = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return processes
+
+
+def wait_for(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise SystemExit(f"{url} did not come up within {timeout}s")
+
+
+async def dashboard_traffic(args, usernames, stop: asyncio.Event, latencies):
+    """Simulated dashboard tabs polling the API until `stop` is set"""
+    from app.auth.dependencies import create_access_token
+
+    tokens = [create_access_token({"sub": name}, timedelta(hours=6)) for name in usernames]
+    rng = random.Random(args.seed)
+    base = f"http://127.0.0.1:{args.api_port}"
+
+    async def client(client_id: int):
+        async with httpx.AsyncClient(base_url=base, timeout=30.0) as http:
+            while not stop.is_set():
+                route = rng.choice(DASHBOARD_ROUTES)
+                headers = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+                start = time.perf_counter()
+                try:
+                    response = await http.get(route, headers=headers)
+                    key = route if response.status_code < 500 else f"{route} [error]"
+                except httpx.HTTPError:
+                    key = f"{route} [error]"
+                latencies[key].append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(args.dashboard_interval)
+
+    await asyncio.gather(*(client(i) for i in range(args.dashboard_clients)))
+
+
+async def watch_posting(args, user_ids, stop: asyncio.Event):
+    """Poll the database until every run tweet settles (or the timeout)"""
+    from app.database import engine
+
+    deadline = time.monotonic() + args.timeout
+    query = text(
+        "SELECT COUNT(*) FILTER (WHERE status = 'posted'), "
+        "COUNT(*) FILTER (WHERE status IN ('failed', 'dead')) "
+        "FROM tweets WHERE user_id = ANY(:users) AND text LIKE 'load test tweet %'"
+    )
+    while time.monotonic() < deadline:
+        with engine.connect() as conn:
+            posted, failed = conn.execute(query, {"users": user_ids}).one()
+        print(f"\r  posted {posted}/{args.tweets}, failed {failed}", end="", flush=True)
+        if posted + failed >= args.tweets:
+            break
+        await asyncio.sleep(2)
+    print()
+    stop.set()
+
+
+def collect_results(args, user_ids, latencies, wall_seconds):
+    from app.database import engine
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT EXTRACT(EPOCH FROM posted_at - scheduled_at), scheduled_at, posted_at, status "
+            "FROM tweets WHERE user_id = ANY(:users) AND text LIKE 'load test tweet %'"
+        ), {"users": user_ids}).all()
+
+    posted = [row for row in rows if row[3] == "posted"]
+    lags = [float(row[0]) for row in posted]
+    throughput = 0.0
+    if posted:
+        window = (max(row[2] for row in posted) - min(row[1] for row in posted)).total_seconds()
+        throughput = len(posted) / window if window > 0 else float(len(posted))
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "tweets": args.tweets,
+            "users": args.users,
+            "spread_seconds": args.spread,
+            "dashboard_clients": args.dashboard_clients,
+            "worker_concurrency": args.worker_concurrency,
+            "wall_seconds": round(wall_seconds, 1),
+        },
+        "posting": {
+            "posted": len(posted),
+            "failed": sum(1 for row in rows if row[3] in ("failed", "dead")),
+            "pending": sum(1 for row in rows if row[3] not in ("posted", "failed", "dead")),
+            "tweets_per_second": round(throughput, 3),
+            "lag_seconds": summarize(lags),
+        },
+        "api_latency_ms": {route: summarize(values) for route, values in sorted(latencies.items())},
+    }
+
+
+async def run(args, usernames, user_ids):
+    stop = asyncio.Event()
+    latencies = defaultdict(list)
+    await asyncio.gather(
+        watch_posting(args, user_ids, stop),
+        dashboard_traffic(args, usernames, stop, latencies),
+    )
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end posting load test against local fakes")
+    parser.add_argument("--tweets", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--history-per-user", type=int, default=50, help="Posted tweets per user for dashboards")
+    parser.add_argument("--lead", type=float, default=5.0, help="Seconds until the first tweet is due")
+    parser.add_argument("--spread", type=float, default=60.0, help="Seconds over which tweets are due")
+    parser.add_argument("--timeout", type=float, default=900.0)
+    parser.add_argument("--dashboard-clients", type=int, default=10)
+    parser.add_argument("--dashboard-interval", type=float, default=0.5)
+    parser.add_argument("--worker-concurrency", type=int, default=4)
+    parser.add_argument("--api-workers", type=int, default=2)
+    parser.add_argument("--max-posts-per-hour", type=int, default=100000)
+    parser.add_argument("--api-port", type=int, default=8100)
+    parser.add_argument("--twitter-port", type=int, default=9101)
+    parser.add_argument("--gemini-port", type=int, default=9102)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables first")
+    parser.add_argument("--output", help="Write results JSON here")
+    add_profile_arguments(parser, "twitter-")
+    add_profile_arguments(parser, "gemini-")
+    args = parser.parse_args()
+
+    usernames, user_ids = seed(args)
+    log_dir = tempfile.mkdtemp(prefix="load-")
+    print(f"Process logs in {log_dir}")
+    processes = start_processes(args, log_dir)
+    start = time.monotonic()
+
+    try:
+        wait_for(f"http://127.0.0.1:{args.twitter_port}/_stats")
+        wait_for(f"http://127.0.0.1:{args.api_port}/")
+        latencies = asyncio.run(run(args, usernames, user_ids))
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    results = collect_results(args, user_ids, latencies, time.monotonic() - start)
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Metric ingestion throughput
+
+Writes N metric snapshots for N tweets three ways and reports rows/sec:
+
+- per_row: one INSERT and commit per snapshot (the original sweep)
+- executemany: one multi-row INSERT and commit per sweep
+- buffer: MetricBuffer, i.e. COPY on Postgres (multi-row INSERT elsewhere),
+  including a final flush
+
+Each run starts from an empty metrics table.
+
+    cd backend && DATABASE_URL=postgresql://... python -m benchmarks.metric_ingest --rows 10000 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+
+def seed_tweets(num_tweets: int) -> list:
+    from app.database import SessionLocal, init_db, reset_db
+    from app import models
+    from sqlalchemy import insert
+
+    reset_db()
+    init_db()
+    db = SessionLocal()
+    try:
+        user = models.User(username="bench", api_key="key")
+        db.add(user)
+        db.flush()
+        ids = db.execute(
+            insert(models.Tweet).returning(models.Tweet.id),
+            [
+                {"user_id": user.id, "text": f"tweet {i}", "status": "posted", "tweet_id_twitter": str(i)}
+                for i in range(num_tweets)
+            ]
+        ).scalars().all()
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+
+def snapshots(tweet_ids: list) -> list:
+    now = datetime.utcnow()
+    return [
+        {
+            "tweet_id": tweet_id,
+            "likes": i % 97,
+            "retweets": i % 31,
+            "replies": i % 13,
+            "impressions": 1000 + i,
+            "engagement_rate": (i % 141) / (1000 + i) * 100,
+            "timestamp": now
+        }
+        for i, tweet_id in enumerate(tweet_ids)
+    ]
+
+
+def clear_metrics():
+    from app.database import engine
+    from app import models
+
+    with engine.begin() as conn:
+        conn.execute(models.Metric.__table__.delete())
+
+
+def per_row(rows: list):
+    from app.database import SessionLocal
+    from app import models
+
+    db = SessionLocal()
+    try:
+        for row in rows:
+            db.add(models.Metric(**row))
+            db.commit()
+    finally:
+        db.close()
+
+
+def executemany(rows: list):
+    from app.database import SessionLocal
+    from app import models
+    from sqlalchemy import insert
+
+    db = SessionLocal()
+    try:
+        db.execute(insert(models.Metric), rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def buffered(rows: list):
+    from app.services.metric_buffer import MetricBuffer
+
+    buffer = MetricBuffer()
+    buffer.extend(rows)
+    buffer.flush(force=True)
+    if len(buffer):
+        raise RuntimeError("flush left rows behind")
+
+
+def count_metrics() -> int:
+    from app.database import engine
+    from app import models
+    from sqlalchemy import func, select
+
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(models.Metric.__table__)).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000])
+    parser.add_argument("--per-row-limit", type=int, default=2000,
+                        help="Time per_row on at most this many rows (it is slow) and extrapolate")
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    elif "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/metric_ingest.db"
+    # Flushes happen only when the benchmark asks
+    os.environ["METRICS_BUFFER_MAX_ROWS"] = str(max(args.rows) + 1)
+    os.environ["METRICS_BUFFER_MAX_AGE_SECONDS"] = "3600"
+
+    from app.database import engine
+    print(f"backend: {engine.dialect.name}")
+
+    failed = False
+    for num_rows in args.rows:
+        rows = snapshots(seed_tweets(num_rows))
+        print(f"{num_rows} snapshots:")
+        for name, fn, limit in (
+            ("per_row", per_row, args.per_row_limit),
+            ("executemany", executemany, None),
+            ("buffer", buffered, None),
+        ):
+            sample = rows[:limit] if limit else rows
+            clear_metrics()
+            start = time.perf_counter()
+            fn(sample)
+            elapsed = time.perf_counter() - start
+            written = count_metrics()
+            note = f" (first {len(sample)})" if len(sample) < num_rows else ""
+            print(f"  {name:<12}{len(sample) / elapsed:>12,.0f} rows/s{note}")
+            if written != len(sample):
+                print(f"  FAIL: {name} wrote {written} of {len(sample)} rows")
+                failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Partitioned vs unpartitioned metrics storage
+
+Builds two copies of a synthetic metrics history in Postgres: a plain
+table and a table range-partitioned by month, both indexed on
+(tweet_id, timestamp). It then times the same queries on each:
+
+- user_window: one user's snapshots over the last 30 days (dashboard)
+- daily_window: all snapshots of the last 30 days grouped by day
+- retention: expiring the oldest month (DELETE + VACUUM vs DETACH + DROP)
+
+It also reports how many partitions the planner kept. The tables are
+dropped afterwards.
+
+    cd backend && DATABASE_URL=postgresql://... python -m benchmarks.metric_partitions --rows 5000000 --months 12
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from statistics import median
+
+FLAT = "bench_metrics_flat"
+PARTITIONED = "bench_metrics_part"
+
+QUERIES = {
+    "user_window": (
+        "SELECT sum(likes + retweets + replies), avg(engagement_rate) FROM {table} "
+        "WHERE tweet_id = ANY(%(tweets)s) AND timestamp >= %(since)s"
+    ),
+    "daily_window": (
+        "SELECT date_trunc('day', timestamp), sum(likes) FROM {table} "
+        "WHERE timestamp >= %(since)s GROUP BY 1"
+    ),
+}
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def build(cursor, rows: int, months: int, tweets: int, now: datetime):
+    start = add_months(datetime(now.year, now.month, 1), -(months - 1))
+    columns = (
+        "id BIGINT NOT NULL, tweet_id INTEGER NOT NULL, timestamp TIMESTAMPTZ NOT NULL, "
+        "likes INTEGER, retweets INTEGER, replies INTEGER, engagement_rate FLOAT"
+    )
+    cursor.execute(f"DROP TABLE IF EXISTS {FLAT}, {PARTITIONED}")
+    cursor.execute(f"CREATE TABLE {FLAT} ({columns}, PRIMARY KEY (id))")
+    cursor.execute(f"CREATE TABLE {PARTITIONED} ({columns}, PRIMARY KEY (id, timestamp)) PARTITION BY RANGE (timestamp)")
+    for i in range(months + 1):
+        month = add_months(start, i)
+        cursor.execute(
+            f"CREATE TABLE {PARTITIONED}_{month:%Y%m} PARTITION OF {PARTITIONED} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}+00') TO ('{add_months(month, 1):%Y-%m-%d}+00')"
+        )
+
+    # Snapshots spread evenly over the window, tweets interleaved
+    span = (now - start).total_seconds()
+    cursor.execute(
+        f"INSERT INTO {FLAT} SELECT g, 1 + g %% %(tweets)s, "
+        f"%(start)s::timestamptz + (g::float / %(rows)s * %(span)s) * interval '1 second', "
+        f"g %% 97, g %% 31, g %% 13, (g %% 1000) / 100.0 FROM generate_series(1, %(rows)s) g",
+        {"tweets": tweets, "start": f"{start:%Y-%m-%d}+00", "rows": rows, "span": span}
+    )
+    cursor.execute(f"INSERT INTO {PARTITIONED} SELECT * FROM {FLAT}")
+    for table in (FLAT, PARTITIONED):
+        cursor.execute(f"CREATE INDEX ON {table} (tweet_id, timestamp)")
+        cursor.execute(f"CREATE INDEX ON {table} (timestamp)")
+        cursor.execute(f"ANALYZE {table}")
+    return start
+
+
+def timed(cursor, sql: str, params: dict, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return median(samples)
+
+
+def partitions_scanned(cursor, sql: str, params: dict) -> int:
+    cursor.execute("EXPLAIN " + sql, params)
+    plan = "\n".join(row[0] for row in cursor.fetchall())
+    return len(set(re.findall(rf"on ({PARTITIONED}_\d{{6}})", plan)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--tweets", type=int, default=20000)
+    parser.add_argument("--tweets-per-user", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from app.database import engine
+    if engine.dialect.name != "postgresql":
+        parser.error("metric_partitions needs a PostgreSQL DATABASE_URL")
+
+    now = datetime.utcnow()
+    since = datetime.fromtimestamp(now.timestamp() - 30 * 86400)
+    params = {
+        "tweets": list(range(1, args.tweets, args.tweets // args.tweets_per_user)),
+        "since": f"{since:%Y-%m-%d %H:%M:%S}+00",
+    }
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        started = time.perf_counter()
+        start = build(cursor, args.rows, args.months, args.tweets, now)
+        raw.commit()
+        print(f"{args.rows} snapshots over {args.months} months, built in {time.perf_counter() - started:.1f}s")
+
+        for name, sql in QUERIES.items():
+            flat_ms = timed(cursor, sql.format(table=FLAT), params, args.repeat)
+            part_ms = timed(cursor, sql.format(table=PARTITIONED), params, args.repeat)
+            scanned = partitions_scanned(cursor, sql.format(table=PARTITIONED), params)
+            print(
+                f"  {name:<14} flat {flat_ms:>9.1f}ms   partitioned {part_ms:>9.1f}ms "
+                f"({scanned} of {args.months + 1} partitions)"
+            )
+
+        cutoff = add_months(start, 1)
+        started = time.perf_counter()
+        cursor.execute(f"DELETE FROM {FLAT} WHERE timestamp < %(cutoff)s", {"cutoff": f"{cutoff:%Y-%m-%d}+00"})
+        deleted = cursor.rowcount
+        raw.commit()
+        delete_ms = (time.perf_counter() - started) * 1000
+        # A DELETE leaves dead rows behind; reclaiming them is part of its cost
+        raw.dbapi_connection.autocommit = True
+        started = time.perf_counter()
+        cursor.execute(f"VACUUM {FLAT}")
+        vacuum_ms = (time.perf_counter() - started) * 1000
+        raw.dbapi_connection.autocommit = False
+        started = time.perf_counter()
+        cursor.execute(f"ALTER TABLE {PARTITIONED} DETACH PARTITION {PARTITIONED}_{start:%Y%m}")
+        cursor.execute(f"DROP TABLE {PARTITIONED}_{start:%Y%m}")
+        raw.commit()
+        drop_ms = (time.perf_counter() - started) * 1000
+        print(
+            f"  {'retention':<14} flat {delete_ms + vacuum_ms:>9.1f}ms   partitioned {drop_ms:>9.1f}ms "
+            f"(oldest month, {deleted} rows; DELETE {delete_ms:.1f}ms + VACUUM {vacuum_ms:.1f}ms)"
+        )
+
+        cursor.execute(f"DROP TABLE IF EXISTS {FLAT}, {PARTITIONED}")
+        raw.commit()
+    finally:
+        raw.close()
+
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
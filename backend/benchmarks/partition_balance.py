@@ -0,0 +1,97 @@
+"""
+Partitioning check for the per-user sweeps
+
+Reports how evenly SWEEP_PARTITIONS partitions (and the users in them)
+spread over 1..N workers on the consistent hash ring, and how many
+partitions move when a worker joins. Then seeds a scratch database and
+runs check_scheduled_tweets once per partition against a stub Twitter
+client to check that the partitions together post every due tweet
+exactly once. Exits non-zero if a join moves far more than the ideal
+1/N of the partitions or coverage is wrong.
+
+    cd backend && python -m benchmarks.partition_balance --workers 8 --users 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+from collections import Counter
+from unittest import mock
+
+from benchmarks.stubs import StubTwitterClient
+
+
+def ring_report(max_workers: int, num_users: int) -> bool:
+    from app.config import settings
+    from app.services.partitioning import HashRing
+
+    keys = [f"partition-{p}" for p in range(settings.SWEEP_PARTITIONS)]
+    users_per_partition = Counter(user_id % settings.SWEEP_PARTITIONS for user_id in range(1, num_users + 1))
+
+    ok = True
+    previous = None
+    print(f"{settings.SWEEP_PARTITIONS} partitions, {num_users} users")
+    for n in range(1, max_workers + 1):
+        ring = HashRing([f"worker-{i}" for i in range(n)], replicas=settings.SWEEP_RING_REPLICAS)
+        assignment = ring.assignments(keys)
+        users = Counter()
+        for key, worker in assignment.items():
+            users[worker] += users_per_partition[int(key.split("-")[1])]
+
+        line = f"  {n:>3} workers: users per worker min {min(users.values()):>6} max {max(users.values()):>6}"
+        if previous is not None:
+            moved = sum(1 for key in keys if assignment[key] != previous[key])
+            ideal = len(keys) / n
+            line += f", {moved:>3} partitions moved (ideal {ideal:.1f})"
+            # Moves only ever go to the new worker; allow for hashing noise
+            if any(assignment[key] not in (previous[key], f"worker-{n - 1}") for key in keys) or moved > 3 * ideal + 1:
+                line += "  FAIL"
+                ok = False
+        print(line)
+        previous = assignment
+    return ok
+
+
+def coverage_check(num_users: int, num_tweets: int) -> bool:
+    from benchmarks.query_counts import seed
+    from app.config import settings
+    from app.tasks import scheduler
+
+    seed(num_users, num_tweets)
+    posted = []
+
+    class RecordingClient(StubTwitterClient):
+        def post_tweet(self, text, media_ids=None):
+            posted.append(text)
+            return super().post_tweet(text, media_ids)
+
+    with mock.patch.object(scheduler, "get_twitter_client", RecordingClient):
+        for partition in range(settings.SWEEP_PARTITIONS):
+            scheduler.check_scheduled_tweets(partition)
+
+    duplicates = sum(count - 1 for count in Counter(posted).values())
+    print(f"coverage: {len(set(posted))} of {num_tweets} due tweets posted, {duplicates} duplicates")
+    return len(set(posted)) == num_tweets and duplicates == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tweets", type=int, default=500)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/partition_balance.db"
+    os.environ.setdefault("MAX_POSTS_PER_HOUR", str(args.tweets))
+
+    ok = ring_report(args.workers, args.users)
+    ok = coverage_check(min(args.users, args.tweets), args.tweets) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
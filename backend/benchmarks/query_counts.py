@@ -0,0 +1,125 @@
+"""
+Query-count check for the scheduler sweeps
+
+Seeds a scratch database with N due tweets spread over M users, runs
+check_scheduled_tweets and update_tweet_metrics against a stub Twitter
+client and counts the statements each sweep issues. Statements must
+stay constant as N grows: posting claims each user's batch with one
+locked SELECT and writes it with one batched UPDATE
+(tests/test_query_counts.py checks that on every test run).
+
+    cd backend && python -m benchmarks.query_counts --tweets 10 100 1000 --users 5
+"""
+import argparse
+import os
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+from benchmarks.stubs import StubTwitterClient
+
+
+def seed(num_users: int, num_tweets: int):
+    """Fresh schema with `num_tweets` due tweets spread over `num_users` users"""
+    from app.database import SessionLocal, init_db, reset_db
+    from app import models
+
+    reset_db()
+    init_db()
+
+    db = SessionLocal()
+    try:
+        users = [models.User(username=f"bench-{i}", api_key=f"key-{i}") for i in range(num_users)]
+        db.add_all(users)
+        db.flush()
+        due = datetime.utcnow() - timedelta(minutes=1)
+        db.add_all([
+            models.Tweet(
+                user_id=users[i % num_users].id,
+                text=f"tweet {i}",
+                status="scheduled",
+                scheduled_at=due
+            )
+            for i in range(num_tweets)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_profiled(name: str, fn):
+    """
+    Run `fn` and split the statements it issued into reads, claims
+    (SELECT ... FOR UPDATE of a row about to be written) and writes
+    """
+    from sqlalchemy import event
+
+    from app.database import engine
+    from app.services import profiling
+
+    claims = [0]
+
+    def count_claims(conn, cursor, statement, parameters, context, executemany):
+        # From the compiled statement: SQLite does not render FOR UPDATE
+        compiled = getattr(context, "compiled", None)
+        if getattr(getattr(compiled, "statement", None), "_for_update_arg", None) is not None:
+            claims[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count_claims)
+    profile = profiling.start_profile(name)
+    try:
+        fn()
+    finally:
+        report = profiling.stop_profile(profile)
+        event.remove(engine, "before_cursor_execute", count_claims)
+
+    selects = sum(1 for shape, _ in profile.statements if shape.upper().startswith("SELECT"))
+    return {
+        "reads": selects - claims[0],
+        "claims": claims[0],
+        "writes": report["queries"] - selects,
+        "statements": report["queries"],
+        "n_plus_one": len(report["n_plus_one"])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--tweets", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/query_counts.db"
+    # Every post lands in the same hour; keep the budget out of the way
+    os.environ.setdefault("MAX_POSTS_PER_HOUR", str(max(args.tweets)))
+    os.environ.setdefault("METRICS_SWEEP_BATCH_SIZE", str(max(args.tweets)))
+    # Measure the in-sweep posting path, not a drain plan (which only enqueues)
+    os.environ.setdefault("DRAIN_BACKLOG_THRESHOLD", str(max(args.tweets)))
+
+    from app.tasks import scheduler
+
+    results = {}
+    with mock.patch.object(scheduler, "get_twitter_client", StubTwitterClient):
+        for num_tweets in args.tweets:
+            seed(args.users, num_tweets)
+            results[num_tweets] = {
+                "check_scheduled_tweets": run_profiled("check_scheduled_tweets", scheduler.check_scheduled_tweets),
+                "update_tweet_metrics": run_profiled("update_tweet_metrics", scheduler.update_tweet_metrics),
+            }
+
+    for task in ("check_scheduled_tweets", "update_tweet_metrics"):
+        print(f"{task}:")
+        for n in args.tweets:
+            r = results[n][task]
+            print(
+                f"  {n:>6} tweets: {r['statements']:>4} statements "
+                f"({r['reads']} reads, {r['claims']} claims, {r['writes']} writes)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Benchmark the analytics endpoints and scheduler tasks
+
+Runs every /analytics endpoint for a sample of users and every scheduler
+task against the Postgres database at DATABASE_URL (load it with
+benchmarks.seed_data first). Each iteration runs inside a transaction
+that is rolled back afterwards, so tasks see the same data every time and
+rows scanned can be read from pg_stat_xact_user_tables. External
+providers are replaced by instant stubs.
+
+Results are written as JSON so runs can be compared across commits:
+
+    cd backend && python -m benchmarks.run_benchmarks --output before.json
+    cd backend && python -m benchmarks.run_benchmarks --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+from unittest import mock
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import engine
+from app import models
+from app.api import analytics
+from app.services import monitoring
+from app.tasks import scheduler
+from benchmarks.stats import percentile
+from benchmarks.stubs import StubTwitterClient, stub_ai_generator
+
+ROWS_SCANNED_SQL = text(
+    "SELECT COALESCE(SUM(seq_tup_read), 0) + COALESCE(SUM(idx_tup_fetch), 0) "
+    "FROM pg_stat_xact_user_tables"
+)
+
+
+class Scratch:
+    """Connection with an outer transaction that all sessions join via savepoints"""
+
+    def __enter__(self):
+        self.conn = engine.connect()
+        self.trans = self.conn.begin()
+        self.session_factory = sessionmaker(
+            bind=self.conn,
+            autocommit=False,
+            autoflush=False,
+            join_transaction_mode="create_savepoint"
+        )
+        return self
+
+    def rows_scanned(self) -> int:
+        return int(self.conn.execute(ROWS_SCANNED_SQL).scalar())
+
+    def __exit__(self, *exc):
+        self.trans.rollback()
+        self.conn.close()
+
+
+def measure(fn: Callable, iterations: int, warmup: int) -> Dict:
+    """Run fn(session_factory, i) repeatedly and summarise latency, queries and rows scanned"""
+    timings, queries, rows = [], [], []
+
+    for i in range(warmup + iterations):
+        with Scratch() as scratch:
+            before = scratch.rows_scanned()
+            stats = monitoring.start_query_stats()
+            start = time.perf_counter()
+            try:
+                fn(scratch.session_factory, i)
+            finally:
+                elapsed = time.perf_counter() - start
+                monitoring.stop_query_stats()
+            scanned = scratch.rows_scanned() - before
+
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(stats.count)
+            rows.append(scanned)
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "queries": round(sum(queries) / len(queries), 1),
+        "rows_scanned_p50": int(percentile(rows, 50)),
+        "rows_scanned_max": max(rows)
+    }
+
+
+def analytics_benchmarks(sample: List[Dict], days: int) -> Dict[str, Callable]:
+    """One callable per analytics endpoint, cycling through the sampled users"""
+    loop = asyncio.new_event_loop()
+
+    def call(endpoint, with_tweet=False, **kwargs):
+        def run(session_factory, i):
+            target = sample[i % len(sample)]
+            db = session_factory()
+            try:
+                user = db.get(models.User, target["user_id"])
+                if with_tweet:
+                    kwargs["tweet_id"] = target["tweet_id"]
+                loop.run_until_complete(endpoint(current_user=user, db=db, **kwargs))
+            finally:
+                db.close()
+        return run
+
+    return {
+        "analytics.summary": call(analytics.get_analytics_summary, days=days),
+        "analytics.tweet_metrics": call(analytics.get_tweet_metrics, with_tweet=True),
+        "analytics.engagement_over_time": call(analytics.get_engagement_over_time, days=days),
+        "analytics.top_tweets": call(analytics.get_top_tweets, days=days, limit=10),
+    }
+
+
+def task_benchmarks() -> Dict[str, Callable]:
+    """One callable per periodic scheduler task"""
+
+    def call(task):
+        def run(session_factory, i):
+            with mock.patch.object(scheduler, "SessionLocal", session_factory):
+                task()
+        return run
+
+    return {
+        "tasks.check_scheduled_tweets": call(scheduler.check_scheduled_tweets),
+        "tasks.update_tweet_metrics": call(scheduler.update_tweet_metrics),
+        "tasks.process_campaigns": call(scheduler.process_campaigns),
+    }
+
+
+def sample_users(size: int, seed: int) -> List[Dict]:
+    """Random users that have at least one posted tweet, with one of their tweet ids"""
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT DISTINCT ON (user_id) user_id, id FROM tweets "
+            "WHERE status = 'posted' ORDER BY user_id, id"
+        )).all()
+    if not rows:
+        raise SystemExit("No posted tweets found; run benchmarks.seed_data first")
+    rng = random.Random(seed)
+    picked = rng.sample(rows, min(size, len(rows)))
+    return [{"user_id": user_id, "tweet_id": tweet_id} for user_id, tweet_id in picked]
+
+
+def dataset_size() -> Dict[str, int]:
+    """Approximate table sizes from planner statistics"""
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT relname, reltuples::bigint FROM pg_class "
+            "WHERE relname IN ('users', 'tweets', 'metrics', 'campaigns')"
+        )).all()
+    return {name: int(count) for name, count in rows}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict, baseline: Dict) -> None:
+    """Print p50/p95 changes against a previous results file"""
+    print(f"\n{'benchmark':<34}{'p50 before':>12}{'p50 after':>12}{'p95 before':>12}{'p95 after':>12}{'change':>9}")
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if not old:
+            continue
+        change = (result["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100 if old["p50_ms"] else 0
+        print(
+            f"{name:<34}{old['p50_ms']:>12.2f}{result['p50_ms']:>12.2f}"
+            f"{old['p95_ms']:>12.2f}{result['p95_ms']:>12.2f}{change:>+8.1f}%"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analytics endpoints and scheduler tasks")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--task-iterations", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--sample-users", type=int, default=50)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="Run benchmarks whose name contains this string")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        parser.error("run_benchmarks needs a PostgreSQL DATABASE_URL")
+
+    sample = sample_users(args.sample_users, args.seed)
+    suites = [
+        (analytics_benchmarks(sample, args.days), args.iterations),
+        (task_benchmarks(), args.task_iterations),
+    ]
+
+    results = {}
+    with mock.patch.object(scheduler, "get_twitter_client", StubTwitterClient), \
+            mock.patch.object(scheduler, "get_ai_generator", stub_ai_generator):
+        for benchmarks, iterations in suites:
+            for name, fn in benchmarks.items():
+                if args.only and args.only not in name:
+                    continue
+                results[name] = measure(fn, iterations, args.warmup)
+                r = results[name]
+                print(
+                    f"{name:<34} p50 {r['p50_ms']:>9.2f}ms  p95 {r['p95_ms']:>9.2f}ms  "
+                    f"p99 {r['p99_ms']:>9.2f}ms  queries {r['queries']:>6}  rows {r['rows_scanned_p50']:>10}"
+                )
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "dataset": dataset_size(),
+            "sample_users": len(sample),
+            "days": args.days
+        },
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Synthetic data generator for benchmarks
+
+Bulk-loads users, tweets, metric snapshot histories and campaigns into
+the Postgres database at DATABASE_URL using COPY. Rows are rendered
+lazily, so memory stays flat even at tens of millions of metric rows.
+Output is deterministic for a given --seed.
+
+    cd backend && python -m benchmarks.seed_data --users 1000 --tweets-per-user 500 --snapshots 40
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from app.database import engine, init_db
+from app.services import metric_partitions
+
+TOPICS = ["ai", "python", "startups", "marketing", "design", "data", "cloud", "security"]
+TONES = ["professional", "casual", "humorous", "inspirational"]
+
+
+class RowStream:
+    """File-like object that renders COPY text rows on demand"""
+
+    def __init__(self, rows: Iterator[str]):
+        self._rows = rows
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            try:
+                row = next(self._rows)
+            except StopIteration:
+                break
+            chunks.append(row)
+            length += len(row)
+        data = "".join(chunks)
+        if size < 0:
+            self._buffer = ""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def _copy(cursor, table: str, columns: list, rows: Iterator[str]) -> float:
+    """COPY rows into table, returning elapsed seconds"""
+    start = time.perf_counter()
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN",
+        RowStream(rows),
+        size=1 << 16
+    )
+    return time.perf_counter() - start
+
+
+def _ts(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S+00")
+
+
+def _max_id(cursor, table: str) -> int:
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def generate(args):
+    """Generate and load the dataset described by args"""
+    rng = random.Random(args.seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    horizon = timedelta(days=args.days)
+
+    init_db()
+    # COPY into a partitioned metrics table needs every month of history
+    with engine.begin() as conn:
+        metric_partitions.ensure_partitions(conn, now - horizon, now)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+
+        if args.reset:
+            cursor.execute("TRUNCATE metrics, tweets, campaigns, users RESTART IDENTITY CASCADE")
+
+        user_base = _max_id(cursor, "users")
+        tweet_base = _max_id(cursor, "tweets")
+        metric_base = _max_id(cursor, "metrics")
+        campaign_base = _max_id(cursor, "campaigns")
+
+        num_tweets = args.users * args.tweets_per_user
+
+        def users():
+            for i in range(1, args.users + 1):
+                uid = user_base + i
+                yield f"{uid}\tbench_user_{uid}\tbench_{uid}\tbench-key-{uid}\t{{}}\t{_ts(now - horizon)}\n"
+
+        # Tweet timestamps are needed again for their metric snapshots
+        posted = {}
+
+        def tweets():
+            for i in range(1, num_tweets + 1):
+                tid = tweet_base + i
+                uid = user_base + (i - 1) // args.tweets_per_user + 1
+                created = now - timedelta(seconds=rng.uniform(0, horizon.total_seconds()))
+                roll = rng.random()
+                if roll < args.scheduled_fraction:
+                    # Due (or soon due) scheduled tweets for the posting sweep
+                    scheduled = now - timedelta(seconds=rng.uniform(-3600, 600))
+                    yield (
+                        f"{tid}\t{uid}\t\\N\ttweet {tid} about {rng.choice(TOPICS)}\t{_ts(created)}\t"
+                        f"{_ts(scheduled)}\t\\N\tscheduled\t[]\tf\t\\N\t0\t0\n"
+                    )
+                elif roll < args.scheduled_fraction + args.draft_fraction:
+                    yield (
+                        f"{tid}\t{uid}\t\\N\tdraft {tid}\t{_ts(created)}\t"
+                        f"\\N\t\\N\tdraft\t[]\tt\t{rng.random():.2f}\t0\t0\n"
+                    )
+                else:
+                    posted[tid] = created
+                    yield (
+                        f"{tid}\t{uid}\tbench-{tid}\ttweet {tid} about {rng.choice(TOPICS)}\t{_ts(created)}\t"
+                        f"{_ts(created)}\t{_ts(created)}\tposted\t[]\t{'t' if rng.random() < 0.5 else 'f'}\t"
+                        f"{rng.random():.2f}\t0\t0\n"
+                    )
+
+        def metrics():
+            mid = metric_base
+            for tid, created in posted.items():
+                likes = retweets = replies = 0
+                impressions = 0
+                reach = rng.lognormvariate(5, 1.5)
+                for n in range(args.snapshots):
+                    mid += 1
+                    ts = created + timedelta(minutes=5 * (n + 1) * (1 + n // 12))
+                    if ts > now:
+                        break
+                    impressions += int(reach * rng.uniform(0.5, 1.5))
+                    likes += int(impressions * rng.uniform(0, 0.002))
+                    retweets += int(impressions * rng.uniform(0, 0.0005))
+                    replies += int(impressions * rng.uniform(0, 0.0003))
+                    rate = (likes + retweets + replies) / impressions * 100 if impressions else 0
+                    yield (
+                        f"{mid}\t{tid}\t{_ts(ts)}\t{likes}\t{retweets}\t{replies}\t"
+                        f"{impressions}\t{rate:.4f}\t{{}}\n"
+                    )
+
+        def campaigns():
+            for i in range(1, args.campaigns + 1):
+                cid = campaign_base + i
+                uid = user_base + rng.randint(1, args.users)
+                slots = [
+                    {"topic": rng.choice(TOPICS), "tone": rng.choice(TONES)}
+                    for _ in range(rng.randint(1, 3))
+                ]
+                active = rng.random() < 0.8
+                # Active campaigns fire over the next day; a few are due now
+                next_fire = _ts(now + timedelta(seconds=rng.uniform(-600, 86400))) if active else "\\N"
+                yield (
+                    f"{cid}\t{uid}\tcampaign {cid}\t\\N\t0 9 * * *\t"
+                    f"{json.dumps(slots)}\t{'t' if active else 'f'}\t{next_fire}\t{_ts(now - horizon)}\n"
+                )
+
+        timings = {}
+        timings["users"] = _copy(cursor, "users", [
+            "id", "username", "twitter_username", "api_key", "settings", "created_at"
+        ], users())
+        timings["tweets"] = _copy(cursor, "tweets", [
+            "id", "user_id", "tweet_id_twitter", "text", "created_at", "scheduled_at", "posted_at",
+            "status", "media_links", "generated_by_ai", "viral_score", "attempts", "metrics_failures"
+        ], tweets())
+        timings["metrics"] = _copy(cursor, "metrics", [
+            "id", "tweet_id", "timestamp", "likes", "retweets", "replies",
+            "impressions", "engagement_rate", "extra_json"
+        ], metrics())
+        timings["campaigns"] = _copy(cursor, "campaigns", [
+            "id", "user_id", "name", "description", "recurrence", "slots", "active", "next_fire_at", "created_at"
+        ], campaigns())
+
+        for table in ("users", "tweets", "metrics", "campaigns"):
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+            )
+        raw.commit()
+
+        # Refresh planner statistics for the new rows
+        cursor.execute("ANALYZE users, tweets, metrics, campaigns")
+        raw.commit()
+    finally:
+        raw.close()
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic benchmark data")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tweets-per-user", type=int, default=200)
+    parser.add_argument("--snapshots", type=int, default=20, help="Metric snapshots per posted tweet")
+    parser.add_argument("--campaigns", type=int, default=50)
+    parser.add_argument("--days", type=int, default=90, help="History window for posted tweets")
+    parser.add_argument("--scheduled-fraction", type=float, default=0.02)
+    parser.add_argument("--draft-fraction", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Truncate existing data first")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        parser.error("seed_data needs a PostgreSQL DATABASE_URL (it loads with COPY)")
+
+    start = time.perf_counter()
+    timings = generate(args)
+    for table, seconds in timings.items():
+        print(f"{table:<10} loaded in {seconds:8.2f}s")
+    print(f"total      {time.perf_counter() - start:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
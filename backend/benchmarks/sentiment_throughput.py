@@ -0,0 +1,60 @@
+"""
+Local sentiment scoring throughput
+
+Scores N synthetic tweets (with the given share of repeats, as retweets
+and templated posts produce) through app.services.sentiment.score_texts
+and reports texts/second and the share flagged uncertain, i.e. what
+`refine` would send to Gemini. Exits non-zero below --min-rate.
+
+    cd backend && python -m benchmarks.sentiment_throughput --texts 10000 100000
+"""
+import argparse
+import random
+import sys
+import time
+
+WORDS = [
+    "love", "great", "amazing", "launch", "today", "terrible", "awful", "slow",
+    "new", "feature", "team", "shipping", "bug", "happy", "sad", "meeting",
+    "thanks", "broken", "fast", "release", "but", "not", "really", "good", "bad",
+]
+
+
+def corpus(num_texts: int, repeat_share: float, seed: int = 7):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(num_texts):
+        if texts and rng.random() < repeat_share:
+            texts.append(rng.choice(texts))
+        else:
+            texts.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 25))))
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--texts", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--repeat-share", type=float, default=0.1)
+    parser.add_argument("--min-rate", type=float, default=2000.0, help="Texts/second")
+    args = parser.parse_args()
+
+    from app.services import sentiment
+
+    sentiment.score_texts(["warm up the lexicon"])
+    failed = False
+    for num_texts in args.texts:
+        texts = corpus(num_texts, args.repeat_share)
+        start = time.perf_counter()
+        results = sentiment.score_texts(texts)
+        rate = num_texts / (time.perf_counter() - start)
+        uncertain = sum(1 for result in results if result["uncertain"])
+        print(f"{num_texts:>8} texts{rate:>12,.0f} texts/s{uncertain / num_texts:>8.1%} uncertain")
+        if rate < args.min_rate:
+            print(f"FAIL: {rate:,.0f} texts/s is below {args.min_rate:,.0f}")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
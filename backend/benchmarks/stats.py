@@ -0,0 +1,26 @@
+"""Small statistics helpers shared by the benchmark scripts"""
+import math
+from typing import Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile"""
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lower = math.floor(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def summarize(values: List[float], digits: int = 3) -> Dict:
+    """Count, p50/p95/p99, mean and max of a sample"""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), digits),
+        "p95": round(percentile(values, 95), digits),
+        "p99": round(percentile(values, 99), digits),
+        "mean": round(sum(values) / len(values), digits),
+        "max": round(max(values), digits)
+    }
@@ -0,0 +1,44 @@
+"""Instant stand-ins for external providers, used by the benchmarks"""
+from datetime import datetime
+from itertools import count
+
+
+class StubTwitterClient:
+    """Always-successful stand-in for TwitterAPIClient"""
+
+    _ids = count(1)
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def post_tweet(self, text, media_ids=None):
+        return {"id_str": f"stub-{next(self._ids)}"}
+
+    def upload_media(self, stream, total_bytes, media_type, chunk_size):
+        while stream.read(chunk_size):
+            pass
+        return {"media_id": str(next(self._ids)), "expires_after_secs": 86400}
+
+    def get_user_tweets(self, username, count=10, since_id=None, max_id=None):
+        return []
+
+    def get_tweet_metrics(self, tweet_id):
+        return {"likes": 1, "retweets": 1, "replies": 1, "impressions": 100, "timestamp": datetime.utcnow()}
+
+
+class StubAIGenerator:
+    """Always-successful stand-in for GeminiAIGenerator"""
+
+    def generate_tweet_variants(self, topic, tone="professional", num_variants=3, **kwargs):
+        return [
+            {"text": f"{topic} ({tone}) variant {i}", "viral_score": 0.5}
+            for i in range(num_variants)
+        ]
+
+    def analyze_tweet_sentiment(self, text):
+        return {"sentiment": "neutral", "engagement_score": 0.5, "suggestions": "N/A"}
+
+
+def stub_ai_generator(api_key=None):
+    """Drop-in replacement for get_ai_generator"""
+    return StubAIGenerator()
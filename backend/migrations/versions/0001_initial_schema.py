@@ -0,0 +1,92 @@
+"""initial schema
+
+Matches the tables previously created by Base.metadata.create_all on
+startup. Existing databases that were created that way can be adopted
+with `alembic stamp 0001`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("twitter_username", sa.String()),
+        sa.Column("api_key", sa.Text()),
+        sa.Column("settings", sa.JSON()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_twitter_username", "users", ["twitter_username"])
+
+    op.create_table(
+        "campaigns",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("recurrence", sa.String()),
+        sa.Column("slots", sa.JSON()),
+        sa.Column("active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_campaigns_id", "campaigns", ["id"])
+
+    op.create_table(
+        "tweets",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("tweet_id_twitter", sa.String()),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("scheduled_at", sa.DateTime(timezone=True)),
+        sa.Column("posted_at", sa.DateTime(timezone=True)),
+        sa.Column("status", sa.String()),
+        sa.Column("media_links", sa.JSON()),
+        sa.Column("generated_by_ai", sa.Boolean()),
+        sa.Column("viral_score", sa.Float()),
+        sa.Column("campaign_id", sa.Integer(), sa.ForeignKey("campaigns.id")),
+        sa.Column("attempts", sa.Integer()),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True)),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("metrics_failures", sa.Integer()),
+        sa.Column("metrics_next_attempt_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_tweets_id", "tweets", ["id"])
+    op.create_index("ix_tweets_tweet_id_twitter", "tweets", ["tweet_id_twitter"], unique=True)
+    op.create_index("ix_tweets_next_attempt_at", "tweets", ["next_attempt_at"])
+
+    op.create_table(
+        "metrics",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("tweet_id", sa.Integer(), sa.ForeignKey("tweets.id"), nullable=False),
+        sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("likes", sa.Integer()),
+        sa.Column("retweets", sa.Integer()),
+        sa.Column("replies", sa.Integer()),
+        sa.Column("impressions", sa.Integer()),
+        sa.Column("engagement_rate", sa.Float()),
+        sa.Column("extra_json", sa.JSON()),
+    )
+    op.create_index("ix_metrics_id", "metrics", ["id"])
+
+
+def downgrade():
+    op.drop_table("metrics")
+    op.drop_table("tweets")
+    op.drop_table("campaigns")
+    op.drop_table("users")
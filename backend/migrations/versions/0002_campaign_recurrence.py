@@ -0,0 +1,64 @@
+"""campaign recurrence engine
+
+Adds Campaign.next_fire_at (indexed) and the per-occurrence identity of
+campaign tweets, and computes next_fire_at for active campaigns that
+already have a valid cron recurrence.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    from croniter import croniter
+
+    op.add_column("campaigns", sa.Column("next_fire_at", sa.DateTime(timezone=True)))
+    op.create_index("ix_campaigns_next_fire_at", "campaigns", ["next_fire_at"])
+
+    op.add_column("tweets", sa.Column("campaign_slot", sa.Integer()))
+    op.add_column("tweets", sa.Column("occurrence_at", sa.DateTime(timezone=True)))
+    op.create_index(
+        "uq_tweets_campaign_occurrence", "tweets", ["campaign_id", "campaign_slot", "occurrence_at"], unique=True
+    )
+
+    conn = op.get_bind()
+    campaigns = sa.table(
+        "campaigns",
+        sa.column("id", sa.Integer),
+        sa.column("recurrence", sa.String),
+        sa.column("active", sa.Boolean),
+        sa.column("next_fire_at", sa.DateTime(timezone=True)),
+    )
+    now = datetime.utcnow()
+    rows = conn.execute(
+        sa.select(campaigns.c.id, campaigns.c.recurrence).where(
+            campaigns.c.active == sa.true(), campaigns.c.recurrence.isnot(None)
+        )
+    ).all()
+    for campaign_id, expression in rows:
+        if not croniter.is_valid(expression):
+            continue
+        conn.execute(
+            campaigns.update().where(campaigns.c.id == campaign_id).values(
+                next_fire_at=croniter(expression, now).get_next(datetime)
+            )
+        )
+
+
+def downgrade():
+    op.drop_index("uq_tweets_campaign_occurrence", table_name="tweets")
+    op.drop_column("tweets", "occurrence_at")
+    op.drop_column("tweets", "campaign_slot")
+    op.drop_index("ix_campaigns_next_fire_at", table_name="campaigns")
+    op.drop_column("campaigns", "next_fire_at")
@@ -0,0 +1,32 @@
+"""campaign draft buffer
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "campaign_drafts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("campaign_id", sa.Integer(), sa.ForeignKey("campaigns.id"), nullable=False),
+        sa.Column("slot", sa.Integer(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("viral_score", sa.Float()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_campaign_drafts_id", "campaign_drafts", ["id"])
+    op.create_index("ix_campaign_drafts_campaign_slot", "campaign_drafts", ["campaign_id", "slot"])
+
+
+def downgrade():
+    op.drop_table("campaign_drafts")
@@ -0,0 +1,52 @@
+"""media upload pipeline
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "media_assets",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("sha256", sa.String(64), nullable=False),
+        sa.Column("size", sa.Integer()),
+        sa.Column("media_type", sa.String()),
+        sa.Column("media_id", sa.String()),
+        sa.Column("expires_at", sa.DateTime(timezone=True)),
+        sa.Column("source", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_media_assets_id", "media_assets", ["id"])
+    op.create_index("uq_media_assets_user_sha256", "media_assets", ["user_id", "sha256"], unique=True)
+
+    op.add_column("tweets", sa.Column("media_ids", sa.JSON()))
+    op.add_column("tweets", sa.Column("media_status", sa.String()))
+    op.add_column("tweets", sa.Column("media_expires_at", sa.DateTime(timezone=True)))
+    op.create_index("ix_tweets_media_status", "tweets", ["media_status"])
+
+    # Existing tweets with media go through the pipeline too
+    op.execute(
+        "UPDATE tweets SET media_status = 'pending' "
+        "WHERE status IN ('draft', 'scheduled', 'retrying') "
+        "AND media_links IS NOT NULL AND CAST(media_links AS TEXT) NOT IN ('[]', 'null')"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_tweets_media_status", table_name="tweets")
+    op.drop_column("tweets", "media_expires_at")
+    op.drop_column("tweets", "media_status")
+    op.drop_column("tweets", "media_ids")
+    op.drop_table("media_assets")
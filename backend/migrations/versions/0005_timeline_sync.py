@@ -0,0 +1,32 @@
+"""incremental timeline sync cursors
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("users", sa.Column("timeline_since_id", sa.String()))
+    op.add_column("users", sa.Column("timeline_backfill_max_id", sa.String()))
+    op.add_column("users", sa.Column("timeline_backfill_since_id", sa.String()))
+    op.add_column("users", sa.Column("timeline_backfill_done", sa.Boolean(), server_default=sa.false()))
+    op.add_column("users", sa.Column("timeline_synced_at", sa.DateTime(timezone=True)))
+    op.create_index("ix_users_timeline_synced_at", "users", ["timeline_synced_at"])
+
+
+def downgrade():
+    op.drop_index("ix_users_timeline_synced_at", table_name="users")
+    op.drop_column("users", "timeline_synced_at")
+    op.drop_column("users", "timeline_backfill_done")
+    op.drop_column("users", "timeline_backfill_since_id")
+    op.drop_column("users", "timeline_backfill_max_id")
+    op.drop_column("users", "timeline_since_id")
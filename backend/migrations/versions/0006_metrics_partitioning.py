@@ -0,0 +1,121 @@
+"""monthly range partitioning of metrics
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+On Postgres the metrics table is rebuilt as a table partitioned by
+month on timestamp, with one partition per month from the oldest
+snapshot to METRICS_PARTITION_MONTHS_AHEAD months ahead, and existing
+rows are copied across in this transaction. The primary key becomes
+(id, timestamp) since it must include the partition key; ids keep
+coming from the same sequence. Other backends only get the new index.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import settings
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, tweet_id, timestamp, likes, retweets, replies, impressions, engagement_rate, extra_json"
+
+
+def _create_metrics(partitioned: bool):
+    op.execute(f"""
+        CREATE TABLE metrics (
+            id INTEGER NOT NULL DEFAULT nextval('metrics_id_seq'),
+            tweet_id INTEGER NOT NULL REFERENCES tweets (id),
+            timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            likes INTEGER,
+            retweets INTEGER,
+            replies INTEGER,
+            impressions INTEGER,
+            engagement_rate FLOAT,
+            extra_json JSON,
+            CONSTRAINT metrics_pkey PRIMARY KEY ({'id, timestamp' if partitioned else 'id'})
+        ){' PARTITION BY RANGE (timestamp)' if partitioned else ''}
+    """)
+    op.execute("ALTER SEQUENCE metrics_id_seq OWNED BY metrics.id")
+    op.create_index("ix_metrics_id", "metrics", ["id"])
+    op.create_index("ix_metrics_tweet_id_timestamp", "metrics", ["tweet_id", "timestamp"])
+
+
+def _swap_out_legacy():
+    op.execute("ALTER SEQUENCE metrics_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE metrics RENAME TO metrics_legacy")
+    op.execute("ALTER TABLE metrics_legacy RENAME CONSTRAINT metrics_pkey TO metrics_legacy_pkey")
+    op.execute("ALTER TABLE metrics_legacy RENAME CONSTRAINT metrics_tweet_id_fkey TO metrics_legacy_tweet_id_fkey")
+    op.execute("DROP INDEX IF EXISTS ix_metrics_id")
+    op.execute("DROP INDEX IF EXISTS ix_metrics_tweet_id_timestamp")
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _months(first: datetime, last: datetime):
+    month = datetime(first.year, first.month, 1)
+    while month <= last:
+        yield month, _add_months(month, 1)
+        month = _add_months(month, 1)
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name != "postgresql":
+        op.execute("UPDATE metrics SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL")
+        with op.batch_alter_table("metrics") as batch:
+            batch.alter_column("timestamp", existing_type=sa.DateTime(timezone=True), nullable=False)
+        op.create_index("ix_metrics_tweet_id_timestamp", "metrics", ["tweet_id", "timestamp"])
+        return
+
+    _swap_out_legacy()
+    _create_metrics(partitioned=True)
+
+    now = datetime.utcnow()
+    oldest = bind.execute(sa.text(
+        "SELECT min(timestamp AT TIME ZONE 'UTC') FROM metrics_legacy"
+    )).scalar() or now
+    newest = bind.execute(sa.text(
+        "SELECT max(timestamp AT TIME ZONE 'UTC') FROM metrics_legacy"
+    )).scalar() or now
+    last = _add_months(datetime(now.year, now.month, 1), settings.METRICS_PARTITION_MONTHS_AHEAD)
+    for month, following in _months(min(oldest, now), max(newest, last)):
+        op.execute(
+            f"CREATE TABLE metrics_p{month:%Y%m} PARTITION OF metrics "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{following:%Y-%m-%d} 00:00:00+00')"
+        )
+
+    op.execute(
+        f"INSERT INTO metrics ({COLUMNS}) "
+        f"SELECT id, tweet_id, COALESCE(timestamp, now()), likes, retweets, replies, "
+        f"impressions, engagement_rate, extra_json FROM metrics_legacy"
+    )
+    op.execute("DROP TABLE metrics_legacy")
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name != "postgresql":
+        op.drop_index("ix_metrics_tweet_id_timestamp", table_name="metrics")
+        with op.batch_alter_table("metrics") as batch:
+            batch.alter_column("timestamp", existing_type=sa.DateTime(timezone=True), nullable=True)
+        return
+
+    _swap_out_legacy()
+    _create_metrics(partitioned=False)
+    op.drop_index("ix_metrics_tweet_id_timestamp", table_name="metrics")
+    op.execute("ALTER TABLE metrics ALTER COLUMN timestamp DROP NOT NULL")
+    op.execute(f"INSERT INTO metrics ({COLUMNS}) SELECT {COLUMNS} FROM metrics_legacy")
+    # Drops the partitions with it
+    op.execute("DROP TABLE metrics_legacy")
@@ -0,0 +1,30 @@
+"""hour-of-week engagement heatmaps
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "engagement_heatmaps",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("engagement", sa.JSON(), nullable=False),
+        sa.Column("tweets", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.add_column("tweets", sa.Column("heatmap_engagement", sa.Float()))
+
+
+def downgrade():
+    op.drop_column("tweets", "heatmap_engagement")
+    op.drop_table("engagement_heatmaps")
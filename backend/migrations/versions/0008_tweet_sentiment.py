@@ -0,0 +1,22 @@
+"""local sentiment score on tweets
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("tweets", sa.Column("sentiment_score", sa.Float()))
+
+
+def downgrade():
+    op.drop_column("tweets", "sentiment_score")
@@ -0,0 +1,42 @@
+"""default partition for metrics
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+
+Migration 0006 only created monthly partitions, so a snapshot timestamped
+outside them (a late backfill, a clock far off) failed to insert. Those
+rows now land in metrics_default and maintain_metric_partitions moves them
+into their month's partition. Postgres only.
+"""
+from alembic import op
+
+from app.services import metric_partitions
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+DEFAULT_PARTITION = metric_partitions.DEFAULT_PARTITION
+
+
+def upgrade():
+    if not metric_partitions.is_partitioned(op.get_bind()):
+        return
+
+    op.execute(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF metrics DEFAULT")
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if not metric_partitions.is_partitioned(bind):
+        return
+
+    # Give the rows waiting in it a monthly partition rather than dropping them
+    for month in metric_partitions.stray_months(bind):
+        metric_partitions.ensure_partitions(bind, month, month)
+    op.execute(f"ALTER TABLE metrics DETACH PARTITION {DEFAULT_PARTITION}")
+    op.execute(f"DROP TABLE {DEFAULT_PARTITION}")
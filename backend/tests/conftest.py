@@ -0,0 +1,25 @@
+"""
+Shared test setup
+
+The engine is created when app.database is imported, so the database
+must be chosen before any app module is. Tests default to a scratch
+SQLite file; set DATABASE_URL to run them against Postgres.
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+
+@pytest.fixture
+def db():
+    """Session on a freshly created schema"""
+    from app.database import SessionLocal, init_db, reset_db
+
+    reset_db()
+    init_db()
+    session = SessionLocal()
+    yield session
+    session.close()
@@ -0,0 +1,98 @@
+"""Coalesced Gemini calls: bounded waits, and interactive calls never queue behind background ones"""
+import threading
+import time
+
+import pytest
+
+from app.config import settings
+from app.services import ai_quota
+
+
+class FakeRedis:
+    """The few string commands the single-flight lock uses"""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        value = self.values.get(key)
+        return value.encode() if value is not None else None
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return False
+        self.values[key] = value
+        return True
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+@pytest.fixture(autouse=True)
+def unmetered(monkeypatch):
+    """No slot waits and a negligible call budget, so only the coalescing waits remain"""
+    monkeypatch.setattr(ai_quota, "acquire", lambda priority="interactive", timeout=None: 0.0)
+    monkeypatch.setattr(settings, "GEMINI_TIMEOUT_SECONDS", 0.0)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(ai_quota, "get_redis", lambda: client)
+    return client
+
+
+@pytest.fixture
+def leader(monkeypatch):
+    """Start an in-process call that holds its flight until released (no Redis: single process)"""
+    def redis_down():
+        raise ai_quota.redis.ConnectionError("down")
+
+    monkeypatch.setattr(ai_quota, "get_redis", redis_down)
+    release = threading.Event()
+    threads = []
+
+    def start(priority):
+        thread = threading.Thread(target=ai_quota.run, args=("prompt", lambda: release.wait() and "leader", priority))
+        thread.start()
+        threads.append(thread)
+        while not ai_quota._flights:
+            time.sleep(0.01)
+
+    yield start
+    release.set()
+    for thread in threads:
+        thread.join()
+
+
+def test_follower_waits_at_most_its_timeout(leader):
+    leader(ai_quota.BACKGROUND)
+    start = time.monotonic()
+    with pytest.raises(ai_quota.QuotaTimeout):
+        ai_quota.run("prompt", lambda: "own", ai_quota.BACKGROUND, timeout=0.2)
+    assert time.monotonic() - start < 1.0
+
+
+def test_interactive_does_not_wait_on_background_leader(leader):
+    leader(ai_quota.BACKGROUND)
+    assert ai_quota.run("prompt", lambda: "own", ai_quota.INTERACTIVE, timeout=0.2) == "own"
+
+
+def test_cross_process_follower_times_out(fake_redis):
+    fake_redis.values["ai:flight:" + ai_quota.hashlib.sha256(b"prompt").hexdigest()] = "interactive:other"
+    start = time.monotonic()
+    with pytest.raises(ai_quota.QuotaTimeout):
+        ai_quota.run("prompt", lambda: "own", ai_quota.INTERACTIVE, timeout=0.2)
+    assert time.monotonic() - start < 1.0
+
+
+def test_cross_process_interactive_skips_background_holder(fake_redis):
+    lock_key = "ai:flight:" + ai_quota.hashlib.sha256(b"prompt").hexdigest()
+    fake_redis.values[lock_key] = "background:other"
+    assert ai_quota.run("prompt", lambda: "own", ai_quota.INTERACTIVE, timeout=0.2) == "own"
+    assert fake_redis.values[lock_key] == "background:other"
+
+
+def test_cross_process_result_is_shared(fake_redis):
+    assert ai_quota.run("prompt", lambda: "first") == "first"
+    assert ai_quota.run("prompt", lambda: "second") == "first"
@@ -0,0 +1,68 @@
+"""Streaming exports through /exports, read back in each format"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pyarrow.parquet as pq
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.auth.dependencies import create_access_token
+from app.main import app
+
+SNAPSHOTS = 3
+
+
+@pytest.fixture
+def client(db):
+    """Client authenticated as a user with one posted tweet and its metric snapshots"""
+    user = models.User(username="exporter", api_key="key")
+    db.add(user)
+    db.flush()
+    posted_at = datetime.utcnow() - timedelta(hours=SNAPSHOTS)
+    tweet = models.Tweet(user_id=user.id, text="hello", status="posted", tweet_id_twitter="42", posted_at=posted_at)
+    db.add(tweet)
+    db.flush()
+    db.add_all([
+        models.Metric(
+            tweet_id=tweet.id,
+            timestamp=posted_at + timedelta(hours=i),
+            likes=i,
+            retweets=0,
+            replies=0,
+            impressions=100,
+            engagement_rate=i / 100
+        )
+        for i in range(SNAPSHOTS)
+    ])
+    db.commit()
+
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'sub': user.username})}"
+    return client
+
+
+def test_parquet(client):
+    response = client.get("/exports/metrics", params={"format": "parquet"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == SNAPSHOTS
+    assert table.column("likes").to_pylist() == list(range(SNAPSHOTS))
+    assert set(table.column("tweet_id_twitter").to_pylist()) == {"42"}
+    assert str(table.schema.field("timestamp").type) == "timestamp[us, tz=UTC]"
+
+
+def test_csv_and_ndjson(client):
+    rows = list(csv.DictReader(io.StringIO(client.get("/exports/metrics", params={"format": "csv"}).text)))
+    assert [row["likes"] for row in rows] == [str(i) for i in range(SNAPSHOTS)]
+
+    lines = client.get("/exports/tweets", params={"format": "ndjson"}).text.splitlines()
+    assert [json.loads(line)["tweet_id_twitter"] for line in lines] == ["42"]
+
+
+def test_unknown_format_is_rejected(client):
+    assert client.get("/exports/metrics", params={"format": "xlsx"}).status_code == 422
@@ -0,0 +1,30 @@
+"""Provider SDKs and ML libraries must not load at API or worker startup"""
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.import_time import LAZY_MODULES
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports both entry points and runs the API's startup (schema check) in a fresh interpreter
+STARTUP = f"""
+import asyncio, json, sys
+import app.tasks.scheduler
+from app.main import startup_event
+asyncio.run(startup_event())
+print(json.dumps(sorted(name for name in {LAZY_MODULES!r} if name in sys.modules)))
+"""
+
+
+def test_startup_loads_no_lazy_module(db):
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP],
+        capture_output=True,
+        text=True,
+        cwd=BACKEND,
+        env={**os.environ, "PYTHONPATH": BACKEND},
+    )
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.splitlines()[-1]) == []
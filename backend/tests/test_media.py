@@ -0,0 +1,77 @@
+"""Media URLs must not reach internal services"""
+import http.server
+import socket
+import threading
+
+import pytest
+
+from app.services import media
+
+
+@pytest.mark.parametrize("url", [
+    "http://169.254.169.254/latest/meta-data/",
+    "http://127.0.0.1:6379/",
+    "http://localhost/a.png",
+    "http://10.0.0.1/a.png",
+    "http://[::1]/a.png",
+    "http://[::ffff:127.0.0.1]/a.png",
+    "http://2130706433/a.png",
+    "http://user:pw@93.184.216.34/a.png",
+    "ftp://93.184.216.34/a.png",
+    "file:///etc/passwd",
+])
+def test_internal_and_unsupported_urls_are_refused(url):
+    with pytest.raises(media.MediaError):
+        media.check_sources([url])
+
+
+def test_public_urls_and_other_sources_are_accepted():
+    media.check_sources(["http://93.184.216.34/a.png", "12345", "banner.png"])
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Local server reachable as public.test; internal.test resolves to another loopback address"""
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/img":
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.end_headers()
+                self.wfile.write(b"png")
+                return
+            location = {"/internal": f"http://internal.test:{port}/img", "/loop": "/loop"}.get(self.path, "/img")
+            self.send_response(302)
+            self.send_header("Location", location)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    port = httpd.server_address[1]
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    getaddrinfo = socket.getaddrinfo
+    hosts = {"public.test": "93.184.216.34", "internal.test": "10.0.0.1"}
+    monkeypatch.setattr(media.socket, "getaddrinfo", lambda host, *args, **kwargs: getaddrinfo(hosts.get(host, host), *args, **kwargs))
+    # Connect to the vetted public address's stand-in: the local server
+    real_get = media.requests.Session.get
+    monkeypatch.setattr(media.requests.Session, "get", lambda self, url, **kwargs: real_get(self, url.replace("93.184.216.34", "127.0.0.1"), **kwargs))
+    yield f"http://public.test:{port}"
+    httpd.shutdown()
+
+
+def test_relative_redirect_is_followed(server):
+    spooled, _, size, media_type = media.spool(f"{server}/relative")
+    assert (spooled.read(), size, media_type) == (b"png", 3, "image/png")
+
+
+def test_redirect_to_internal_host_is_refused(server):
+    with pytest.raises(media.MediaError, match="not a public address"):
+        media.spool(f"{server}/internal")
+
+
+def test_redirect_loop_is_refused(server):
+    with pytest.raises(media.MediaError, match="Too many redirects"):
+        media.spool(f"{server}/loop")
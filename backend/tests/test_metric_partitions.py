@@ -0,0 +1,41 @@
+"""Metric snapshots outside the monthly partitions land in the default one until maintenance moves them"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import models
+from app.database import engine
+from app.services import metric_partitions
+from app.tasks import scheduler
+
+pytestmark = pytest.mark.skipif(engine.dialect.name != "postgresql", reason="metrics is only partitioned on Postgres")
+
+
+def partition_of(db, metric_id):
+    return db.execute(text("SELECT tableoid::regclass::text FROM metrics WHERE id = :id"), {"id": metric_id}).scalar()
+
+
+def test_out_of_range_snapshot_is_moved_to_its_month(db):
+    user = models.User(username="metrics", api_key="key")
+    db.add(user)
+    db.flush()
+    tweet = models.Tweet(user_id=user.id, text="hello", status="posted")
+    db.add(tweet)
+    db.flush()
+    # Years before the oldest partition the migration created
+    backfilled = datetime.utcnow().replace(day=15) - timedelta(days=3 * 365)
+    metric = models.Metric(tweet_id=tweet.id, timestamp=backfilled, likes=1)
+    db.add(metric)
+    db.commit()
+    assert partition_of(db, metric.id) == metric_partitions.DEFAULT_PARTITION
+
+    scheduler.maintain_metric_partitions()
+
+    month = metric_partitions.month_start(backfilled)
+    assert partition_of(db, metric.id) == metric_partitions.partition_name(month)
+    assert db.execute(text(f"SELECT count(*) FROM {metric_partitions.DEFAULT_PARTITION}")).scalar() == 0
+    # Still attached, for the next stray row
+    with engine.connect() as conn:
+        assert metric_partitions.stray_months(conn) == []
+        assert metric_partitions.DEFAULT_PARTITION in metric_partitions._attached(conn)
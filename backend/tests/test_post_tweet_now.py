@@ -0,0 +1,71 @@
+"""post_tweet_now: posting a queued tweet, duplicates and failures"""
+from datetime import datetime
+
+import pytest
+
+from app import models
+from app.services import resilience
+from app.services.recurrence import to_utc_naive
+from app.services.x_client import TwitterAPIError
+from app.tasks import scheduler
+from benchmarks.stubs import StubTwitterClient
+
+
+@pytest.fixture
+def queued(db):
+    """A queued tweet's ID"""
+    user = models.User(username="poster", api_key="key")
+    db.add(user)
+    db.flush()
+    tweet = models.Tweet(user_id=user.id, text="hello", status="queued", next_attempt_at=datetime.utcnow())
+    db.add(tweet)
+    db.commit()
+    return tweet.id
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Countdowns of the post_tweet_now tasks sent, by tweet ID"""
+    sent = {}
+    monkeypatch.setattr(
+        scheduler.post_tweet_now, "apply_async",
+        lambda args, countdown=0: sent.setdefault(args[0], []).append(countdown)
+    )
+    return sent
+
+
+def failing_client(exc):
+    class Client(StubTwitterClient):
+        def post_tweet(self, text, media_ids=None):
+            raise exc
+    return Client
+
+
+def reload(db, tweet_id):
+    db.expire_all()
+    return db.get(models.Tweet, tweet_id)
+
+
+def test_posts_once(db, queued, monkeypatch):
+    monkeypatch.setattr(scheduler, "get_twitter_client", StubTwitterClient)
+    assert scheduler.post_tweet_now(queued)["status"] == "success"
+    assert scheduler.post_tweet_now(queued)["status"] == "skipped"
+    tweet = reload(db, queued)
+    assert tweet.status == "posted" and tweet.tweet_id_twitter.startswith("stub-")
+
+
+def test_open_breaker_uses_no_attempt(db, queued, sent, monkeypatch):
+    monkeypatch.setattr(scheduler, "get_twitter_client", failing_client(resilience.CircuitOpen("open", 30.0)))
+    assert scheduler.post_tweet_now(queued)["status"] == "deferred"
+    tweet = reload(db, queued)
+    assert (tweet.status, tweet.attempts) == ("queued", 0)
+    assert to_utc_naive(tweet.next_attempt_at) > datetime.utcnow()
+    assert sent == {queued: [30.0]}
+
+
+def test_provider_failure_uses_an_attempt_and_retries(db, queued, sent, monkeypatch):
+    monkeypatch.setattr(scheduler, "get_twitter_client", failing_client(TwitterAPIError("unavailable", 503)))
+    assert scheduler.post_tweet_now(queued)["status"] == "retrying"
+    tweet = reload(db, queued)
+    assert (tweet.status, tweet.attempts) == ("retrying", 1)
+    assert list(sent) == [queued]
@@ -0,0 +1,51 @@
+"""Statements issued by the scheduler sweeps must not grow with the number of tweets"""
+import pytest
+
+from app.config import settings
+from app.services import metric_buffer
+from app.tasks import scheduler
+from benchmarks.query_counts import run_profiled, seed
+from benchmarks.stubs import StubTwitterClient
+
+SIZES = (10, 100)
+USERS = 5
+
+
+@pytest.fixture(scope="module")
+def counts():
+    """Statement counts of both sweeps, by number of due tweets"""
+    results = {}
+    with pytest.MonkeyPatch.context() as patch:
+        # Every post lands in the same hour: keep the budget, batch size and
+        # drain planner (which only enqueues) out of the way
+        patch.setattr(settings, "MAX_POSTS_PER_HOUR", max(SIZES))
+        patch.setattr(settings, "METRICS_SWEEP_BATCH_SIZE", max(SIZES))
+        patch.setattr(settings, "DRAIN_BACKLOG_THRESHOLD", max(SIZES))
+        patch.setattr(scheduler, "get_twitter_client", StubTwitterClient)
+        for num_tweets in SIZES:
+            seed(USERS, num_tweets)
+            results[num_tweets] = {
+                "check_scheduled_tweets": run_profiled("check_scheduled_tweets", scheduler.check_scheduled_tweets),
+                "update_tweet_metrics": run_profiled("update_tweet_metrics", scheduler.update_tweet_metrics),
+            }
+            # Write the buffered snapshots while their tweets still exist
+            metric_buffer.get_buffer().flush(force=True)
+    return results
+
+
+@pytest.mark.parametrize("task", ["check_scheduled_tweets", "update_tweet_metrics"])
+def test_reads_are_constant(counts, task):
+    small, large = (counts[n][task] for n in SIZES)
+    assert small["reads"] == large["reads"]
+
+
+def test_posting_statements_are_constant(counts):
+    small, large = (counts[n]["check_scheduled_tweets"] for n in SIZES)
+    assert small["statements"] == large["statements"]
+    # One locked SELECT per user's batch
+    assert small["claims"] == large["claims"] == USERS
+
+
+def test_metrics_writes_are_batched(counts):
+    small, large = (counts[n]["update_tweet_metrics"] for n in SIZES)
+    assert small["writes"] == large["writes"]
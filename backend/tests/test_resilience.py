@@ -0,0 +1,122 @@
+"""
+Timeouts, circuit breakers and bulkheads against a local provider stub
+
+The Twitter client is pointed at an HTTP stub that can hang, fail with
+500 or answer normally; a fake slow Gemini call goes through the Gemini
+bulkhead. No network or Redis needed.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.config import settings
+from app.services import resilience
+from app.services.x_client import TwitterAPIClient, TwitterAPIError
+
+
+class Stub(BaseHTTPRequestHandler):
+    mode = "ok"  # ok, error, hang
+    hits = 0
+
+    def do_POST(self):
+        Stub.hits += 1
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if Stub.mode == "hang":
+            time.sleep(2)
+        status, body = (500, b"{}") if Stub.mode == "error" else (200, b'{"id_str": "1"}')
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def client(stub_url, monkeypatch):
+    """Twitter client on the stub, with short timeouts and fresh breakers and bulkheads"""
+    for name, value in {
+        "TWITTER_API_BASE_URL": stub_url,
+        "TWITTER_READ_TIMEOUT_SECONDS": 0.5,
+        "GEMINI_TIMEOUT_SECONDS": 0.5,
+        "BREAKER_MIN_CALLS": 4,
+        "BREAKER_OPEN_SECONDS": 1,
+        "BULKHEAD_GEMINI_CALLS": 2,
+        "BULKHEAD_WAIT_SECONDS": 0.2,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience, "_bulkheads", {})
+    Stub.mode, Stub.hits = "ok", 0
+    return TwitterAPIClient("key")
+
+
+def test_hung_call_times_out(client):
+    Stub.mode = "hang"
+    start = time.monotonic()
+    with pytest.raises(TwitterAPIError) as excinfo:
+        client.post_tweet("hello")
+    assert time.monotonic() - start < 1.5
+    assert excinfo.value.retryable
+
+
+def test_breaker_opens_on_failures_and_probe_closes_it(client):
+    Stub.mode = "error"
+    outcomes = []
+    for _ in range(8):
+        try:
+            client.post_tweet("hello")
+        except resilience.CircuitOpen:
+            outcomes.append("open")
+        except TwitterAPIError:
+            outcomes.append("error")
+    assert outcomes[-1] == "open"
+    # An open breaker fails fast without reaching the provider
+    assert Stub.hits <= 5
+    assert resilience.states()["twitterapi:post_tweet"]["state"] == "open"
+
+    Stub.mode = "ok"
+    time.sleep(settings.BREAKER_OPEN_SECONDS + 0.1)
+    assert client.post_tweet("hello").get("id_str") == "1"
+    assert resilience.states()["twitterapi:post_tweet"]["state"] == "closed"
+
+
+def test_bulkhead_caps_hung_gemini_calls_and_posting_continues(client):
+    release = threading.Event()
+    errors = []
+
+    def gemini():
+        try:
+            resilience.call("gemini", "generate_tweet_variants", release.wait, settings.GEMINI_TIMEOUT_SECONDS)
+        except Exception as e:
+            errors.append(type(e).__name__)
+
+    threads = [threading.Thread(target=gemini) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.3)
+    start = time.monotonic()
+    posted = client.post_tweet("still posting")
+    elapsed = time.monotonic() - start
+    for thread in threads:
+        thread.join()
+    release.set()
+
+    assert sorted(errors) == ["BulkheadFull"] * 4 + ["CallTimeout"] * 2
+    assert posted.get("id_str") == "1" and elapsed < 0.5
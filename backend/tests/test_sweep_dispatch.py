@@ -0,0 +1,46 @@
+"""dispatch_sweep sends tasks only to partitions with due work"""
+import pytest
+
+from app.config import settings
+from app.services import partitioning
+from app.tasks import scheduler
+from benchmarks.query_counts import seed
+from benchmarks.stubs import StubTwitterClient
+
+USERS = 5
+
+
+@pytest.fixture
+def dispatched(monkeypatch):
+    """Partition task arguments sent by dispatch_sweep, by sweep"""
+    seed(USERS, 20)
+    sent = {}
+    monkeypatch.setattr(partitioning, "live_workers", lambda celery_app, queue: [])
+    for name in scheduler.PARTITIONED_SWEEPS:
+        task = scheduler.celery_app.tasks[name]
+        monkeypatch.setattr(task, "apply_async", lambda args, name=name, **options: sent.setdefault(name, []).append(args))
+    return sent
+
+
+def test_only_due_partitions_are_swept(dispatched):
+    scheduler.dispatch_sweep(scheduler.check_scheduled_tweets.name, 55)
+    assert len(dispatched[scheduler.check_scheduled_tweets.name]) == USERS
+    # Nothing has been posted yet, so there are no metrics to refresh
+    scheduler.dispatch_sweep(scheduler.update_tweet_metrics.name, 290)
+    assert scheduler.update_tweet_metrics.name not in dispatched
+
+
+def test_metrics_batch_is_shared_between_partitions(dispatched, monkeypatch):
+    monkeypatch.setattr(scheduler, "get_twitter_client", StubTwitterClient)
+    monkeypatch.setattr(settings, "METRICS_SWEEP_BATCH_SIZE", 7)
+    scheduler.check_scheduled_tweets()
+
+    scheduler.dispatch_sweep(scheduler.update_tweet_metrics.name, 290)
+    limits = [limit for _, limit in dispatched[scheduler.update_tweet_metrics.name]]
+    assert sum(limits) == 7 and all(limits)
+
+
+def test_share_is_proportional():
+    assert partitioning.share({1: 150, 2: 30, 3: 1, 4: 1}, 100) == {1: 82, 2: 16, 3: 1, 4: 1}
+    assert partitioning.share({1: 3, 2: 4}, 100) == {1: 3, 2: 4}
+    assert sum(partitioning.share({partition: 1 for partition in range(5)}, 3).values()) == 3